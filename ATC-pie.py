@@ -35,7 +35,7 @@ from gui.launcher import ATCpieLauncher, valid_location_code, min_map_range, max
 from ext.sr import speech_recognition_available
 from ext.tts import speech_synthesis_available
 from ext.xplane import import_airfield_data, import_navaid_data, import_navfix_data, import_airway_data
-from ext.resources import read_route_presets, import_entry_exit_data, \
+from ext.resources import read_route_presets, import_entry_exit_data, load_world_magnetic_model, \
 		load_aircraft_db, load_aircraft_registration_formats, load_airlines_db
 
 
@@ -87,6 +87,7 @@ if __name__ == "__main__":
 	import_navfix_data()
 	import_airway_data()
 	import_entry_exit_data()
+	load_world_magnetic_model()
 	print('done.')
 		
 	try:
@@ -11,6 +11,7 @@ from ai.status import Status
 
 from session.config import settings
 from session.env import env
+from session.profiling import profiler
 
 from ext.fgfs import FGFS_model_and_height, FGFS_model_liveries
 from ext.fgms import mkFgmsMsg_position, FGMS_prop_code_by_name, FGMS_prop_XPDR_capability, \
@@ -93,6 +94,7 @@ class AbstractAiAcft(Aircraft):
 	
 	## TICKING
 	
+	@profiler.profiled('AI tickOnce')
 	def tickOnce(self):
 		if not self.frozen:
 			self.tick_interval = now() - self.lastLiveUpdateTime()
@@ -124,6 +126,14 @@ class AbstractAiAcft(Aircraft):
 	## FGMS PACKET
 	
 	def fgmsLivePositionPacket(self):
+		model, coords, amsl, hdg, pitch, roll, pdct = self.fgmsLivePositionValues()
+		return mkFgmsMsg_position(self.identifier, model, coords, amsl, hdg=hdg, pitch=pitch, roll=roll, properties=pdct)
+	
+	def fgmsLivePositionValues(self):
+		'''
+		returns the values to pack in the FGMS position packet, as a tuple:
+		(model, EarthCoords, geometric ft AMSL, heading, pitch, roll, property dict)
+		'''
 		model, height = FGFS_model_and_height(self.aircraft_type)
 		coords, amsl = self.live_position
 		if self.statusType() in [Status.AIRBORNE, Status.HLDG] and self.hdg_tick_diff != 0:
@@ -165,8 +175,7 @@ class AbstractAiAcft(Aircraft):
 		for prop in FGMS_props_gear_compression: # FLOAT: 0=free; 1=compressed
 			pdct[prop] = gear_compression_high if self.isGroundStatus() else gear_compression_low
 		# finished
-		return mkFgmsMsg_position(self.identifier, model, coords, amsl + height, \
-				hdg=self.params.heading.trueAngle(), pitch=deg_pitch, roll=deg_roll, properties=pdct)
+		return model, coords, amsl + height, self.params.heading.trueAngle(), deg_pitch, deg_roll, pdct
 	
 	
 	## SNAPSHOTS
@@ -903,3 +903,13 @@ class ControlledAircraft(AbstractAiAcft):
 		return self.identifier, self.aircraft_type, self.params.dup(), self.goal, \
 				self.spawned, self.frozen, [i.dup() for i in self.instructions]
 	
+	def statusSignature(self):
+		'''
+		a cheap value to compare with a previous one, equal if the snapshot status has not changed in between
+		'''
+		p = self.params
+		instr = tuple((i.type, ((tuple(i.arg[0]), i.arg[1]) if i.type == Instruction.TAXI else i.arg)) for i in self.instructions)
+		return p.status.type, p.status.arg, p.position.lat, p.position.lon, p.altitude.ft1013(), p.heading.trueAngle(), \
+				p.ias.kt, p.XPDR_mode, p.XPDR_code, p.XPDR_idents, p.runway_reported_in_sight, p.RWY_excursion_stage, \
+				self.goal, self.spawned, self.frozen, instr
+	
@@ -0,0 +1,581 @@
+
+from os import path
+from random import Random
+from datetime import timedelta
+
+from session.config import settings
+from session.env import env
+from session.manager import SessionManager
+from session.teacher import TeachingMsg, TeachingMsgFramer
+
+from data.coords import EarthCoords, WGS84_geodetic_to_cartesian_metres
+from data.geodesy import distances_from, moved_batch, cartesian_to_geodetic_batch
+from data.magnetic import world_magnetic_model
+from data.params import Heading, StdPressureAlt, Speed
+from data.nav import NavDB, RoutingDB, Airfield, Fix, VOR, NDB, world_navpoint_db
+from data.ad import GroundNetwork
+from data.fpl import FPL
+from data.acft import Aircraft, Xpdr
+from data.utc import now
+from data.strip import Strip, assigned_heading_detail, assigned_altitude_detail, assigned_SQ_detail, \
+		assigned_speed_detail, rack_detail, handover_details, parsed_route_detail, encode_strip_board, decode_strip_board
+from data.conflict import path_conflict_test
+from data.radar import Radar
+
+from models.liveStrips import LiveStripModel
+from models.FPLs import FlightPlanModel
+
+from ext.xplane import import_navaid_data, import_navfix_data, fallback_navaid_file, fallback_navfix_file
+from ext.fgms import mkFgmsMsg_position, decode_FGMS_position_message, \
+		FGMS_prop_XPDR_capability, FGMS_prop_XPDR_code, FGMS_prop_XPDR_alt, FGMS_prop_XPDR_ias
+from ext.sr import interpret_string
+from ext.resources import load_world_magnetic_model
+from ext.httpClient import HttpClient
+
+from benchmarks.fakeServer import FakeServer
+
+from benchmarks.harness import Benchmark, BenchmarkSkipped
+
+
+# ---------- Constants ----------
+
+random_seed = 2015 # all synthetic data is reproducible
+centre = EarthCoords(46.5, 7.5) # synthetic world is built around this point, also set as radar position
+synthetic_navpoint_count = 20000
+synthetic_navpoint_spread = 6 # degrees of lat/lon around centre
+navpoint_lookup_count = 200
+airway_grid_size = 30 # fixes per side
+airway_grid_step = .2 # degrees
+taxi_grid_size = 40 # nodes per side
+taxi_grid_step = .0004 # degrees
+coords_pair_count = 1000
+value_update_count = 1000
+declination_query_count = 20
+radar_contact_counts = [50, 200]
+conflict_pair_count = 50
+snapshot_spacing = timedelta(seconds=5)
+fgms_packet_count = 100
+strip_count = 100
+live_strip_count = 300
+online_FPL_count = 2000
+fake_METAR_station_count = 9
+teaching_msg_count = 1000
+teaching_msg_max_data_length = 200 # bytes
+teaching_socket_read_size = 4096 # bytes available per readyRead signal
+
+voice_strings = [
+	'airline-DLH one two three turn left heading two seven zero',
+	'airline-BAW four five descend flight-level one two zero',
+	'foxtrot golf bravo charlie delta climb five thousand five hundred feet',
+	'airline-AFR nine eight seven reduce speed two one zero',
+	'airline-KLM one zero one squawk four five two one',
+	'airline-EZY three three runway two seven left cleared to land',
+	'airline-RYR eight eight one line up and wait runway zero nine',
+	'airline-SWR one four six expect ils approach runway one six'
+]
+
+# -------------------------------
+
+
+class BenchmarkSessionManager(SessionManager):
+	'''
+	Serves a fixed list of synthetic aircraft to the radar.
+	'''
+	def __init__(self, aircraft):
+		SessionManager.__init__(self, None)
+		self.aircraft = aircraft
+	
+	def getAircraft(self):
+		return self.aircraft
+
+
+
+
+# =============================================== #
+
+#                 SYNTHETIC DATA                  #
+
+# =============================================== #
+
+
+def random_coords(rnd, spread):
+	return EarthCoords(centre.lat + rnd.uniform(-spread, spread), centre.lon + rnd.uniform(-spread, spread))
+
+
+def synthetic_navdb(rnd, count):
+	db = NavDB()
+	for i in range(count):
+		pos = random_coords(rnd, synthetic_navpoint_spread)
+		t = i % 10
+		if t == 0:
+			db.add(VOR('V%03d' % (i % 1000), pos, '%d.%02d' % (108 + i % 10, i % 100), 'VOR %d' % i))
+		elif t == 1:
+			db.add(NDB('N%03d' % (i % 1000), pos, str(200 + i % 500), 'NDB %d' % i))
+		else: # recurring codes make some lookups ambiguous, as with real data
+			db.add(Fix('F%04d' % (i % 5000), pos))
+	return db
+
+
+def grid_fix(row, col):
+	return Fix('G%02d%02d' % (row, col), EarthCoords(centre.lat + row * airway_grid_step, centre.lon + col * airway_grid_step))
+
+
+def synthetic_airway_grid():
+	'''
+	returns the RoutingDB and its grid of fixes, with airways along rows and columns in both directions
+	'''
+	grid = [[grid_fix(row, col) for col in range(airway_grid_size)] for row in range(airway_grid_size)]
+	db = RoutingDB()
+	for row in range(airway_grid_size):
+		for col in range(airway_grid_size):
+			if col + 1 < airway_grid_size:
+				db.addAwy(grid[row][col], grid[row][col + 1], 'R%d' % row, 100, 400)
+				db.addAwy(grid[row][col + 1], grid[row][col], 'R%d' % row, 100, 400)
+			if row + 1 < airway_grid_size:
+				db.addAwy(grid[row][col], grid[row + 1][col], 'C%d' % col, 100, 400)
+				db.addAwy(grid[row + 1][col], grid[row][col], 'C%d' % col, 100, 400)
+	return db, grid
+
+
+def synthetic_ground_net():
+	'''
+	square grid of taxiways, with a runway along the middle row
+	'''
+	gnet = GroundNetwork()
+	node = lambda row, col: 'n%d-%d' % (row, col)
+	for row in range(taxi_grid_size):
+		for col in range(taxi_grid_size):
+			gnet.addNode(node(row, col), EarthCoords(centre.lat + row * taxi_grid_step, centre.lon + col * taxi_grid_step))
+	rwy_row = taxi_grid_size // 2
+	for row in range(taxi_grid_size):
+		for col in range(taxi_grid_size):
+			if col + 1 < taxi_grid_size:
+				if row == rwy_row:
+					gnet.addEdge(node(row, col), node(row, col + 1), '09/27', None)
+				else:
+					gnet.addEdge(node(row, col), node(row, col + 1), None, 'T%d' % row)
+			if row + 1 < taxi_grid_size:
+				gnet.addEdge(node(row, col), node(row + 1, col), None, 'X%d' % col)
+	return gnet, node(0, 0), node(taxi_grid_size - 1, taxi_grid_size - 1)
+
+
+def synthetic_aircraft(callsign, pos, alt_ft, hdg, speed, squawk):
+	'''
+	Aircraft with a transponder on and two radar snapshots, so that heading and ground speed are inferred.
+	'''
+	xpdr = { Xpdr.CODE: squawk, Xpdr.IDENT: False, Xpdr.ALT: StdPressureAlt(alt_ft), \
+		Xpdr.CALLSIGN: callsign, Xpdr.ACFT: 'A320', Xpdr.IAS: Speed(speed) }
+	acft = Aircraft(callsign, 'A320', pos.moved(hdg.opposite(), speed * snapshot_spacing.total_seconds() / 3600), alt_ft)
+	first = acft.lastSnapshot()
+	first.time_stamp = now() - snapshot_spacing
+	first.xpdrData = xpdr.copy()
+	acft.updateLiveStatus(pos, alt_ft, xpdr)
+	acft.saveRadarSnapshot()
+	return acft
+
+
+def synthetic_traffic(rnd, count):
+	'''
+	returns a pair: the aircraft list, and strips for a third of them (linked or waiting for identification)
+	'''
+	aircraft = []
+	strips = []
+	for i in range(count):
+		cs = 'BMK%03d' % i
+		sq = 0o1000 + i
+		acft = synthetic_aircraft(cs, random_coords(rnd, .8), rnd.randint(80, 350) * 100, \
+				Heading(rnd.uniform(0, 360), True), rnd.randint(180, 450), sq)
+		aircraft.append(acft)
+		if i % 3 == 0:
+			strip = Strip()
+			strip.writeDetail(FPL.CALLSIGN, cs)
+			strip.writeDetail(assigned_SQ_detail, sq)
+			strip.writeDetail(assigned_heading_detail, Heading(rnd.randint(1, 72) * 5, False))
+			strip.writeDetail(assigned_altitude_detail, 'FL%03d' % (10 * rnd.randint(8, 35)))
+			if i % 2 == 0:
+				strip.linkAircraft(acft)
+			strips.append(strip)
+	return aircraft, strips
+
+
+def synthetic_teaching_msgs(rnd, count):
+	return [TeachingMsg(rnd.choice(TeachingMsg.msg_types), \
+		data=bytes(rnd.getrandbits(8) for i in range(rnd.randint(0, teaching_msg_max_data_length)))) for i in range(count)]
+
+
+def reset_session(aircraft, strips):
+	EarthCoords.setRadarPos(centre)
+	settings.SSR_mode_capability = 'S'
+	settings.session_manager = BenchmarkSessionManager(aircraft)
+	env.strips = LiveStripModel()
+	for strip in strips:
+		env.strips.addStrip(strip)
+
+
+
+
+# =============================================== #
+
+#                   BENCHMARKS                    #
+
+# =============================================== #
+
+
+## GEODESY
+
+def setup_coords_pairs():
+	rnd = Random(random_seed)
+	return [(random_coords(rnd, 2), random_coords(rnd, 2)) for i in range(coords_pair_count)]
+
+def run_distanceTo(pairs):
+	for p1, p2 in pairs:
+		p1.distanceTo(p2)
+
+
+def setup_coords_moves():
+	rnd = Random(random_seed)
+	return [(random_coords(rnd, 2), Heading(rnd.uniform(0, 360), True), rnd.uniform(0, 200)) for i in range(coords_pair_count)]
+
+def run_moved(moves):
+	for p, hdg, dist in moves:
+		p.moved(hdg, dist)
+
+
+def setup_batch_distances():
+	return [p for pair in setup_coords_pairs() for p in pair]
+
+def run_batch_distances(points):
+	distances_from(centre, points)
+
+
+def setup_batch_moves():
+	moves = setup_coords_moves()
+	return [p for p, h, d in moves], [h for p, h, d in moves], [d for p, h, d in moves]
+
+def run_batch_moves(state):
+	moved_batch(*state)
+
+
+def setup_batch_geodetic():
+	rnd = Random(random_seed)
+	xyz = [WGS84_geodetic_to_cartesian_metres(random_coords(rnd, 2), rnd.uniform(0, 40000)) for i in range(coords_pair_count)]
+	return [x for x, y, z in xyz], [y for x, y, z in xyz], [z for x, y, z in xyz]
+
+def run_batch_geodetic(state):
+	cartesian_to_geodetic_batch(*state)
+
+
+def setup_declinations():
+	if not world_magnetic_model.isLoaded():
+		load_world_magnetic_model()
+		if not world_magnetic_model.isLoaded():
+			raise BenchmarkSkipped('magnetic model file not found')
+	rnd = Random(random_seed)
+	return [random_coords(rnd, synthetic_navpoint_spread) for i in range(declination_query_count)]
+
+def run_declinations(points):
+	world_magnetic_model.declination_cache.clear() # time the model evaluation
+	for p in points:
+		world_magnetic_model.declination(p)
+
+
+
+## VALUE TYPES
+
+def setup_value_updates():
+	rnd = Random(random_seed)
+	return [(Heading(rnd.randint(0, 359), True), Speed(rnd.randint(120, 450)), StdPressureAlt.fromFL(rnd.randint(20, 400)), \
+			rnd.choice([-1, 1])) for i in range(value_update_count)]
+
+def run_value_updates(values):
+	for hdg, spd, alt, sign in values: # integer steps, as in controlled AI turns, speed and level changes
+		hdg + 3 * sign
+		spd.diff(spd + 10 * sign)
+		(alt + 100 * sign).FL()
+
+
+
+## NAVIGATION DATA
+
+def setup_navdb_loading():
+	if not path.exists(fallback_navaid_file) or not path.exists(fallback_navfix_file):
+		raise BenchmarkSkipped('recorded X-plane navigation data not found')
+	return None
+
+def run_navdb_loading(ignore):
+	world_navpoint_db.clear()
+	import_navaid_data()
+	import_navfix_data()
+
+
+def setup_navdb_lookups():
+	rnd = Random(random_seed)
+	db = synthetic_navdb(rnd, synthetic_navpoint_count)
+	codes = [rnd.choice(list(db.by_code)) for i in range(navpoint_lookup_count)]
+	return db, codes
+
+def run_navdb_findAll(state):
+	db, codes = state
+	for code in codes:
+		db.findAll(code)
+
+def run_navdb_findClosest(state):
+	db, codes = state
+	for code in codes:
+		db.findClosest(centre, code=code)
+
+def run_navdb_subDB(state):
+	db, codes = state
+	db.subDB(lambda p: centre.distanceTo(p.coordinates) <= settings.radar_range)
+
+def run_navdb_rangeSubDB(state):
+	db, codes = state
+	db.rangeSubDB(centre, settings.radar_range)
+
+
+def setup_shortest_route():
+	db, grid = synthetic_airway_grid()
+	n = airway_grid_size - 1
+	return db, [(grid[0][0], grid[n][n]), (grid[n][0], grid[0][n]), (grid[n // 2][0], grid[n // 2][n])]
+
+def run_shortest_route(state):
+	db, pairs = state
+	for p1, p2 in pairs:
+		db.shortestRoute(p1, p2)
+
+
+def setup_taxi_route():
+	return synthetic_ground_net()
+
+def run_taxi_route(state):
+	gnet, src, goal = state
+	gnet.shortestTaxiRoute(src, goal, True)
+
+
+
+## RADAR AND CONFLICTS
+
+def mk_setup_radar_scan(contact_count):
+	def setup():
+		aircraft, strips = synthetic_traffic(Random(random_seed), contact_count)
+		reset_session(aircraft, strips)
+		radar = Radar(None)
+		radar.scan() # first scan picks up all contacts
+		return radar
+	return setup
+
+def run_radar_scan(radar):
+	radar.scan()
+
+
+def setup_path_conflicts():
+	rnd = Random(random_seed)
+	aircraft, strips = synthetic_traffic(rnd, 12 * conflict_pair_count) # one in six ACFT gets a linked strip
+	reset_session(aircraft, strips)
+	linked = [s.linkedAircraft() for s in strips if s.linkedAircraft() != None]
+	return [(linked[i], linked[-1 - i]) for i in range(len(linked) // 2)]
+
+def run_path_conflicts(pairs):
+	for acft1, acft2 in pairs:
+		path_conflict_test(acft1, acft2)
+
+
+
+## DECODING AND ENCODING
+
+def setup_fgms_packets():
+	rnd = Random(random_seed)
+	packets = []
+	for i in range(fgms_packet_count):
+		props = { FGMS_prop_XPDR_capability: 2, FGMS_prop_XPDR_code: int('%o' % (0o1000 + i)), \
+			FGMS_prop_XPDR_alt: rnd.randint(0, 40000), FGMS_prop_XPDR_ias: rnd.randint(100, 300) }
+		packets.append(mkFgmsMsg_position('BMK%03d' % i, 'Aircraft/A320/Models/A320.xml', random_coords(rnd, 1), \
+			rnd.uniform(0, 40000), hdg=rnd.uniform(0, 360), properties=props))
+	return packets
+
+def run_fgms_decoding(packets):
+	for packet in packets:
+		decode_FGMS_position_message(packet)
+
+
+def setup_teaching_stream():
+	'''
+	framed messages, cut into socket reads
+	'''
+	stream = bytearray()
+	for msg in synthetic_teaching_msgs(Random(random_seed), teaching_msg_count):
+		TeachingMsgFramer.frame(msg, stream)
+	return [bytes(stream[i:i+teaching_socket_read_size]) for i in range(0, len(stream), teaching_socket_read_size)]
+
+def run_teaching_stream(reads):
+	framer = TeachingMsgFramer()
+	for data in reads:
+		framer.feed(data)
+
+
+def synthetic_strips():
+	rnd = Random(random_seed)
+	strips = []
+	for i in range(strip_count):
+		strip = Strip()
+		strip.writeDetail(FPL.CALLSIGN, 'BMK%03d' % i)
+		strip.writeDetail(FPL.ACFT_TYPE, 'A320')
+		strip.writeDetail(FPL.WTC, 'M')
+		strip.writeDetail(FPL.ICAO_DEP, 'LSZH')
+		strip.writeDetail(FPL.ICAO_ARR, 'LFPG')
+		strip.writeDetail(FPL.CRUISE_ALT, 'FL%03d' % (10 * rnd.randint(20, 39)))
+		strip.writeDetail(FPL.TAS, Speed(rnd.randint(300, 480)))
+		strip.writeDetail(FPL.ROUTE, 'GERSA UN853 BALSI DCT ROTIX')
+		strip.writeDetail(FPL.COMMENTS, 'Benchmark strip\nwith a back\\slash')
+		strip.writeDetail(assigned_SQ_detail, 0o1000 + i)
+		strip.writeDetail(assigned_heading_detail, Heading(rnd.randint(1, 72) * 5, False))
+		strip.writeDetail(assigned_altitude_detail, 'FL%03d' % (10 * rnd.randint(8, 35)))
+		strip.writeDetail(assigned_speed_detail, Speed(rnd.randint(16, 30) * 10))
+		strip.writeDetail(rack_detail, 'Default')
+		strips.append(strip)
+	return strips
+
+
+def setup_strip_refresh():
+	'''
+	a strip board with a tenth of callsigns duplicated, and a third of strips linked to radar contacts
+	'''
+	rnd = Random(random_seed)
+	aircraft, strips = synthetic_traffic(rnd, 3 * live_strip_count)
+	for i, strip in enumerate(strips):
+		if i % 10 == 9:
+			strip.writeDetail(FPL.CALLSIGN, strips[i - 1].callsign().lower())
+		strip.writeDetail(rack_detail, 'Default')
+	reset_session(aircraft, strips)
+	env.strips.refreshViews()
+	return env.strips
+
+def run_strip_refresh(model):
+	model.refreshViews()
+
+
+def synthetic_online_FPLs(rnd):
+	fpls = []
+	for i in range(online_FPL_count):
+		fpl = FPL({ FPL.CALLSIGN: 'BMK%04d' % i, FPL.ACFT_TYPE: 'A320', FPL.ICAO_DEP: 'LSZH', FPL.ICAO_ARR: 'LFPG', \
+			FPL.TIME_OF_DEP: now() + timedelta(minutes=rnd.randint(-6000, 6000)), FPL.EET: timedelta(minutes=rnd.randint(30, 300)) })
+		fpl.markAsOnline(i)
+		fpls.append(fpl)
+	return fpls
+
+def setup_FPL_merge():
+	'''
+	a model holding the online flight plans, and a new download of the same with every tenth one replaced
+	'''
+	rnd = Random(random_seed)
+	model = FlightPlanModel(None)
+	model.mergeOnlineFPLs(synthetic_online_FPLs(rnd))
+	download = synthetic_online_FPLs(rnd)
+	for i in range(0, online_FPL_count, 10):
+		download[i].markAsOnline(online_FPL_count + i)
+	return model, download
+
+def run_FPL_merge(state):
+	model, download = state
+	model.mergeOnlineFPLs(download)
+
+
+def setup_METAR_fetches():
+	'''
+	a local server with simulated latency, and its METAR URLs fetched once (revalidated in runs)
+	'''
+	pages = { '/%04d.TXT' % i: (b'2020/01/01 12:00\nX%03d 011200Z 24010KT 9999 FEW030 12/05 Q1015' % i, '"v%d"' % i) \
+		for i in range(fake_METAR_station_count) }
+	server = FakeServer(pages)
+	server.start()
+	state = server, HttpClient(), [server.URL(page) for page in pages]
+	try:
+		run_METAR_fetches(state)
+	except:
+		server.stop()
+		raise
+	return state
+
+def run_METAR_fetches(state):
+	server, client, urls = state
+	client.fanOut(lambda url: client.request(url, conditional=True), urls)
+
+def teardown_METAR_fetches(state):
+	server, client, urls = state
+	server.stop()
+
+def run_strip_encoding(strips):
+	for strip in strips:
+		strip.encodeDetails(handover_details)
+
+
+def setup_strip_decoding():
+	return [strip.encodeDetails(handover_details) for strip in synthetic_strips()]
+
+def run_strip_decoding(encoded):
+	for enc in encoded:
+		Strip.fromEncodedDetails(enc)
+
+
+def run_strip_board_encoding(strips):
+	encode_strip_board(['Default'], strips)
+
+def setup_strip_board_decoding():
+	return encode_strip_board(['Default'], synthetic_strips())
+
+def run_strip_board_decoding(encoded):
+	decode_strip_board(encoded)
+
+
+def setup_received_strip_routes():
+	route_navpoints = [Airfield('LSZH', EarthCoords(47.46, 8.55), 'Zurich'), Airfield('LFPG', EarthCoords(49.01, 2.55), 'Paris CDG'), \
+		Fix('GERSA', EarthCoords(47.7, 7.9)), Fix('BALSI', EarthCoords(48.2, 6)), Fix('ROTIX', EarthCoords(48.6, 4))]
+	for p in route_navpoints: # those of the synthetic strip route, unless real data loaded
+		if world_navpoint_db.findAll(p.code) == []:
+			world_navpoint_db.add(p)
+	return setup_strip_decoding()
+
+def run_received_strip_routes(encoded):
+	for enc in encoded:
+		Strip.fromEncodedDetails(enc).lookup(parsed_route_detail)
+
+
+def run_voice_interpretation(strings):
+	for s in strings:
+		interpret_string(s)
+
+
+
+
+all_benchmarks = [
+	Benchmark('coords.distanceTo x%d' % coords_pair_count, setup_coords_pairs, run_distanceTo),
+	Benchmark('coords.moved x%d' % coords_pair_count, setup_coords_moves, run_moved),
+	Benchmark('geodesy.distances_from x%d' % (2 * coords_pair_count), setup_batch_distances, run_batch_distances),
+	Benchmark('geodesy.moved_batch x%d' % coords_pair_count, setup_batch_moves, run_batch_moves),
+	Benchmark('geodesy.cartesian_to_geodetic_batch x%d' % coords_pair_count, setup_batch_geodetic, run_batch_geodetic),
+	Benchmark('MagneticFieldModel.declination x%d' % declination_query_count, setup_declinations, run_declinations),
+	Benchmark('Heading/Speed/StdPressureAlt updates x%d' % value_update_count, setup_value_updates, run_value_updates),
+	Benchmark('NavDB.load X-plane nav+fix', setup_navdb_loading, run_navdb_loading, repeat=3),
+	Benchmark('NavDB.findAll x%d' % navpoint_lookup_count, setup_navdb_lookups, run_navdb_findAll),
+	Benchmark('NavDB.findClosest x%d' % navpoint_lookup_count, setup_navdb_lookups, run_navdb_findClosest),
+	Benchmark('NavDB.subDB radar range', setup_navdb_lookups, run_navdb_subDB),
+	Benchmark('NavDB.rangeSubDB radar range', setup_navdb_lookups, run_navdb_rangeSubDB),
+	Benchmark('RoutingDB.shortestRoute x3', setup_shortest_route, run_shortest_route),
+	Benchmark('GroundNetwork.shortestTaxiRoute', setup_taxi_route, run_taxi_route)
+] + [
+	Benchmark('Radar.scan %d contacts' % n, mk_setup_radar_scan(n), run_radar_scan) for n in radar_contact_counts
+] + [
+	Benchmark('path_conflict_test x%d' % conflict_pair_count, setup_path_conflicts, run_path_conflicts),
+	Benchmark('decode_FGMS_position_message x%d' % fgms_packet_count, setup_fgms_packets, run_fgms_decoding),
+	Benchmark('TeachingMsgFramer.feed %d messages' % teaching_msg_count, setup_teaching_stream, run_teaching_stream),
+	Benchmark('Strip.encodeDetails x%d' % strip_count, synthetic_strips, run_strip_encoding),
+	Benchmark('Strip.fromEncodedDetails x%d' % strip_count, setup_strip_decoding, run_strip_decoding),
+	Benchmark('encode_strip_board %d strips' % strip_count, synthetic_strips, run_strip_board_encoding),
+	Benchmark('decode_strip_board %d strips' % strip_count, setup_strip_board_decoding, run_strip_board_decoding),
+	Benchmark('Strip route lookups x%d received strips' % strip_count, setup_received_strip_routes, run_received_strip_routes),
+	Benchmark('LiveStripModel.refreshViews %d strips' % live_strip_count, setup_strip_refresh, run_strip_refresh),
+	Benchmark('FlightPlanModel.mergeOnlineFPLs x%d' % online_FPL_count, setup_FPL_merge, run_FPL_merge),
+	Benchmark('HttpClient.fanOut %d METAR revalidations (local server)' % fake_METAR_station_count, setup_METAR_fetches, run_METAR_fetches, \
+			teardown=teardown_METAR_fetches),
+	Benchmark('interpret_string x%d' % len(voice_strings), (lambda: voice_strings), run_voice_interpretation)
+]
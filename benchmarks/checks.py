@@ -0,0 +1,291 @@
+from os import path, remove, close
+from time import monotonic
+from tempfile import mkstemp
+from random import Random
+from urllib.error import URLError
+
+from session.teacher import TeachingMsgFramer
+
+from data.coords import EarthCoords, WGS84_geodetic_to_cartesian_metres, cartesian_metres_to_WGS84_geodetic
+from data.params import Heading
+from data.nav import world_navpoint_db
+from data.fpl import FPL
+from data.strip import Strip, assigned_SQ_detail
+import data.geodesy as geodesy
+
+from models.discardedStrips import DiscardedStripModel, discarded_strips_kept_in_memory
+
+from ext.xplane import import_navaid_data, import_navfix_data, fallback_navaid_file, fallback_navfix_file
+from ext.httpClient import HttpClient, Endpoint, backoff_initial_delay
+
+from benchmarks.fakeServer import FakeServer
+
+from benchmarks.cases import random_seed, centre, synthetic_navdb, synthetic_teaching_msgs, \
+		synthetic_navpoint_count, teaching_msg_count
+from benchmarks.harness import Check, BenchmarkSkipped, expect
+
+
+# ---------- Constants ----------
+
+page_body = b'2020/01/01 12:00\nLSZH 011200Z 24010KT 9999 FEW030 12/05 Q1015'
+max_fragment_size = 17 # bytes
+geodesy_point_count = 500
+discarded_strip_count = 3 * discarded_strips_kept_in_memory # so that most are spilled to the archive file
+discarded_strip_searches = 40
+range_query_count = 40
+range_query_radii = [20, 100, 300] # NM
+geodesy_tolerances = { # max absolute difference between batch and scalar results
+	'NM': 1e-9,
+	'degrees': 1e-9,
+	'metres': 1e-6,
+	'ft': 1e-5
+}
+
+# -------------------------------
+
+
+# Correctness checks of the code benchmarked in benchmarks.cases, run with: python3 -m benchmarks.run --check
+
+
+## HTTP CLIENT
+
+def check_conditional_requests():
+	server = FakeServer({ '/page': (page_body, '"v1"') }, latency=0)
+	server.start()
+	try:
+		client = HttpClient()
+		url = server.URL('/page')
+		expect(client.request(url, conditional=True) == page_body, 'wrong body on first request')
+		expect(client.request(url, conditional=True) == page_body, 'wrong body on revalidation')
+		expect(server.not_modified_count == 1, 'expected 1 "not modified" response; got %d' % server.not_modified_count)
+		client.request(url)
+		expect(server.not_modified_count == 1, 'validators sent with a non-conditional request')
+		server.pages['/page'] = b'changed', '"v2"'
+		expect(client.request(url, conditional=True) == b'changed', 'changed page not downloaded')
+		expect(server.connection_count == 1, 'connection not kept alive (%d opened)' % server.connection_count)
+	finally:
+		server.stop()
+
+
+def check_redirections():
+	redirections = { '/moved': (301, '/page'), '/see-other': (303, '/moved'), '/loop': (302, '/loop') }
+	server = FakeServer({ '/page': (page_body, None) }, redirections=redirections, latency=0)
+	server.start()
+	try:
+		client = HttpClient()
+		expect(client.request(server.URL('/moved')) == page_body, 'redirection not followed')
+		expect(client.request(server.URL('/see-other'), postData=b'x=1') == page_body, 'POST redirection not followed')
+		try:
+			client.request(server.URL('/loop'))
+			expect(False, 'redirection loop not detected')
+		except URLError:
+			pass
+	finally:
+		server.stop()
+
+
+def check_failure_backoff():
+	server = FakeServer({ '/page': (page_body, None) }, latency=0)
+	server.start()
+	try:
+		client = HttpClient()
+		endpoint = Endpoint('fake service')
+		url = server.URL('/page')
+		client.request(url, endpoint=endpoint)
+		server.stop()
+		try:
+			client.request(url, endpoint=endpoint)
+			expect(False, 'no error with server down')
+		except URLError:
+			pass
+		expect(endpoint.backoff_delay == backoff_initial_delay, 'backoff not started on failure')
+		server.start()
+		request_count = server.request_count
+		try:
+			client.request(url, endpoint=endpoint)
+			expect(False, 'request sent while backing off')
+		except URLError:
+			pass
+		expect(server.request_count == request_count, 'server reached while backing off')
+		expect(client.request(url) == page_body, 'request without endpoint failed')
+		endpoint.backoff_end = monotonic() # backoff delay expired
+		expect(client.request(url, endpoint=endpoint) == page_body, 'request failed after backoff delay')
+		expect(endpoint.backoff_delay == 0, 'backoff not reset on success')
+	finally:
+		server.stop()
+
+
+def check_closed_idle_connection():
+	server = FakeServer({ '/page': (page_body, None) }, latency=0)
+	server.start()
+	try:
+		client = HttpClient()
+		url = server.URL('/page')
+		client.request(url)
+		server.stop() # closes the connection kept alive by client
+		server.start()
+		expect(client.request(url) == page_body, 'request on closed idle connection not retried')
+		expect(server.connection_count == 2, 'expected 2 connections; got %d' % server.connection_count)
+	finally:
+		server.stop()
+
+
+
+## GEODESY
+
+def angle_difference(a1, a2):
+	return abs((a1 - a2 + 180) % 360 - 180)
+
+
+def expect_close(batch_values, scalar_values, unit, what, angles=False):
+	diff = angle_difference if angles else (lambda v1, v2: abs(v1 - v2))
+	errors = [diff(v1, v2) for v1, v2 in zip(batch_values, scalar_values)]
+	expect(len(errors) == len(scalar_values) == len(batch_values), '%s: wrong result count' % what)
+	expect(max(errors) <= geodesy_tolerances[unit], '%s: max error %g %s' % (what, max(errors), unit))
+
+
+def mk_check_geodesy_batches(with_numpy):
+	'''
+	batch results compared with the scalar EarthCoords operations and WGS84 conversions in data.coords
+	'''
+	def check():
+		if with_numpy and not geodesy.numpy_available:
+			raise BenchmarkSkipped('NumPy not installed')
+		rnd = Random(random_seed)
+		points = [EarthCoords(rnd.uniform(-85, 85), rnd.uniform(-180, 180)) for i in range(geodesy_point_count)]
+		radials = [Heading(rnd.uniform(0, 360), True) for p in points]
+		distances = [rnd.uniform(0, 500) for p in points]
+		alts = [rnd.uniform(-1000, 40000) for p in points]
+		EarthCoords.setRadarPos(centre)
+		numpy_available = geodesy.numpy_available
+		geodesy.numpy_available = with_numpy
+		try:
+			expect(geodesy.use_numpy(points) == with_numpy, 'wrong batch implementation selected')
+			expect_close(geodesy.distances_from(centre, points), [centre.distanceTo(p) for p in points], 'NM', 'distances_from')
+			expect_close(geodesy.headings_from(centre, points), \
+				[centre.headingTo(p).trueAngle() for p in points], 'degrees', 'headings_from', angles=True)
+			moved = geodesy.moved_batch(points, radials, distances)
+			moved_ref = [p.moved(r, d) for p, r, d in zip(points, radials, distances)]
+			expect_close([p.lat for p in moved], [p.lat for p in moved_ref], 'degrees', 'moved_batch latitudes')
+			expect_close([p.lon for p in moved], [p.lon for p in moved_ref], 'degrees', 'moved_batch longitudes', angles=True)
+			xs, ys = geodesy.radar_projection(points)
+			radar_ref = [p.toRadarCoords() for p in points]
+			expect_close(xs, [rc.x() for rc in radar_ref], 'NM', 'radar_projection X')
+			expect_close(ys, [rc.y() for rc in radar_ref], 'NM', 'radar_projection Y')
+			ecef = geodesy.geodetic_to_cartesian_batch(points, alts)
+			ecef_ref = [WGS84_geodetic_to_cartesian_metres(p, alt) for p, alt in zip(points, alts)]
+			for i, axis in enumerate('XYZ'):
+				expect_close(ecef[i], [xyz[i] for xyz in ecef_ref], 'metres', 'geodetic_to_cartesian_batch %s' % axis)
+			geodetic = geodesy.cartesian_to_geodetic_batch(*([xyz[i] for xyz in ecef_ref] for i in range(3)))
+			geodetic_ref = [cartesian_metres_to_WGS84_geodetic(*xyz) for xyz in ecef_ref]
+			expect_close([p.lat for p, alt in geodetic], [p.lat for p, alt in geodetic_ref], 'degrees', 'cartesian_to_geodetic_batch latitudes')
+			expect_close([p.lon for p, alt in geodetic], [p.lon for p, alt in geodetic_ref], \
+				'degrees', 'cartesian_to_geodetic_batch longitudes', angles=True)
+			expect_close([alt for p, alt in geodetic], [alt for p, alt in geodetic_ref], 'ft', 'cartesian_to_geodetic_batch altitudes')
+			expect_close([alt for p, alt in geodetic], alts, 'ft', 'cartesian_to_geodetic_batch round trip altitudes')
+		finally:
+			geodesy.numpy_available = numpy_available
+	return check
+
+
+
+
+## NAVIGATION DATA
+
+def check_navdb_range_queries():
+	'''
+	rangeSubDB against subDB with a range predicate, on recorded X-plane data if available
+	'''
+	rnd = Random(random_seed)
+	if path.exists(fallback_navaid_file) and path.exists(fallback_navfix_file):
+		world_navpoint_db.clear()
+		import_navaid_data()
+		import_navfix_data()
+		db = world_navpoint_db
+		centres = [EarthCoords(rnd.uniform(-70, 70), rnd.uniform(-180, 180)) for i in range(range_query_count)]
+	else:
+		db = synthetic_navdb(rnd, synthetic_navpoint_count)
+		centres = [EarthCoords(centre.lat + rnd.uniform(-6, 6), centre.lon + rnd.uniform(-6, 6)) for i in range(range_query_count)]
+	for ref in centres:
+		radius = rnd.choice(range_query_radii)
+		expected = db.subDB(lambda p: ref.distanceTo(p.coordinates) <= radius)
+		result = db.rangeSubDB(ref, radius)
+		what = 'range %g NM of %s' % (radius, ref.toString())
+		expect(result.by_type == expected.by_type, '%s: type lists differ' % what)
+		expect(result.by_code == { c: plst for c, plst in expected.by_code.items() if plst != [] }, '%s: code lists differ' % what)
+
+
+
+
+## DISCARDED STRIPS
+
+def check_discarded_strip_search():
+	'''
+	DiscardedStripModel.search against a scan of all rows, with strips spilled to the archive and some forgotten
+	'''
+	rnd = Random(random_seed)
+	fd, archive_file = mkstemp(suffix='.lst')
+	try:
+		model = DiscardedStripModel(None)
+		model.archive_file = archive_file
+		for i in range(discarded_strip_count):
+			strip = Strip()
+			strip.writeDetail(FPL.CALLSIGN, rnd.choice(['BMK%02d' % n for n in range(20)] + [None]))
+			strip.writeDetail(assigned_SQ_detail, rnd.choice([None, 0o1000 + rnd.randrange(10)]))
+			model.addStrip(strip)
+		model.forgetEntries(lambda entry: entry.seq % 7 == 0)
+		n = model.rowCount()
+		rows = [(model.getStrip(row).callsign(), model.getStrip(row).lookup(assigned_SQ_detail), model.entries[n - 1 - row].timestamp) \
+				for row in range(n)]
+		for i in range(discarded_strip_searches):
+			callsign = rnd.choice([None, 'bmk%02d' % rnd.randrange(20), 'XXX'])
+			squawk = rnd.choice([None, 0o1000 + rnd.randrange(10)])
+			t_lo, t_hi = sorted(rnd.choice(rows)[2] for j in range(2))
+			time_range = rnd.choice([None, (t_lo, t_hi), (None, t_hi), (t_lo, None)])
+			expected = [row for row, (cs, sq, t) in enumerate(rows) \
+				if (callsign == None or cs != None and cs.upper() == callsign.upper()) and (squawk == None or sq == squawk) \
+					and (time_range == None or (time_range[0] == None or t >= time_range[0]) and (time_range[1] == None or t <= time_range[1]))]
+			result = model.search(callsign=callsign, squawk=squawk, time_range=time_range)
+			expect(result == expected, 'search %s/%s/%s: rows %s; expected %s' % (callsign, squawk, time_range, result, expected))
+	finally:
+		close(fd)
+		remove(archive_file)
+
+
+
+
+## TEACHING WIRE
+
+def check_teaching_msg_fragmentation():
+	rnd = Random(random_seed)
+	msgs = synthetic_teaching_msgs(rnd, teaching_msg_count)
+	stream = bytearray()
+	for msg in msgs:
+		TeachingMsgFramer.frame(msg, stream)
+	for fragment_size in [None, 1, max_fragment_size]: # None: random sizes up to max
+		framer = TeachingMsgFramer()
+		received = []
+		i = 0
+		while i < len(stream):
+			n = rnd.randint(1, max_fragment_size) if fragment_size == None else fragment_size
+			received.extend(framer.feed(stream[i:i+n]))
+			i += n
+		expect(len(received) == len(msgs), '%d messages rebuilt out of %d' % (len(received), len(msgs)))
+		expect(all(r.type == m.type and r.data == m.data for r, m in zip(received, msgs)), 'messages altered')
+		expect(len(framer.buffer) == 0, 'bytes left in framer buffer')
+	expect(len(TeachingMsgFramer().feed(stream)) == len(msgs), 'messages lost when fed all at once')
+
+
+
+
+all_checks = [
+	Check('geodesy batches vs. scalar (NumPy)', mk_check_geodesy_batches(True)),
+	Check('geodesy batches vs. scalar (without NumPy)', mk_check_geodesy_batches(False)),
+	Check('NavDB.rangeSubDB vs. subDB', check_navdb_range_queries),
+	Check('DiscardedStripModel.search vs. scan', check_discarded_strip_search),
+	Check('HttpClient conditional requests', check_conditional_requests),
+	Check('HttpClient redirections', check_redirections),
+	Check('HttpClient failure backoff', check_failure_backoff),
+	Check('HttpClient retry on closed idle connection', check_closed_idle_connection),
+	Check('TeachingMsgFramer fragmented reads', check_teaching_msg_fragmentation)
+]
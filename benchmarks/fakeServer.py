@@ -0,0 +1,105 @@
+
+from time import sleep
+from socket import SHUT_RDWR
+from threading import Thread
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+# ---------- Constants ----------
+
+default_latency = .02 # s; simulated network and server processing delay per request
+
+# -------------------------------
+
+
+class FakeServer:
+	'''
+	Local HTTP/1.1 server (keep-alive) for network client code to be run without remote services.
+	"pages" maps URL paths (with query) to (body bytes, ETag or None) pairs; ETags are used to answer
+	conditional requests. "redirections" maps paths to (status, location) pairs. Unknown paths get a 404.
+	Every response is delayed by the given latency. The server keeps its port when stopped and restarted.
+	'''
+	def __init__(self, pages, redirections={}, latency=default_latency):
+		self.pages = pages
+		self.redirections = redirections
+		self.latency = latency
+		self.request_count = 0
+		self.not_modified_count = 0
+		self.connection_count = 0
+		self.open_connections = []
+		self.port = 0 # chosen on first start
+		self.server = None
+		self.thread = None
+	
+	def URL(self, path):
+		return 'http://127.0.0.1:%d%s' % (self.port, path)
+	
+	def start(self):
+		fake_server = self
+		class Handler(BaseHTTPRequestHandler):
+			protocol_version = 'HTTP/1.1'
+			def setup(self):
+				BaseHTTPRequestHandler.setup(self)
+				fake_server.connection_count += 1
+				fake_server.open_connections.append(self.connection)
+			def handle(self):
+				try:
+					BaseHTTPRequestHandler.handle(self)
+				except ConnectionError: # closed by client, or by stop
+					pass
+			def do_GET(self):
+				fake_server.respond(self)
+			def do_POST(self):
+				self.rfile.read(int(self.headers.get('Content-Length', 0)))
+				fake_server.respond(self)
+			def log_message(self, fmt, *args):
+				pass
+		self.server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+		self.server.daemon_threads = True
+		self.port = self.server.server_port
+		self.thread = Thread(target=self.server.serve_forever, daemon=True)
+		self.thread.start()
+	
+	def stop(self):
+		'''
+		also closes the connections kept alive
+		'''
+		self.server.shutdown()
+		self.server.server_close()
+		for connection in self.open_connections:
+			try:
+				connection.shutdown(SHUT_RDWR)
+			except OSError: # already closed
+				pass
+		self.open_connections.clear()
+	
+	def respond(self, handler): # called in a server thread
+		self.request_count += 1
+		sleep(self.latency)
+		if handler.path in self.redirections:
+			status, location = self.redirections[handler.path]
+			handler.send_response(status)
+			handler.send_header('Location', location)
+			handler.send_header('Content-Length', '0')
+			handler.end_headers()
+			return
+		try:
+			body, etag = self.pages[handler.path]
+		except KeyError:
+			handler.send_response(404)
+			handler.send_header('Content-Length', '0')
+			handler.end_headers()
+			return
+		if etag != None and handler.headers.get('If-None-Match') == etag:
+			self.not_modified_count += 1
+			handler.send_response(304)
+			handler.send_header('ETag', etag)
+			handler.send_header('Content-Length', '0')
+			handler.end_headers()
+		else:
+			handler.send_response(200)
+			if etag != None:
+				handler.send_header('ETag', etag)
+			handler.send_header('Content-Length', str(len(body)))
+			handler.end_headers()
+			handler.wfile.write(body)
@@ -0,0 +1,205 @@
+
+import json
+import platform
+from time import perf_counter
+from datetime import datetime, timezone
+from subprocess import run, PIPE, DEVNULL
+
+from data.nav import world_navpoint_db
+from data.route import parse_route
+
+
+# ---------- Constants ----------
+
+default_repeat = 5 # timed rounds per benchmark; best round is the reference
+min_round_time = .2 # s; calls per round are doubled until a round lasts at least this
+max_calls_per_round = 1 << 20
+regression_threshold = .1 # relative slow-down of the best round reported as a regression
+
+# -------------------------------
+
+
+class BenchmarkSkipped(Exception):
+	pass
+
+
+class CheckFailed(Exception):
+	pass
+
+
+def expect(condition, message):
+	if not condition:
+		raise CheckFailed(message)
+
+
+
+class SavedNavpointDB:
+	'''
+	Context manager restoring the world navpoint DB on exit, so that cases loading or adding navpoints
+	do not change the data seen by the cases run after them. Routes parsed meanwhile are forgotten.
+	'''
+	def __enter__(self):
+		self.by_type = { t: lst[:] for t, lst in world_navpoint_db.by_type.items() }
+		self.by_code = { code: lst[:] for code, lst in world_navpoint_db.by_code.items() }
+		return self
+	
+	def __exit__(self, exc_type, exc_value, traceback):
+		world_navpoint_db.clear()
+		world_navpoint_db.by_type.update(self.by_type)
+		world_navpoint_db.by_code.update(self.by_code)
+		parse_route.cache_clear()
+		return False
+
+
+
+class Benchmark:
+	'''
+	"setup" is called once, untimed, and returns the state passed to every "run" call.
+	It may raise BenchmarkSkipped, e.g. if a recorded data file is unavailable.
+	"teardown", if given, is called with the state after the runs, e.g. to stop a server.
+	'''
+	def __init__(self, name, setup, run, repeat=None, teardown=None):
+		self.name = name
+		self.setup = setup
+		self.run = run
+		self.repeat = repeat # None for default
+		self.teardown = teardown
+	
+	def _timeRound(self, state, calls):
+		f = self.run
+		t0 = perf_counter()
+		for i in range(calls):
+			f(state)
+		return perf_counter() - t0
+	
+	def measure(self, repeat=default_repeat):
+		'''
+		returns a dict of JSON-friendly values; times in microseconds per call
+		'''
+		state = self.setup()
+		try:
+			calls = 1
+			while calls < max_calls_per_round and self._timeRound(state, calls) < min_round_time:
+				calls *= 2
+			if self.repeat != None:
+				repeat = min(self.repeat, repeat)
+			rounds = sorted(self._timeRound(state, calls) / calls for i in range(max(1, repeat)))
+		finally:
+			if self.teardown != None:
+				self.teardown(state)
+		return { 'calls_per_round': calls, 'rounds': len(rounds),
+			'best_us': 1e6 * rounds[0], 'median_us': 1e6 * rounds[len(rounds) // 2], 'mean_us': 1e6 * sum(rounds) / len(rounds) }
+
+
+
+class Check:
+	'''
+	Correctness check of benchmarked code: "test" is called with no arguments, and raises CheckFailed
+	(see "expect") on wrong behaviour. It may raise BenchmarkSkipped like a benchmark setup.
+	'''
+	def __init__(self, name, test):
+		self.name = name
+		self.test = test
+
+
+
+
+# =============================================== #
+
+#                    REPORTS                      #
+
+# =============================================== #
+
+
+def current_commit():
+	try:
+		proc = run(['git', 'rev-parse', '--short', 'HEAD'], stdout=PIPE, stderr=DEVNULL, universal_newlines=True)
+		return proc.stdout.strip() if proc.returncode == 0 else None
+	except OSError:
+		return None
+
+
+def run_benchmarks(benchmarks, repeat=default_repeat, verbose=True):
+	'''
+	returns a report dict, ready to save as JSON
+	'''
+	results = {}
+	skipped = []
+	for b in benchmarks:
+		if verbose:
+			print('%s... ' % b.name, end='', flush=True)
+		try:
+			with SavedNavpointDB():
+				results[b.name] = res = b.measure(repeat=repeat)
+		except BenchmarkSkipped as err:
+			skipped.append(b.name)
+			if verbose:
+				print('skipped (%s)' % err)
+		else:
+			if verbose:
+				print('%.2f us' % res['best_us'])
+	return { 'commit': current_commit(), 'date': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC'),
+		'python': platform.python_version(), 'machine': platform.machine(),
+		'benchmarks': results, 'skipped': skipped }
+
+
+def run_checks(checks, verbose=True):
+	'''
+	returns the list of failed check names
+	'''
+	failed = []
+	for check in checks:
+		if verbose:
+			print('%s... ' % check.name, end='', flush=True)
+		try:
+			with SavedNavpointDB():
+				check.test()
+		except BenchmarkSkipped as err:
+			if verbose:
+				print('skipped (%s)' % err)
+		except CheckFailed as err:
+			failed.append(check.name)
+			if verbose:
+				print('FAILED: %s' % err)
+		except Exception as err:
+			failed.append(check.name)
+			if verbose:
+				print('FAILED with exception: %s: %s' % (type(err).__name__, err))
+		else:
+			if verbose:
+				print('OK')
+	return failed
+
+
+def save_report(report, file_name):
+	with open(file_name, 'w', encoding='utf8') as f:
+		json.dump(report, f, indent=2, sort_keys=True)
+
+
+def load_report(file_name):
+	with open(file_name, encoding='utf8') as f:
+		return json.load(f)
+
+
+def compare_reports(old, new, threshold=regression_threshold):
+	'''
+	returns a pair: list of comparison lines (str), list of regressed benchmark names
+	'''
+	lines = []
+	regressions = []
+	for name, res in sorted(new['benchmarks'].items()):
+		try:
+			before = old['benchmarks'][name]['best_us']
+		except KeyError:
+			lines.append('%s: %.2f us (new)' % (name, res['best_us']))
+			continue
+		ratio = res['best_us'] / before if before > 0 else 1
+		if ratio > 1 + threshold:
+			regressions.append(name)
+			flag = '  REGRESSION'
+		elif ratio < 1 - threshold:
+			flag = '  improved'
+		else:
+			flag = ''
+		lines.append('%s: %.2f -> %.2f us (x%.2f)%s' % (name, before, res['best_us'], ratio, flag))
+	return lines, regressions
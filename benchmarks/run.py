@@ -0,0 +1,73 @@
+
+import re
+import sys
+from os import makedirs
+
+from PyQt5.QtCore import QCoreApplication
+
+from session.config import settings, output_files_dir
+from data.util import some
+from ext.resources import load_aircraft_db, load_airlines_db
+
+from benchmarks.harness import run_benchmarks, run_checks, save_report, load_report, compare_reports, default_repeat
+from benchmarks.cases import all_benchmarks
+from benchmarks.checks import all_checks
+
+
+# ---------- Constants ----------
+
+valued_option_regexp = re.compile('--([^=]+)=(.+)')
+
+usage = '''Usage: python3 -m benchmarks.run [options]  (from the ATC-pie root directory)
+Options:
+  --only=<regexp>     run benchmarks (or checks) whose name matches
+  --check             run correctness checks instead of benchmarks; exit status is 1 on failure
+  --repeat=<int>      timed rounds per benchmark (default %d)
+  --save=<file>       JSON report file (default in output directory, named after current commit)
+  --compare=<file>    previous JSON report to compare against; exit status is 1 on regression''' % default_repeat
+
+# -------------------------------
+
+
+if __name__ == "__main__":
+	app = QCoreApplication(sys.argv) # some benchmarked objects are QObjects; the event loop is never started
+	only = save_file = compare_file = None
+	repeat = default_repeat
+	checking = False
+	for arg in sys.argv[1:]:
+		match = valued_option_regexp.fullmatch(arg)
+		if arg == '--check':
+			checking = True
+		elif match and match.group(1) == 'only':
+			only = re.compile(match.group(2))
+		elif match and match.group(1) == 'repeat' and match.group(2).isdigit():
+			repeat = int(match.group(2))
+		elif match and match.group(1) == 'save':
+			save_file = match.group(2)
+		elif match and match.group(1) == 'compare':
+			compare_file = match.group(2)
+		else:
+			sys.exit(usage)
+	
+	load_aircraft_db()
+	load_airlines_db()
+	if checking:
+		failed = run_checks([c for c in all_checks if only == None or only.search(c.name)])
+		if failed != []:
+			sys.exit('%d check(s) failed: %s' % (len(failed), ', '.join(failed)))
+		sys.exit(0)
+	selected = [b for b in all_benchmarks if only == None or only.search(b.name)]
+	report = run_benchmarks(selected, repeat=repeat)
+	
+	if save_file == None:
+		makedirs(output_files_dir, exist_ok=True)
+		save_file = settings.outputFileName('benchmarks-%s' % some(report['commit'], 'nocommit'), sessionID=False, ext='json')
+	save_report(report, save_file)
+	print('Report saved to: %s' % save_file)
+	
+	if compare_file != None:
+		lines, regressions = compare_reports(load_report(compare_file), report)
+		print('Compared with: %s' % compare_file)
+		print('\n'.join(lines))
+		if regressions != []:
+			sys.exit('%d regression(s): %s' % (len(regressions), ', '.join(regressions)))
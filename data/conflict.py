@@ -6,6 +6,7 @@ from session.env import env
 
 from data.util import ordered_pair, intervals_intersect, flatten
 from data.coords import breakUpLine, m2NM
+from data.geodesy import radar_projection
 from data.params import StdPressureAlt, distance_flown, Speed
 from data.strip import assigned_heading_detail, parsed_route_detail
 from data.db import wake_turb_cat
@@ -31,20 +32,27 @@ class NoPath(Exception):
 
 
 
-def shapes_intersect(sh1, sh2):
+def shapes_boxes(shapes):
 	'''
 	a shape is a list of connected lines
+	returns for each shape the list of radar coordinate intervals (x, y) covered by its lines
+	all points are projected in one batch
 	'''
-	for r1 in sh1:
-		r1a = r1[0].toRadarCoords()
-		r1b = r1[1].toRadarCoords()
-		for r2 in sh2:
-			r2a = r2[0].toRadarCoords()
-			r2b = r2[1].toRadarCoords()
-			if intervals_intersect(ordered_pair(r1a.x(), r1b.x()), ordered_pair(r2a.x(), r2b.x())) \
-					and intervals_intersect(ordered_pair(r1a.y(), r1b.y()), ordered_pair(r2a.y(), r2b.y())):
-				return True
-	return False
+	xs, ys = radar_projection([p for shape in shapes for line in shape for p in line])
+	result = []
+	i = 0
+	for shape in shapes:
+		result.append([(ordered_pair(xs[j], xs[j + 1]), ordered_pair(ys[j], ys[j + 1])) for j in range(i, i + 2 * len(shape), 2)])
+		i += 2 * len(shape)
+	return result
+
+
+def boxes_intersect(boxes1, boxes2):
+	return any(intervals_intersect(bx1, bx2) and intervals_intersect(by1, by2) for bx1, by1 in boxes1 for bx2, by2 in boxes2)
+
+
+def shapes_intersect(sh1, sh2):
+	return boxes_intersect(*shapes_boxes([sh1, sh2]))
 
 
 
@@ -103,7 +111,7 @@ def horizontal_path(acft, hdg=True, rte=True, ttf=None, div=False):
 			if waypoints == None and rte:
 				route = strip.lookup(parsed_route_detail)
 				if route != None:
-					waypoints = [route.waypoint(i).coordinates for i in range(route.currentLegIndex(pos), route.legCount())]
+					waypoints = route.remainingWaypointCoordinates(pos)
 			if waypoints != None:
 				dist_limit = None if ttf == None else distance_flown(ttf, speed)
 				div_dist = distance_flown(route_division_ttf, speed)
@@ -163,9 +171,10 @@ def path_conflict_test(acft1, acft2):
 		divs2 = horizontal_path(acft2, hdg=True, rte=True, ttf=settings.route_conflict_anticipation, div=True)
 	except NoPath:
 		return Conflict.NO_CONFLICT
-	for i, div1 in enumerate(divs1):
-		for div2 in divs2[max(0, i-1) : i+2]:
-			if shapes_intersect(div1, div2): # heading or route assigned to both, and in conflict; check for altitudes
+	boxes2 = shapes_boxes(divs2)
+	for i, div1 in enumerate(shapes_boxes(divs1)):
+		for div2 in boxes2[max(0, i-1) : i+2]:
+			if boxes_intersect(div1, div2): # heading or route assigned to both, and in conflict; check for altitudes
 				ass1 = vertical_assignment(acft1)
 				ass2 = vertical_assignment(acft2)
 				if ass1 == None or ass2 == None:
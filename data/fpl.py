@@ -56,6 +56,7 @@ class FPL:
 		ROUTE: 'ROUTE',
 		COMMENTS: 'COMMENTS'
 	}
+	edit_count = 0 # all FPLs: online ID and detail changes, for indexes to detect them
 	# End STATIC
 	
 	def __init__(self, details={}):
@@ -139,6 +140,7 @@ class FPL:
 	def markAsOnline(self, online_id):
 		self.online_id = online_id
 		self.online_status = FPL.FILED
+		FPL.edit_count += 1
 	
 	def setOnlineStatus(self, status):
 		self.online_status = status
@@ -153,6 +155,7 @@ class FPL:
 		old_value = self.details[detail]
 		if new_value != old_value:
 			self.details[detail] = new_value
+			FPL.edit_count += 1
 			if self.existsOnline() and detail not in self.modified_details:
 				self.modified_details[detail] = old_value
 	
@@ -160,4 +163,5 @@ class FPL:
 		for d, v in self.modified_details.items():
 			self.details[d] = v
 		self.modified_details.clear()
+		FPL.edit_count += 1
 
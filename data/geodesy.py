@@ -0,0 +1,187 @@
+
+from math import radians, sin, cos
+
+try:
+	import numpy
+	numpy_available = True
+except ImportError:
+	numpy_available = False
+
+from data.coords import EarthCoords, Earth_radius_NM, m2ft, WGS84_equrad, ra2, e2, e4, \
+		WGS84_geodetic_to_cartesian_metres, cartesian_metres_to_WGS84_geodetic
+
+
+# ---------- Constants ----------
+
+numpy_min_batch_size = 16 # below this, array set-up costs more than the scalar loop it replaces
+
+# -------------------------------
+
+
+# Batch versions of the EarthCoords operations and WGS84 conversions in data.coords.
+# Arguments are sequences of EarthCoords; results are sequences indexed the same way (numpy arrays if
+# numpy is installed and the batch is large enough, lists otherwise). Without numpy, the scalar
+# versions are simply looped over, so results are identical.
+
+
+def use_numpy(points):
+	return numpy_available and len(points) >= numpy_min_batch_size
+
+
+def _radians_arrays(points):
+	lat = numpy.radians(numpy.fromiter((p.lat for p in points), float, count=len(points)))
+	lon = numpy.radians(numpy.fromiter((p.lon for p in points), float, count=len(points)))
+	return lat, lon
+
+
+
+
+## ======= Distances and bearings =======
+
+def distances_from(ref, points):
+	'''
+	great circle distances in NM from "ref" to every point
+	'''
+	if not use_numpy(points):
+		return [ref.distanceTo(p) for p in points]
+	lat1 = radians(ref.lat)
+	lat2, lon2 = _radians_arrays(points)
+	c = sin(lat1) * numpy.sin(lat2) + cos(lat1) * numpy.cos(lat2) * numpy.cos(lon2 - radians(ref.lon))
+	return numpy.arccos(numpy.clip(c, -1, 1)) * Earth_radius_NM
+
+
+def nearest(ref, points):
+	'''
+	returns the index of the point closest to "ref", and its distance in NM; "points" must not be empty
+	'''
+	if not use_numpy(points):
+		dist, i = min((ref.distanceTo(p), i) for i, p in enumerate(points))
+		return i, dist
+	distances = distances_from(ref, points)
+	i = int(numpy.argmin(distances))
+	return i, float(distances[i])
+
+
+def indices_within(ref, points, radius):
+	'''
+	returns the list of indices of the points strictly closer than "radius" NM to "ref"
+	'''
+	distances = distances_from(ref, points)
+	if use_numpy(points):
+		return numpy.flatnonzero(distances < radius).tolist()
+	return [i for i, d in enumerate(distances) if d < radius]
+
+
+def headings_from(ref, points):
+	'''
+	initial true headings in degrees [0, 360) of the great circle routes from "ref" to every point
+	'''
+	if not use_numpy(points):
+		return [ref.headingTo(p).trueAngle() for p in points]
+	lat1 = radians(ref.lat)
+	lat2, lon2 = _radians_arrays(points)
+	dlon = lon2 - radians(ref.lon)
+	theta = numpy.arctan2(numpy.sin(dlon) * numpy.cos(lat2), cos(lat1) * numpy.sin(lat2) - sin(lat1) * numpy.cos(lat2) * numpy.cos(dlon))
+	return numpy.degrees(theta) % 360
+
+
+def distance_matrix(points1, points2=None):
+	'''
+	result[i][j] is the distance in NM from points1[i] to points2[j] (points1[j] if points2 is not given)
+	'''
+	if points2 == None:
+		points2 = points1
+	if not numpy_available or len(points1) * len(points2) < numpy_min_batch_size:
+		return [[p1.distanceTo(p2) for p2 in points2] for p1 in points1]
+	lat1, lon1 = _radians_arrays(points1)
+	lat2, lon2 = _radians_arrays(points2)
+	c = numpy.outer(numpy.sin(lat1), numpy.sin(lat2)) \
+		+ numpy.outer(numpy.cos(lat1), numpy.cos(lat2)) * numpy.cos(lon2[numpy.newaxis, :] - lon1[:, numpy.newaxis])
+	return numpy.arccos(numpy.clip(c, -1, 1)) * Earth_radius_NM
+
+
+
+
+## ======= Positions =======
+
+def moved_batch(points, radials, distances):
+	'''
+	"radials" is a sequence of Heading; "distances" a sequence of NM values; both indexed like "points"
+	returns the EarthCoords list of final positions
+	'''
+	if not use_numpy(points):
+		return [p.moved(r, d) for p, r, d in zip(points, radials, distances)]
+	lat1, lon1 = _radians_arrays(points)
+	a = numpy.radians(numpy.fromiter((r.trueAngle() for r in radials), float, count=len(points)))
+	d = numpy.asarray(distances, dtype=float) / Earth_radius_NM
+	lat2 = numpy.arcsin(numpy.sin(lat1) * numpy.cos(d) + numpy.cos(lat1) * numpy.sin(d) * numpy.cos(a))
+	lon2 = lon1 + numpy.arctan2(numpy.sin(a) * numpy.sin(d) * numpy.cos(lat1), numpy.cos(d) - numpy.sin(lat1) * numpy.sin(lat2))
+	lat_res = (numpy.degrees(lat2) + 90) % 180 - 90
+	lon_res = (numpy.degrees(lon2) + 180) % 360 - 180
+	return [EarthCoords(lat, lon) for lat, lon in zip(lat_res.tolist(), lon_res.tolist())]
+
+
+def radar_projection(points):
+	'''
+	returns a pair of lists: x and y radar coordinates (NM, inverted Y axis) of the points
+	CAUTION: radar position must be set, as with EarthCoords.toRadarCoords
+	'''
+	ref = EarthCoords.ref_pos
+	if not use_numpy(points):
+		xs = [EarthCoords.lon_1deg * (p.lon - ref.lon) for p in points]
+		ys = [EarthCoords.lat_1deg * (ref.lat - p.lat) for p in points]
+		return xs, ys
+	lat = numpy.fromiter((p.lat for p in points), float, count=len(points))
+	lon = numpy.fromiter((p.lon for p in points), float, count=len(points))
+	return (EarthCoords.lon_1deg * (lon - ref.lon)).tolist(), (EarthCoords.lat_1deg * (ref.lat - lat)).tolist()
+
+
+
+
+## ======= WGS84 geodesy =======
+
+def geodetic_to_cartesian_batch(points, alts_ft):
+	'''
+	returns three sequences: Earth centred X, Y and Z in metres
+	'''
+	if not use_numpy(points):
+		xyz = [WGS84_geodetic_to_cartesian_metres(p, alt) for p, alt in zip(points, alts_ft)]
+		return [x for x, y, z in xyz], [y for x, y, z in xyz], [z for x, y, z in xyz]
+	phi, l = _radians_arrays(points)
+	h = numpy.asarray(alts_ft, dtype=float) / m2ft
+	sphi = numpy.sin(phi)
+	n = WGS84_equrad / numpy.sqrt(1 - e2 * sphi * sphi)
+	cphi = numpy.cos(phi)
+	return (h + n) * cphi * numpy.cos(l), (h + n) * cphi * numpy.sin(l), (h + n - e2 * n) * sphi
+
+
+def cartesian_to_geodetic_batch(xs, ys, zs):
+	'''
+	returns the list of (EarthCoords, ft AMSL) pairs
+	'''
+	if not use_numpy(xs):
+		return [cartesian_metres_to_WGS84_geodetic(x, y, z) for x, y, z in zip(xs, ys, zs)]
+	x = numpy.asarray(xs, dtype=float)
+	y = numpy.asarray(ys, dtype=float)
+	z = numpy.asarray(zs, dtype=float)
+	XXpYY = x*x + y*y
+	centre = XXpYY + z*z < 25 # degenerate: too close to Earth centre
+	sqrtXXpYY = numpy.sqrt(XXpYY)
+	p = XXpYY * ra2
+	q = z*z * (1 - e2) * ra2
+	r = 1 / 6 * (p + q - e4)
+	with numpy.errstate(divide='ignore', invalid='ignore'):
+		s = e4 * p * q / (4 * r * r * r)
+		s = numpy.where((s >= -2) & (s <= 0), 0., s)
+		t = numpy.cbrt(1 + s + numpy.sqrt(s * (2 + s)))
+		u = r * (1 + t + 1/t)
+		v = numpy.sqrt(u * u + e4 * q)
+		w = e2 * (u + v - q) / (2 * v)
+		k = numpy.sqrt(u + v + w*w) - w
+		d = k * sqrtXXpYY / (k + e2)
+		sqrtDDpZZ = numpy.sqrt(d*d + z*z)
+		lon = numpy.degrees(2 * numpy.arctan2(y, x + sqrtXXpYY))
+		lat = numpy.degrees(2 * numpy.arctan2(z, d + sqrtDDpZZ))
+		ft = m2ft * (k + e2 - 1) * sqrtDDpZZ / k
+	return [(EarthCoords(0, 0), -WGS84_equrad) if c else (EarthCoords(la, lo), h) \
+		for c, la, lo, h in zip(centre.tolist(), lat.tolist(), lon.tolist(), ft.tolist())]
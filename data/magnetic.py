@@ -0,0 +1,124 @@
+
+from math import radians, degrees, sin, cos, asin, atan2, sqrt
+from datetime import date
+
+from data.coords import WGS84_geodetic_to_cartesian_metres
+
+
+# ---------- Constants ----------
+
+geomag_reference_radius = 6371200 # m; radius of the spherical harmonic expansion (WMM geomagnetic reference sphere)
+declination_cache_precision = 2 # decimal places of lat/lon degrees in cache keys (about 1 km)
+model_validity_period = 5 # years after the model epoch
+
+# -------------------------------
+
+
+class MagneticFieldModel:
+	'''
+	A spherical harmonic model of the main geomagnetic field, e.g. the World Magnetic Model (WMM).
+	Coefficients are Schmidt semi-normalised Gauss coefficients in nT at the model epoch (decimal year),
+	and their secular variations in nT/year.
+	'''
+	def __init__(self):
+		self.name = None
+		self.epoch = None
+		self.max_degree = 0
+		self.g = {} # (n, m) -> nT
+		self.h = {} # (n, m) -> nT
+		self.g_dot = {} # (n, m) -> nT/year
+		self.h_dot = {} # (n, m) -> nT/year
+		self.declination_cache = {} # (lat, lon, date) -> degrees; lat/lon rounded to declination_cache_precision
+		self.validity_warned = False
+	
+	def isLoaded(self):
+		return self.epoch != None
+	
+	def setEpoch(self, name, epoch):
+		self.name = name
+		self.epoch = epoch
+		self.validity_warned = False
+		self.declination_cache.clear()
+	
+	def setCoefficients(self, n, m, g, h, g_dot, h_dot):
+		self.g[n, m] = g
+		self.h[n, m] = h
+		self.g_dot[n, m] = g_dot
+		self.h_dot[n, m] = h_dot
+		self.max_degree = max(self.max_degree, n)
+		self.declination_cache.clear()
+	
+	def declination(self, coords, day=None):
+		'''
+		magnetic declination in degrees (East positive) at ground level, cached per location and day
+		day is a datetime.date (default today); the model is extrapolated outside of its validity period,
+		with a warning printed on the first such evaluation
+		'''
+		if day == None:
+			day = date.today()
+		key = round(coords.lat, declination_cache_precision), round(coords.lon, declination_cache_precision), day
+		try:
+			return self.declination_cache[key]
+		except KeyError:
+			year = decimal_year(day)
+			if not self.validity_warned and not self.epoch <= year < self.epoch + model_validity_period:
+				print('WARNING: date %s is outside of the %s magnetic model validity period; declination is extrapolated.' % (day, self.name))
+				self.validity_warned = True
+			north, east, down = self.fieldComponents(coords, 0, year)
+			result = self.declination_cache[key] = degrees(atan2(east, north))
+			return result
+	
+	def fieldComponents(self, coords, alt_ft, year):
+		'''
+		returns the X (north), Y (east) and Z (down) geodetic components of the field in nT
+		'''
+		dt = year - self.epoch
+		# Geocentric spherical coordinates
+		x, y, z = WGS84_geodetic_to_cartesian_metres(coords, alt_ft)
+		r = sqrt(x * x + y * y + z * z)
+		lat_gc = asin(z / r)
+		lon = radians(coords.lon)
+		cos_theta = sin(lat_gc) # theta is the colatitude
+		sin_theta = cos(lat_gc)
+		# Schmidt semi-normalised associated Legendre functions and their derivatives wrt theta
+		p = { (0, 0): 1 }
+		dp = { (0, 0): 0 }
+		for n in range(1, self.max_degree + 1):
+			for m in range(n + 1):
+				if m == n:
+					k = 1 if n == 1 else sqrt((2 * n - 1) / (2 * n))
+					p[n, n] = k * sin_theta * p[n - 1, n - 1]
+					dp[n, n] = k * (cos_theta * p[n - 1, n - 1] + sin_theta * dp[n - 1, n - 1])
+				else:
+					k1 = (2 * n - 1) / sqrt(n * n - m * m)
+					k2 = sqrt(((n - 1) * (n - 1) - m * m) / (n * n - m * m))
+					p[n, m] = k1 * cos_theta * p[n - 1, m] - k2 * p.get((n - 2, m), 0)
+					dp[n, m] = k1 * (cos_theta * dp[n - 1, m] - sin_theta * p[n - 1, m]) - k2 * dp.get((n - 2, m), 0)
+		# Spherical field components
+		b_r = b_theta = b_phi = 0
+		ratio = geomag_reference_radius / r
+		for n in range(1, self.max_degree + 1):
+			radial_factor = ratio ** (n + 2)
+			for m in range(n + 1):
+				g = self.g[n, m] + dt * self.g_dot[n, m]
+				h = self.h[n, m] + dt * self.h_dot[n, m]
+				cos_m_lon = cos(m * lon)
+				sin_m_lon = sin(m * lon)
+				b_r += (n + 1) * radial_factor * (g * cos_m_lon + h * sin_m_lon) * p[n, m]
+				b_theta -= radial_factor * (g * cos_m_lon + h * sin_m_lon) * dp[n, m]
+				b_phi += radial_factor * m * (g * sin_m_lon - h * cos_m_lon) * p[n, m]
+		b_phi /= sin_theta # NOTE: undefined at the geographic poles
+		# Rotation from geocentric to geodetic frame
+		psi = lat_gc - radians(coords.lat)
+		north_gc, east, down_gc = -b_theta, b_phi, -b_r
+		return north_gc * cos(psi) - down_gc * sin(psi), east, north_gc * sin(psi) + down_gc * cos(psi)
+
+
+
+def decimal_year(day):
+	year_length = (date(day.year + 1, 1, 1) - date(day.year, 1, 1)).days
+	return day.year + (day.toordinal() - date(day.year, 1, 1).toordinal()) / year_length
+
+
+
+world_magnetic_model = MagneticFieldModel()
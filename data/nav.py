@@ -1,10 +1,15 @@
 
-from data.coords import EarthCoords
+from math import floor, radians, degrees, sin, cos, asin
+
+from data.coords import EarthCoords, Earth_radius_NM
+from data.geodesy import nearest, distances_from
 from data.util import A_star_search
 
 
 # ---------- Constants ----------
 
+navpoint_index_cell_size = 1 # degrees of lat/lon per range index cell
+
 # -------------------------------
 
 
@@ -107,10 +112,20 @@ class NavpointError(Exception):
 
 
 
+def range_index_cell(lat_cell, lon_cell):
+	'''
+	cell key for range indexing, with longitude wrap-around; args are cell numbers (degrees / navpoint_index_cell_size)
+	'''
+	lon_cell_count = 360 // navpoint_index_cell_size
+	return lat_cell, (lon_cell + lon_cell_count // 2) % lon_cell_count - lon_cell_count // 2
+
+
+
 class NavDB:
 	def __init__(self):
 		self.by_type = { t:[] for t in Navpoint.types } # type -> navpoint list (KeyError safe)
 		self.by_code = {} # code -> navpoint list (KeyError is possible)
+		self.range_index = None # (lat cell, lon cell) -> ((type, index in type list), navpoint) list; built on first range query
 	
 	def add(self, p):
 		self.by_type[p.type].append(p)
@@ -118,11 +133,14 @@ class NavDB:
 			self.by_code[p.code].append(p)
 		except KeyError:
 			self.by_code[p.code] = [p]
+		if self.range_index != None:
+			self._indexPoint((p.type, len(self.by_type[p.type]) - 1), p)
 	
 	def clear(self):
 		for key in self.by_type:
 			self.by_type[key] = []
 		self.by_code.clear()
+		self.range_index = None
 	
 	def byType(self, t): # WARNING: do not alter result
 		return self.by_type[t]
@@ -152,9 +170,9 @@ class NavDB:
 		'''
 		candidates = self.findAll(code, types)
 		if len(candidates) > 0:
-			closest = min(candidates, key=(lambda p: ref.distanceTo(p.coordinates)))
-			if maxDist == None or closest.coordinates.distanceTo(ref) <= maxDist:
-				return closest
+			i, dist = nearest(ref, [p.coordinates for p in candidates])
+			if maxDist == None or dist <= maxDist:
+				return candidates[i]
 		raise NavpointError(str(code) if code != None else '')
 	
 	def findAirfield(self, icao):
@@ -171,6 +189,69 @@ class NavDB:
 		result.by_type = { t: [p for p in plst if pred(p)] for t, plst in self.by_type.items() }
 		result.by_code = { c: [p for p in plst if pred(p)] for c, plst in self.by_code.items() if plst != [] }
 		return result
+	
+	
+	## RANGE QUERIES
+	
+	def _indexPoint(self, rank, p):
+		cell = range_index_cell(floor(p.coordinates.lat / navpoint_index_cell_size), floor(p.coordinates.lon / navpoint_index_cell_size))
+		try:
+			self.range_index[cell].append((rank, p))
+		except KeyError:
+			self.range_index[cell] = [(rank, p)]
+	
+	def _buildRangeIndex(self):
+		self.range_index = {}
+		for t, plst in self.by_type.items():
+			for i, p in enumerate(plst):
+				self._indexPoint((t, i), p)
+	
+	def _cellsInRange(self, centre, radius):
+		'''
+		returns the keys of all index cells that may contain points within "radius" NM of "centre"
+		'''
+		angle = radius / Earth_radius_NM # radians
+		lat_lo = degrees(radians(centre.lat) - angle)
+		lat_hi = degrees(radians(centre.lat) + angle)
+		lon_cell_count = 360 // navpoint_index_cell_size
+		if lat_lo <= -90 or lat_hi >= 90 or sin(angle) >= cos(radians(centre.lat)): # range includes a pole
+			lon_cells = range(lon_cell_count)
+		else: # longitude extent of a spherical cap
+			half_width = degrees(asin(sin(angle) / cos(radians(centre.lat))))
+			lo = floor((centre.lon - half_width) / navpoint_index_cell_size)
+			hi = floor((centre.lon + half_width) / navpoint_index_cell_size)
+			lon_cells = range(lo, hi + 1) if hi - lo < lon_cell_count else range(lon_cell_count)
+		return [range_index_cell(lat_cell, lon_cell) for lon_cell in lon_cells \
+			for lat_cell in range(floor(max(-90, lat_lo) / navpoint_index_cell_size), floor(min(90, lat_hi) / navpoint_index_cell_size) + 1)]
+	
+	def findInRange(self, centre, radius):
+		'''
+		returns the list of navpoints within "radius" NM of "centre" (inclusive), ordered as in findAll
+		the first call builds the range index; it is then kept up to date until the DB is cleared
+		'''
+		if self.range_index == None:
+			self._buildRangeIndex()
+		candidates = []
+		for cell in self._cellsInRange(centre, radius):
+			candidates.extend(self.range_index.get(cell, []))
+		candidates.sort(key=(lambda rp: rp[0]))
+		distances = distances_from(centre, [p.coordinates for rank, p in candidates])
+		return [p for (rank, p), dist in zip(candidates, distances) if dist <= radius]
+	
+	def rangeSubDB(self, centre, radius):
+		'''
+		same as subDB with a range predicate, without scanning the whole DB; navpoint objects are shared
+		NOTE: codes without any navpoint in range are left out of "by_code" (subDB maps them to empty lists)
+		'''
+		result = NavDB()
+		in_range = self.findInRange(centre, radius)
+		for p in in_range:
+			result.by_type[p.type].append(p)
+		selected = { id(p) for p in in_range }
+		for p in in_range:
+			if p.code not in result.by_code: # same order as in this DB's code list
+				result.by_code[p.code] = [q for q in self.by_code[p.code] if id(q) in selected]
+		return result
 
 
 
@@ -16,10 +16,19 @@ FL_reading_regexp = re.compile('FL ?(\\d+)$', flags=re.IGNORECASE)
 
 min_significant_TTF_speed = 10 # kt
 
+interned_FL_range = -10, 600 # flight levels of shared StdPressureAlt instances
+interned_speed_max = 999 # kt; integer speeds up to this value are shared
+
 # -------------------------------
 
 
 
+# Heading, StdPressureAlt and Speed are immutable value types: never assign to their attributes.
+# Instances are slotted, and common values are interned, i.e. constructing one returns a shared instance.
+# They pickle as constructor calls so that unpickling also returns interned instances.
+
+
+
 
 #--------------------------------------------#
 #                                            #
@@ -29,16 +38,33 @@ min_significant_TTF_speed = 10 # kt
 
 
 class Heading:
+	__slots__ = 'is_true', 'deg_angle'
+	
 	# STATIC:
 	declination = None
+	interned_true = {}     # int degrees -> Heading
+	interned_magnetic = {} # int degrees -> Heading
 	
-	def __init__(self, deg, true_hdg):
+	def __new__(cls, deg=None, true_hdg=None): # no args when unpickling an object saved before slots
 		'''
 		deg is float angle in degrees with 0/360 North and counting clockwise
 		true_hdg is a bool to choose between a true heading (True) or a magnetic heading (False)
 		'''
-		self.is_true = true_hdg
-		self.deg_angle = deg % 360
+		interned = Heading.interned_true if true_hdg else Heading.interned_magnetic
+		if deg in interned:
+			return interned[deg]
+		hdg = object.__new__(cls)
+		if deg != None:
+			hdg.is_true = true_hdg
+			hdg.deg_angle = deg % 360
+		return hdg
+	
+	def __reduce__(self):
+		return Heading, (self.deg_angle, self.is_true)
+	
+	def __setstate__(self, state): # objects pickled before slots
+		self.is_true = state['is_true']
+		self.deg_angle = state['deg_angle']
 	
 	def __add__(self, a):
 		return Heading(self.deg_angle + a, self.is_true)
@@ -76,6 +102,10 @@ class Heading:
 		return ['N', 'NE', 'E', 'SE', 'S', 'SW', 'S', 'NW'][int((hdg + 45 / 2) % 360 * 8 / 360)]
 
 
+Heading.interned_true = { deg: Heading(deg, True) for deg in range(360) }
+Heading.interned_magnetic = { deg: Heading(deg, False) for deg in range(360) }
+
+
 
 
 
@@ -91,9 +121,12 @@ class StdPressureAlt:
 	'''
 	The class for pressure-altitudes, as are reported by a transponder
 	'''
+	__slots__ = '_ft',
 	
 	#---
 	# STATIC:
+	interned = {} # ft multiple of 100 -> StdPressureAlt
+	
 	def fromFL(fl):
 		return StdPressureAlt(100 * fl)
 	
@@ -125,8 +158,18 @@ class StdPressureAlt:
 		raise ValueError(reading)
 	#---
 	
-	def __init__(self, ft):
-		self._ft = ft
+	def __new__(cls, ft=None): # no arg when unpickling an object saved before slots
+		if ft in StdPressureAlt.interned:
+			return StdPressureAlt.interned[ft]
+		alt = object.__new__(cls)
+		alt._ft = ft
+		return alt
+	
+	def __reduce__(self):
+		return StdPressureAlt, (self._ft,)
+	
+	def __setstate__(self, state): # objects pickled before slots
+		self._ft = state['_ft']
 	
 	def __add__(self, diff):
 		return StdPressureAlt(self.ft1013() + diff)
@@ -154,6 +197,9 @@ class StdPressureAlt:
 			return diff
 
 
+StdPressureAlt.interned = { 100 * fl: StdPressureAlt(100 * fl) for fl in range(interned_FL_range[0], interned_FL_range[1] + 1) }
+
+
 
 
 
@@ -173,9 +219,22 @@ class Speed:
 	'''
 	A class for HORIZONTAL speeds, typically measured in knots
 	'''
-	def __init__(self, kt):
-		self.kt = kt
-		
+	__slots__ = 'kt',
+	interned = {} # int kt -> Speed
+	
+	def __new__(cls, kt=None): # no arg when unpickling an object saved before slots
+		if kt in Speed.interned:
+			return Speed.interned[kt]
+		spd = object.__new__(cls)
+		spd.kt = kt
+		return spd
+	
+	def __reduce__(self):
+		return Speed, (self.kt,)
+	
+	def __setstate__(self, state): # objects pickled before slots
+		self.kt = state['kt']
+	
 	def __str__(self):
 		return '%d kt' % rounded(self.kt)
 	
@@ -206,6 +265,9 @@ class Speed:
 		return Speed(self.kt / (1 + 2e-5 * alt.ft1013()))
 
 
+Speed.interned = { kt: Speed(kt) for kt in range(interned_speed_max + 1) }
+
+
 
 
 
@@ -6,6 +6,7 @@ from session.env import env
 
 from data.util import pop_all
 from data.coords import m2NM
+from data.geodesy import indices_within
 from data.strip import soft_link_detail, assigned_SQ_detail, runway_box_detail, received_from_detail
 from data.fpl import FPL
 from data.utc import now
@@ -33,7 +34,7 @@ class Radar(QObject):
 	
 	def __init__(self, gui):
 		QObject.__init__(self)
-		self.ticker = Ticker(self.scan, parent=gui)
+		self.ticker = Ticker(self.scan, parent=gui, name='radar scan')
 		self.last_sweep = now() # to be updated with current time at each blip
 		self.aircraft_list = []          # Aircraft list
 		self.blips_invisible = {}        # str -> int; number of blips for which ACFT callsign has been invisible
@@ -126,11 +127,14 @@ class Radar(QObject):
 		
 		## UPDATE POSITION/ROUTE WARNINGS
 		conflicts = { acft.identifier: Conflict.NO_CONFLICT for acft in self.aircraft_list }
+		contact_positions = [acft.coords() for acft in self.aircraft_list]
 		traffic_for_route_checks = []
 		for strip in env.strips.listStrips(): # check for position conflicts and build list of traffic to check for routes later
 			acft = strip.linkedAircraft()
 			if acft != None and acft.identifier in conflicts: # controlled traffic with radar contact
-				for other in self.aircraft_list:
+				# only contacts closer than horizontal separation can be near misses
+				for i in indices_within(acft.coords(), contact_positions, settings.horizontal_separation):
+					other = self.aircraft_list[i]
 					if other is not acft and position_conflict_test(acft, other) == Conflict.NEAR_MISS: # positive separation loss detected
 						conflicts[acft.identifier] = conflicts[other.identifier] = Conflict.NEAR_MISS
 				if not bypass_route_conflict_check(strip):
@@ -1,9 +1,13 @@
+from bisect import bisect_right
+from functools import lru_cache
+
 from data.nav import world_navpoint_db, Airfield, NavpointError
 
 
 # ---------- Constants ----------
 
 route_acceptable_WPdistToArr_increase = 100 # NM
+parsed_route_cache_size = 512
 
 # -------------------------------
 
@@ -13,9 +17,23 @@ def airfield(a):
 	return a if isinstance(a, Airfield) else world_navpoint_db.findAirfield(a)
 
 
+@lru_cache(maxsize=parsed_route_cache_size)
+def parse_route(dep, arr, init_string):
+	'''
+	Returns a Route shared by all callers with the same arguments, therefore NOT TO BE MODIFIED (dup it first),
+	or None if one of the end airfields is missing or unrecognised.
+	'''
+	try:
+		return Route(dep, arr, init_string)
+	except NavpointError:
+		return None
+
+
 
 
 class Route:
+	geometry_cache = None # class default for routes unpickled from before the cache existed
+	
 	def __init__(self, dep, arr, init_string):
 		'''
 		raises ValueError if 'dep' or 'arr' is an invalid airfield
@@ -46,6 +64,7 @@ class Route:
 		if self.enroute_waypoints !=[] and self.enroute_waypoints[-1] is self.arr and self.leg_specs[-1] == []:
 			del self.enroute_waypoints[-1]
 			del self.leg_specs[-1]
+		self.geometry_cache = None
 	
 	def dup(self):
 		dup = Route(self.dep, self.arr, '')
@@ -87,28 +106,48 @@ class Route:
 	
 	## METHODS
 	
+	def _geometry(self):
+		'''
+		Computed once until waypoints change. Returns a tuple of:
+		 - list of waypoint coordinates (index matches leg number)
+		 - list of leg lengths (index matches leg number)
+		 - for each enroute waypoint i, the negated max distance to arrival over waypoints i and after (non-decreasing, for bisect)
+		'''
+		if self.geometry_cache == None:
+			wp_coords = [self.waypoint(i).coordinates for i in range(self.legCount())]
+			leg_lengths = [p1.distanceTo(p2) for p1, p2 in zip([self.dep.coordinates] + wp_coords[:-1], wp_coords)]
+			neg_max_dist_to_arr = []
+			max_dist = 0
+			for wp in reversed(wp_coords[:-1]):
+				max_dist = max(max_dist, wp.distanceTo(self.arr.coordinates))
+				neg_max_dist_to_arr.insert(0, -max_dist)
+			self.geometry_cache = wp_coords, leg_lengths, neg_max_dist_to_arr
+		return self.geometry_cache
+	
 	def routePoints(self):
 		return [self.dep] + [self.waypoint(i) for i in range(self.legCount())]
 	
 	def totalDistance(self):
-		result = self.dep.coordinates.distanceTo(self.waypoint(0).coordinates)
-		for i in range(self.legCount() - 1):
-			result += self.waypoint(i).coordinates.distanceTo(self.waypoint(i + 1).coordinates)
-		return result
+		return sum(self._geometry()[1])
 	
 	def currentLegIndex(self, position):
 		'''
 		returns the number of the route leg to be followed, based on distance to arrival, given a position on Earth
 		0 is first; legCount-1 is last
 		'''
+		wp_coords, leg_lengths, neg_max_dist_to_arr = self._geometry()
 		dist_to_dep = position.distanceTo(self.dep.coordinates)
 		dist_to_arr = position.distanceTo(self.arr.coordinates)
-		if dist_to_dep < dist_to_arr and dist_to_dep < self.dep.coordinates.distanceTo(self.waypoint(0).coordinates):
+		if dist_to_dep < dist_to_arr and dist_to_dep < leg_lengths[0]:
 			return 0
-		for i in reversed(range(self.legCount() - 1)):
-			if self.waypoint(i).coordinates.distanceTo(self.arr.coordinates) >= dist_to_arr:
-				return i + 1
-		return 0
+		# Leg after the last waypoint at least as far from arrival; entries up to it have a max distance >= dist_to_arr
+		return bisect_right(neg_max_dist_to_arr, -dist_to_arr)
+	
+	def remainingWaypointCoordinates(self, position):
+		'''
+		coordinates of the waypoints still to fly to from given position, ending with arrival
+		'''
+		return self._geometry()[0][self.currentLegIndex(position):]
 	
 	def currentWaypoint(self, position):
 		return self.waypoint(self.currentLegIndex(position))
@@ -158,6 +197,7 @@ class Route:
 		returns the lost leg specs (before wp, after wp)
 		'''
 		leg = next(ileg for ileg in reversed(range(self.legCount() - 1)) if self.waypoint(ileg) is navpoint)
+		self.geometry_cache = None
 		del self.enroute_waypoints[leg]
 		lost_before = self.leg_specs.pop(leg)
 		lost_after = self.leg_specs.pop(leg)
@@ -169,6 +209,7 @@ class Route:
 		returns the lost leg spec
 		'''
 		leg = self.currentLegIndex(navpoint.coordinates)
+		self.geometry_cache = None
 		self.enroute_waypoints.insert(leg, navpoint)
 		old_leg_spec = self.legSpec(leg)
 		self.leg_specs[leg] = []
@@ -1,13 +1,13 @@
 
+from struct import Struct, error as StructError
 from datetime import datetime, timedelta, timezone
 
 from session.config import settings
 
 from data.util import some
 from data.fpl import FPL
-from data.nav import NavpointError
 from data.params import Heading, StdPressureAlt, Speed
-from data.route import Route
+from data.route import parse_route
 
 
 # ---------- Constants ----------
@@ -35,26 +35,41 @@ strip_editable_FPL_details = [FPL.CALLSIGN, FPL.ACFT_TYPE, FPL.WTC, FPL.ICAO_DEP
 handover_details = list(FPL.details) + \
 		[assigned_SQ_detail, assigned_heading_detail, assigned_altitude_detail, assigned_speed_detail]
 
+strip_board_magic = b'ATC-pie strips'
+strip_board_format_version = 2
+board_details = handover_details + [rack_detail, runway_box_detail, received_from_detail, \
+		recycled_detail, auto_printed_detail] # CAUTION: binary codes are list indices; only append
+
 # -------------------------------
 
 
-class Strip:	
+class Strip:
+	parsed_route_key = None # class default for strips unpickled from before routes were parsed on lookup
+	
 	def __init__(self):
 		self.details = {} # strip can contain any string or FPL detail key values
 		self.linked_aircraft = None
 		self.linked_FPL = None
+		self.change_count = 0 # incremented on every detail write or link change, for views to detect changes
+		self.parsed_route_key = None # (DEP, ARR, route) strings that self.parsed_route was parsed from
+		self.parsed_route = None
 	
 	def __str__(self):
 		return '[%s:%s]' % (some(self.lookup(rack_detail), ''), some(self.callsign(), ''))
 	
-	def _parseRoute(self):
-		try:
-			dep = self.lookup(FPL.ICAO_DEP, fpl=True)
-			arr = self.lookup(FPL.ICAO_ARR, fpl=True)
-			mid = self.lookup(FPL.ROUTE, fpl=True)
-			self.details[parsed_route_detail] = Route(some(dep, ''), some(arr, ''), some(mid, ''))
-		except NavpointError: # One of the end airports is missing or unrecognised
-			self.details[parsed_route_detail] = None
+	def _routeKey(self):
+		return tuple(some(self.lookup(d, fpl=True), '') for d in [FPL.ICAO_DEP, FPL.ICAO_ARR, FPL.ROUTE])
+	
+	def _parsedRoute(self):
+		'''
+		Parsed when looked up with different details from last time, including those of a linked FPL.
+		The Route is shared with other strips (see parse_route) unless modified with the route waypoint methods.
+		'''
+		key = self._routeKey()
+		if key != self.parsed_route_key:
+			self.parsed_route = parse_route(*key)
+			self.parsed_route_key = key
+		return self.parsed_route
 	
 	
 	## ENCODE/DECODE
@@ -103,6 +118,8 @@ class Strip:
 		'''
 		returns the value written on the strip. If None while 'fpl' is True: look up linked flight plan
 		'''
+		if key == parsed_route_detail:
+			return self._parsedRoute()
 		if key in self.details: # Strip has detail of its own
 			return self.details[key]
 		elif fpl and key in FPL.details and self.linkedFPL() != None:
@@ -213,8 +230,7 @@ class Strip:
 				del self.details[key]
 		else:
 			self.details[key] = value
-		if key in [FPL.ROUTE, FPL.ICAO_DEP, FPL.ICAO_ARR]:
-			self._parseRoute()
+		self.change_count += 1
 	
 	def linkFPL(self, fpl, autoFillOK=True):
 		'''
@@ -222,12 +238,13 @@ class Strip:
 		depending on auto-fill user setting (set autoFillOK=False to prevent)
 		'''
 		self.linked_FPL = fpl
-		self._parseRoute()
+		self.change_count += 1
 		if autoFillOK and fpl != None and settings.strip_autofill_on_FPL_link:
 			self.fillFromFPL()
 	
 	def linkAircraft(self, acft):
 		self.linked_aircraft = acft
+		self.change_count += 1
 	
 	def pushToFPL(self):
 		fpl = self.linkedFPL()
@@ -259,16 +276,179 @@ class Strip:
 	def insertRouteWaypoint(self, navpoint):
 		route = self.lookup(parsed_route_detail)
 		assert route != None, 'Strip.insertRouteWaypoint: invalid route'
+		route = route.dup() # parsed route may be shared
 		lost_specs = route.insertWaypoint(navpoint)
-		self.details[FPL.ROUTE] = route.enRouteStr() # bypass parse induced by writeDetail method
+		self._writeModifiedRoute(route)
 		return lost_specs
 	
 	def removeRouteWaypoint(self, navpoint):
 		route = self.lookup(parsed_route_detail)
 		assert route != None, 'Strip.removeRouteWaypoint: invalid route'
+		route = route.dup() # parsed route may be shared
 		lost_specs = route.removeWaypoint(navpoint)
-		self.details[FPL.ROUTE] = route.enRouteStr() # bypass parse induced by writeDetail method
+		self._writeModifiedRoute(route)
 		return lost_specs
+	
+	def _writeModifiedRoute(self, route):
+		self.details[FPL.ROUTE] = route.enRouteStr() # even if empty, unlike writeDetail
+		self.change_count += 1
+		self.parsed_route = route # no reparse of the new string, which could pick other navpoints
+		self.parsed_route_key = self._routeKey()
+
+
+
+
+
+
+
+## BINARY STRIP BOARDS
+
+# Strip board: racks, then FPLs linked to strips, then strips in board order.
+# Counts and lengths are little-endian unsigned shorts; online IDs and FPL indices are signed ints (-1 for none).
+# Detail blocks: count byte, then (board_details index byte, value type byte, value) entries.
+
+_u8 = Struct('<B')
+_u16 = Struct('<H')
+_i32 = Struct('<i')
+_entry_header = Struct('<BB')
+_str_entry_header = Struct('<BBH')
+
+_str_value_type = ord('s')
+_detail_value_types = { # type -> (type byte, value Struct, value to packed tuple, unpacked tuple to value)
+	bool: (ord('b'), Struct('<?'), (lambda v: (v,)), (lambda t: t[0])),
+	int: (ord('i'), Struct('<i'), (lambda v: (v,)), (lambda t: t[0])),
+	Speed: (ord('v'), Struct('<d'), (lambda v: (v.kt,)), (lambda t: Speed(t[0]))),
+	Heading: (ord('h'), Struct('<d?'), (lambda v: (v.deg_angle, v.is_true)), (lambda t: Heading(*t))),
+	datetime: (ord('t'), Struct('<q'), (lambda v: (int(v.timestamp()),)), (lambda t: datetime.fromtimestamp(t[0], timezone.utc))),
+	timedelta: (ord('e'), Struct('<i'), (lambda v: (int(v.total_seconds()),)), (lambda t: timedelta(seconds=t[0])))
+}
+_detail_value_decoders = { tb: (fmt, decode) for tb, fmt, encode, decode in _detail_value_types.values() }
+_board_detail_codes = { d: i for i, d in enumerate(board_details) }
+
+
+def _pack_str(parts, s):
+	b = s.encode('utf8')
+	parts.append(_u16.pack(len(b)))
+	parts.append(b)
+
+def _pack_details(parts, details):
+	entries = []
+	for d, v in details.items():
+		code = _board_detail_codes.get(d)
+		if code == None or v == None:
+			continue
+		if type(v) is str:
+			b = v.encode('utf8')
+			entries.append(_str_entry_header.pack(code, _str_value_type, len(b)) + b)
+		else:
+			try:
+				type_byte, fmt, encode, decode = _detail_value_types[type(v)]
+			except KeyError:
+				print('ERROR: Cannot encode %s detail value: %s' % (d, v))
+				continue
+			entries.append(_entry_header.pack(code, type_byte) + fmt.pack(*encode(v)))
+	parts.append(_u8.pack(len(entries)))
+	parts.extend(entries)
+
+
+class _BoardReader:
+	def __init__(self, data, pos):
+		self.data = data
+		self.pos = pos
+	
+	def unpack(self, fmt):
+		values = fmt.unpack_from(self.data, self.pos)
+		self.pos += fmt.size
+		return values
+	
+	def string(self):
+		n, = self.unpack(_u16)
+		if self.pos + n > len(self.data):
+			raise ValueError('Truncated string')
+		self.pos += n
+		return str(self.data[self.pos - n : self.pos], 'utf8')
+	
+	def details(self):
+		result = {}
+		for i in range(self.unpack(_u8)[0]):
+			code, type_byte = self.unpack(_entry_header)
+			if type_byte == _str_value_type:
+				result[board_details[code]] = self.string()
+			else:
+				fmt, decode = _detail_value_decoders[type_byte]
+				result[board_details[code]] = decode(self.unpack(fmt))
+		return result
+
+
+def encode_strip_board(rack_names, strips):
+	'''
+	Returns the binary encoding (bytes) of the strips with their board details and linked FPLs (not aircraft).
+	Raises ValueError if a value does not fit the format, e.g. a string longer than 65535 UTF-8 bytes.
+	'''
+	try:
+		parts = [strip_board_magic, _u8.pack(strip_board_format_version), _u16.pack(len(rack_names))]
+		for rack in rack_names:
+			_pack_str(parts, rack)
+		fpls = []
+		fpl_indices = {} # id(FPL) -> index in fpls
+		for strip in strips:
+			fpl = strip.linkedFPL()
+			if fpl != None and id(fpl) not in fpl_indices:
+				fpl_indices[id(fpl)] = len(fpls)
+				fpls.append(fpl)
+		parts.append(_u16.pack(len(fpls)))
+		for fpl in fpls:
+			parts.append(_i32.pack(some(fpl.online_id, -1)))
+			parts.append(_i32.pack(some(fpl.status(), -1)))
+			parts.append(_u16.pack(len(fpl.onlineComments())))
+			for comment in fpl.onlineComments():
+				_pack_str(parts, comment)
+			_pack_details(parts, fpl.details)
+		parts.append(_u16.pack(len(strips)))
+		for strip in strips:
+			fpl = strip.linkedFPL()
+			parts.append(_i32.pack(-1 if fpl == None else fpl_indices[id(fpl)]))
+			_pack_details(parts, strip.details)
+		return b''.join(parts)
+	except StructError as err:
+		raise ValueError('Cannot encode strip board: %s' % err)
+
+
+def decode_strip_board(data):
+	'''
+	Returns a (rack name list, strip list) pair; the strips are linked to new FPL objects, with their online IDs.
+	Raises ValueError if the data is not a valid encoding.
+	'''
+	if not data.startswith(strip_board_magic):
+		raise ValueError('Not a strip board')
+	reader = _BoardReader(data, len(strip_board_magic))
+	try:
+		version, = reader.unpack(_u8)
+		if version != strip_board_format_version:
+			raise ValueError('Unsupported strip board format version: %d' % version)
+		rack_names = [reader.string() for i in range(reader.unpack(_u16)[0])]
+		fpls = []
+		for i in range(reader.unpack(_u16)[0]):
+			online_id, = reader.unpack(_i32)
+			status, = reader.unpack(_i32)
+			comments = [reader.string() for j in range(reader.unpack(_u16)[0])]
+			fpl = FPL(reader.details())
+			if online_id != -1:
+				fpl.markAsOnline(online_id)
+				fpl.setOnlineStatus(None if status == -1 else status)
+				fpl.setOnlineComments(comments)
+			fpls.append(fpl)
+		strips = []
+		for i in range(reader.unpack(_u16)[0]):
+			strip = Strip()
+			ifpl, = reader.unpack(_i32)
+			strip.details.update(reader.details())
+			if ifpl != -1:
+				strip.linkFPL(fpls[ifpl], autoFillOK=False)
+			strips.append(strip)
+	except (StructError, IndexError, KeyError, UnicodeDecodeError) as err: # KeyError: unknown value type
+		raise ValueError('Corrupt strip board data: %s' % err)
+	return rack_names, strips
 
 
 
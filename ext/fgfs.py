@@ -1,8 +1,10 @@
+from time import monotonic
 from telnetlib import Telnet
-from PyQt5.QtCore import QProcess, QThread
+from PyQt5.QtCore import QProcess, QThread, QMutex, QWaitCondition
 
 from session.config import settings
 from session.env import env
+from session.profiling import profiler
 from ext.resources import make_FGFS_model_recognisers, make_FGFS_model_chooser
 from gui.misc import signals
 
@@ -11,7 +13,10 @@ from gui.misc import signals
 
 fgfs_viewing_acft_model = 'ufo'
 dummy_viewer_callsign = 'ATC-pie'
-telnet_read_timeout = 5 # seconds (or None)
+telnet_read_timeout = 5 # seconds
+telnet_reconnect_delay = 2000 # ms
+telnet_latency_probe_interval = 1 # seconds
+telnet_latency_probe_property = '/sim/time/elapsed-sec'
 initial_FOV = 55 # degrees of horizontal angle covered
 
 ATCpie_model_string = 'ATC-pie'
@@ -70,6 +75,8 @@ class FlightGearTowerViewer:
 		self.internal_process = QProcess(gui)
 		self.internal_process.setStandardErrorFile(settings.outputFileName('fgfs-stderr', ext='log'))
 		self.internal_process.stateChanged.connect(lambda state: self.notifyStartStop(state == QProcess.Running))
+		self.telnet_channel = TelnetChannel(gui)
+		signals.mainWindowClosing.connect(self.telnet_channel.close)
 		self.running = False
 	
 	def start(self):
@@ -126,13 +133,31 @@ class FlightGearTowerViewer:
 	
 	def notifyStartStop(self, b):
 			self.running = b
+			if not b:
+				self.telnet_channel.close()
 			signals.towerViewProcessToggled.emit(b)
 	
 	def sendCmd(self, cmd): # cmd can be a single command (str) or a command list
 		if self.running:
 			if isinstance(cmd, str):
 				cmd = [cmd]
-			TelnetSessionThreader(self.gui, cmd).start()
+			self.telnet_channel.send(cmd)
+	
+	def startTracking(self, generate_commands, interval):
+		'''
+		generate_commands: function (no args) returning a command list, called every interval (ms)
+		'''
+		if self.running:
+			self.telnet_channel.startTracking(generate_commands, interval)
+	
+	def stopTracking(self):
+		self.telnet_channel.stopTracking()
+	
+	def telnetRoundTripTime(self):
+		'''
+		seconds, last measured; None if not known yet
+		'''
+		return self.telnet_channel.round_trip_time
 	
 	# # # convenient methods for sending telnet commands
 	
@@ -170,43 +195,150 @@ def send_packet_to_view(packet, addr):
 
 
 
-class TelnetSessionThreader(QThread):
-	def __init__(self, gui, commands, loopInterval=None):
+class TelnetChannel(QThread):
+	'''
+	Long-lived telnet connection to the tower viewer, reopened when lost until closed.
+	Queued commands are written in batches without waiting for answers; a "set" command still queued is
+	replaced by a later one for the same property, and a repeated command is only sent once.
+	A command generator can be polled at a regular interval (aircraft tracking), its commands queued likewise.
+	Round trip time is measured with a property read, at most once every telnet_latency_probe_interval.
+	'''
+	def __init__(self, parent):
+		QThread.__init__(self, parent)
+		self.mutex = QMutex() # Critical: queue and tracking state, between GUI and channel thread
+		self.wake_condition = QWaitCondition()
+		self.pending = {} # coalescing key -> command line, in order of last update
+		self.generate_tracking_commands = None # function (no args) returning a command list, or None
+		self.tracking_interval = None # ms
+		self.closing = False
+		self.round_trip_time = None # seconds; last measured, or None
+	
+	def send(self, commands):
+		self.mutex.lock()
+		for line in commands:
+			key = command_coalescing_key(line)
+			self.pending.pop(key, None)
+			self.pending[key] = line
+		self.wake_condition.wakeAll()
+		self.mutex.unlock()
+		self._ensureRunning()
+	
+	def startTracking(self, generate_commands, interval):
+		self.mutex.lock()
+		self.generate_tracking_commands = generate_commands
+		self.tracking_interval = interval
+		self.wake_condition.wakeAll()
+		self.mutex.unlock()
+		self._ensureRunning()
+	
+	def stopTracking(self):
+		self.mutex.lock()
+		self.generate_tracking_commands = None
+		self.mutex.unlock()
+	
+	def close(self):
+		'''
+		Drops queued commands and tracking, and closes the connection; returns when the thread is finished.
+		'''
+		self.mutex.lock()
+		self.closing = True
+		self.pending.clear()
+		self.generate_tracking_commands = None
+		self.wake_condition.wakeAll()
+		self.mutex.unlock()
+		self.wait()
+	
+	def _ensureRunning(self):
+		if not self.isRunning():
+			self.closing = False
+			self.start()
+	
+	def _requeue(self, batch):
+		self.mutex.lock()
+		if not self.closing:
+			for key, line in self.pending.items(): # commands queued since batch was taken supersede it
+				batch.pop(key, None)
+				batch[key] = line
+			self.pending = batch
+		self.mutex.unlock()
+	
+	def _waitForCommands(self):
 		'''
-		"commands" can be a list of str commands or a function (no args) that generates the list
-		"loopInterval" will keep the session open and repeat it after the given timeout
+		Returns the batch to send, or None if closing
 		'''
-		QThread.__init__(self, gui)
-		self.connection = None
-		self.loop_interval = loopInterval
-		self.generate_commands = (lambda: commands) if isinstance(commands, list) else commands
+		self.mutex.lock()
+		while not self.closing and self.pending == {} and self.generate_tracking_commands == None:
+			self.wake_condition.wait(self.mutex)
+		if not self.closing and self.pending == {}: # tracking
+			self.wake_condition.wait(self.mutex, self.tracking_interval)
+		batch = None if self.closing else self.pending
+		self.pending = {}
+		generate_tracking_commands = self.generate_tracking_commands
+		self.mutex.unlock()
+		if batch != None and generate_tracking_commands != None:
+			for line in generate_tracking_commands():
+				key = command_coalescing_key(line)
+				batch.pop(key, None)
+				batch[key] = line
+		return batch
+	
+	def _sleep(self, ms): # interrupted if closing
+		self.mutex.lock()
+		if not self.closing:
+			self.wake_condition.wait(self.mutex, ms)
+		self.mutex.unlock()
 	
 	def run(self):
-		try:
-			tower_viewer_host = settings.external_tower_viewer_host if settings.external_tower_viewer_process else 'localhost'
-			#DEBUG('Creating Telnet connection to %s:%d' % (tower_viewer_host, settings.tower_viewer_telnet_port))
-			self.connection = Telnet(tower_viewer_host, port=settings.tower_viewer_telnet_port)
-			self.loop = self.loop_interval != None
-			self._runCommandsOnce()
-			while self.loop: # set by an outside call to stop()
-				QThread.msleep(self.loop_interval)
-				self._runCommandsOnce()
-			self.connection.close()
-		except ConnectionRefusedError:
-			print('Telnet connection error. Is tower view window open?')
-	
-	def stop(self):
-		self.loop = False
-	
-	def _runCommandsOnce(self):
-		for cmd in self.generate_commands():
-			self.sendCommand(cmd)
-		
-	def sendCommand(self, line, answer=False):
-		#DEBUGprint('Sending command: %s' % line)
-		self.connection.write(line.encode('utf8') + b'\r\n')
-		if answer:
-			read = self.connection.read_until(b'\n', timeout=telnet_read_timeout)
-			#DEBUG('Received bytes: %s' % read)
-			return read.decode('utf8').strip()
-
+		connection = None
+		connection_error_reported = False
+		next_probe = 0 # monotonic time
+		while True:
+			batch = self._waitForCommands()
+			if batch == None:
+				break
+			if batch == {}:
+				continue
+			if connection == None:
+				try:
+					tower_viewer_host = settings.external_tower_viewer_host if settings.external_tower_viewer_process else 'localhost'
+					connection = Telnet(tower_viewer_host, port=settings.tower_viewer_telnet_port, timeout=telnet_read_timeout)
+					connection.write(b'data\r\n') # no prompts or echoes
+					connection_error_reported = False
+				except OSError:
+					connection = None
+					if not connection_error_reported:
+						print('Telnet connection error. Is tower view window open?')
+						connection_error_reported = True
+					self._requeue(batch)
+					self._sleep(telnet_reconnect_delay)
+					continue
+			try:
+				data = ''.join(line + '\r\n' for line in batch.values())
+				probe = monotonic() >= next_probe
+				if probe:
+					connection.read_very_eager() # discard anything unread
+					data += 'get %s\r\n' % telnet_latency_probe_property
+				t0 = monotonic()
+				connection.write(data.encode('utf8'))
+				if probe:
+					if connection.read_until(b'\n', timeout=telnet_read_timeout).endswith(b'\n'):
+						self.round_trip_time = monotonic() - t0
+						if profiler.enabled:
+							profiler.record('tower viewer telnet round trip', self.round_trip_time)
+					next_probe = t0 + telnet_latency_probe_interval
+			except (OSError, EOFError): # EOFError: connection closed by viewer
+				print('Telnet connection to tower viewer lost; reconnecting.')
+				connection.close()
+				connection = None
+				self._requeue(batch)
+		if connection != None:
+			connection.close()
+
+
+
+def command_coalescing_key(line):
+	'''
+	Commands with the same key supersede each other in the telnet queue
+	'''
+	tokens = line.split(maxsplit=2)
+	return 'set ' + tokens[1] if len(tokens) == 3 and tokens[0] == 'set' else line
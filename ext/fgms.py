@@ -7,6 +7,7 @@ from PyQt5.QtCore import QThread
 
 from session.config import settings, version_string
 from session.env import env
+from session.profiling import profiler
 from ext.fgfs import ICAO_aircraft_type, is_ATC_model, ATCpie_model_string
 from gui.misc import signals
 
@@ -379,6 +380,7 @@ class FGMShandshaker(QThread):
 # ==============================================================================================
 
 
+@profiler.profiled('FGMS position decoding')
 def decode_FGMS_position_message(packet):
 	'''
 	Returns a tuple of 8 values decoded from the argument FGMS packet:
@@ -0,0 +1,247 @@
+
+from time import monotonic
+from base64 import b64encode
+from threading import Lock
+from socket import timeout
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from urllib.parse import urlsplit, urljoin, unquote
+from urllib.request import getproxies, proxy_bypass
+from urllib.error import URLError, HTTPError
+
+from session.config import version_string
+
+
+# ---------- Constants ----------
+
+default_request_timeout = 5 # s
+max_idle_connections_per_host = 4
+max_redirections = 5
+fan_out_worker_count = 9 # enough for a full FPL check (see FPLchecker)
+backoff_initial_delay = 2 # s; after a first network failure
+backoff_max_delay = 60 # s
+
+redirection_statuses = [301, 302, 303, 307, 308]
+
+# -------------------------------
+
+
+class Endpoint:
+	'''
+	Settings and failure state shared by the requests to a remote service.
+	After a network failure, requests fail immediately until a backoff delay has expired;
+	the delay doubles on every consecutive failure, and is reset on success.
+	'''
+	def __init__(self, name, timeout=default_request_timeout):
+		self.name = name
+		self.timeout = timeout
+		self.lock = Lock()
+		self.backoff_delay = 0 # s; 0 if last request succeeded
+		self.backoff_end = None # monotonic time, or None if not backing off
+	
+	def checkBackoff(self):
+		with self.lock:
+			if self.backoff_end != None and monotonic() < self.backoff_end:
+				raise URLError('%s unreachable; backing off for %d s' % (self.name, self.backoff_end - monotonic()))
+	
+	def reportSuccess(self):
+		with self.lock:
+			self.backoff_delay = 0
+			self.backoff_end = None
+	
+	def reportFailure(self):
+		with self.lock:
+			self.backoff_delay = min(backoff_max_delay, max(backoff_initial_delay, 2 * self.backoff_delay))
+			self.backoff_end = monotonic() + self.backoff_delay
+
+
+
+
+class HttpClient:
+	'''
+	Thread-safe HTTP(S) client keeping connections alive for reuse, and the validators (ETag and
+	Last-Modified) of conditional GET responses to revalidate them. Errors are raised as with urllib:
+	URLError (HTTPError for error statuses) or socket.timeout.
+	Proxies are those urllib would use (e.g. http_proxy, https_proxy and no_proxy environment variables);
+	HTTPS requests go through a CONNECT tunnel.
+	'''
+	def __init__(self):
+		self.lock = Lock()
+		self.idle_connections = {} # (scheme, host, port) -> connection list
+		self.validated_responses = {} # URL -> (ETag, Last-Modified, body); for conditional requests
+		self.executor = None # created on first fan-out
+	
+	def request(self, url, postData=None, endpoint=None, conditional=False):
+		'''
+		Returns the response body (bytes), following redirections.
+		A conditional GET sends the validators of the last response received for the URL, and returns
+		its body again if the server answers it is not modified.
+		'''
+		if endpoint != None:
+			endpoint.checkBackoff()
+		try:
+			time_limit = default_request_timeout if endpoint == None else endpoint.timeout
+			body = self._followRedirections(url, postData, time_limit, conditional)
+		except HTTPError: # server responded
+			if endpoint != None:
+				endpoint.reportSuccess()
+			raise
+		except (URLError, timeout):
+			if endpoint != None:
+				endpoint.reportFailure()
+			raise
+		if endpoint != None:
+			endpoint.reportSuccess()
+		return body
+	
+	def fanOut(self, f, args):
+		'''
+		Calls f on every element of args concurrently, and returns the list of results in the same order.
+		If any call raises an exception, it is raised here (the first in args order) once all have returned.
+		'''
+		with self.lock:
+			if self.executor == None:
+				self.executor = ThreadPoolExecutor(max_workers=fan_out_worker_count)
+		futures = [self.executor.submit(f, arg) for arg in args]
+		wait(futures)
+		return [future.result() for future in futures]
+	
+	def forgetValidators(self):
+		with self.lock:
+			self.validated_responses.clear()
+	
+	def _followRedirections(self, url, postData, time_limit, conditional):
+		for i in range(max_redirections + 1):
+			cached = None
+			headers = { 'User-Agent': 'ATC-pie/%s' % version_string }
+			if postData != None:
+				headers['Content-Type'] = 'application/x-www-form-urlencoded'
+			elif conditional:
+				with self.lock:
+					cached = self.validated_responses.get(url)
+				if cached != None:
+					etag, last_modified, cached_body = cached
+					if etag != None:
+						headers['If-None-Match'] = etag
+					if last_modified != None:
+						headers['If-Modified-Since'] = last_modified
+			status, reason, response_headers, body = self._send(url, postData, headers, time_limit)
+			if status in redirection_statuses and response_headers.get('Location') != None:
+				url = urljoin(url, response_headers['Location'])
+				if status == 303 or status in [301, 302] and postData != None: # like urllib: POST becomes GET
+					postData = None
+			elif status == 304 and cached != None:
+				return cached_body
+			elif status >= 400:
+				raise HTTPError(url, status, reason, response_headers, None)
+			else:
+				if conditional and postData == None:
+					etag = response_headers.get('ETag')
+					last_modified = response_headers.get('Last-Modified')
+					if etag != None or last_modified != None:
+						with self.lock:
+							self.validated_responses[url] = etag, last_modified, body
+				return body
+		raise URLError('Too many redirections')
+	
+	def _send(self, url, postData, headers, time_limit):
+		'''
+		Returns a (status, reason, headers, body) tuple
+		'''
+		parts = urlsplit(url)
+		if parts.scheme not in ['http', 'https']:
+			raise URLError('Unsupported URL scheme: %s' % parts.scheme)
+		proxy = proxy_for(parts)
+		host_key = parts.scheme, parts.hostname, parts.port, proxy
+		path = '/' if parts.path == '' else parts.path
+		if parts.query != '':
+			path += '?' + parts.query
+		if proxy != None and parts.scheme == 'http': # request sent to proxy with absolute URL
+			path = '%s://%s%s' % (parts.scheme, parts.netloc, path)
+			proxy_authorisation = proxy_authorisation_header(proxy)
+			if proxy_authorisation != None:
+				headers['Proxy-Authorization'] = proxy_authorisation
+		for attempt in range(2): # an idle connection may have been closed by server: retry once with a new one
+			connection, reused = self._takeConnection(host_key, time_limit)
+			try:
+				connection.request(('GET' if postData == None else 'POST'), path, body=postData, headers=headers)
+				response = connection.getresponse()
+				body = response.read()
+				break
+			except timeout:
+				connection.close()
+				raise
+			except (HTTPException, ConnectionError) as err:
+				connection.close()
+				if not reused or attempt > 0:
+					raise URLError(err)
+			except OSError as err:
+				connection.close()
+				raise URLError(err)
+		if response.will_close:
+			connection.close()
+		else:
+			self._releaseConnection(host_key, connection)
+		return response.status, response.reason, response.headers, body
+	
+	def _takeConnection(self, host_key, time_limit):
+		'''
+		Returns a pair: connection, bool (True if it was idle in the pool)
+		'''
+		with self.lock:
+			try:
+				connection = self.idle_connections[host_key].pop()
+			except (KeyError, IndexError):
+				connection = None
+		if connection == None:
+			scheme, host, port, proxy = host_key
+			connection_class = HTTPSConnection if scheme == 'https' else HTTPConnection
+			if proxy == None:
+				return connection_class(host, port, timeout=time_limit), False
+			proxy_parts = urlsplit(proxy)
+			connection = connection_class(proxy_parts.hostname, proxy_parts.port, timeout=time_limit)
+			if scheme == 'https':
+				proxy_authorisation = proxy_authorisation_header(proxy)
+				tunnel_headers = {} if proxy_authorisation == None else { 'Proxy-Authorization': proxy_authorisation }
+				connection.set_tunnel(host, port, headers=tunnel_headers)
+			return connection, False
+		connection.timeout = time_limit
+		if connection.sock != None:
+			connection.sock.settimeout(time_limit)
+		return connection, True
+	
+	def _releaseConnection(self, host_key, connection):
+		with self.lock:
+			idle = self.idle_connections.setdefault(host_key, [])
+			if len(idle) < max_idle_connections_per_host:
+				idle.append(connection)
+				connection = None
+		if connection != None:
+			connection.close()
+
+
+
+def proxy_for(url_parts):
+	'''
+	returns the proxy URL to connect through, or None for a direct connection
+	'''
+	proxy = getproxies().get(url_parts.scheme)
+	if proxy == None or proxy_bypass(url_parts.hostname):
+		return None
+	return proxy if '://' in proxy else 'http://' + proxy
+
+
+def proxy_authorisation_header(proxy):
+	'''
+	returns a basic authorisation header value if credentials are given in the proxy URL, None otherwise
+	'''
+	parts = urlsplit(proxy)
+	if parts.username == None:
+		return None
+	credentials = '%s:%s' % (unquote(parts.username), unquote(parts.password or ''))
+	return 'Basic ' + b64encode(credentials.encode('utf8')).decode('ascii')
+
+
+
+http_client = HttpClient()
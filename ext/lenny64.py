@@ -6,19 +6,24 @@ from urllib.parse import urlencode
 from urllib.error import URLError
 from xml.etree import ElementTree
 
-from session.config import settings, open_URL
+from session.config import settings
 from data.util import some
 from data.fpl import FPL
 from data.params import Speed
 
+from ext.httpClient import http_client, Endpoint
+
 # ---------- Constants ----------
 
 lenny64_base_location = 'http://flightgear-atc.alwaysdata.net/dev2017_04_28.php'
 ATCpie_comment_element_tag = 'ATC_comment' # for a modifiable comment inside lenny64's <additionalInformation> FPL element
 ATCpie_wakeTurb_element_tag = 'wake_turb_cat' # wake turbulence category (L, M, H, J)
+lenny64_request_timeout = 10 # s
 
 # -------------------------------
 
+lenny64_endpoint = Endpoint('Lenny64', timeout=lenny64_request_timeout)
+
 
 lenny64_date_regexp = re.compile('(\d+)-(\d+)-(\d+)') # YYYY-MM-DD
 lenny64_time_regexp = re.compile('(\d+):(\d+):(\d+)') # hh-mm-ss
@@ -62,7 +67,7 @@ def lenny64_query(query, expect):
 	url = '%s?%s' % (lenny64_base_location, query)
 	try:
 		#DEBUG(url)
-		response = open_URL(url)
+		response = http_client.request(url, endpoint=lenny64_endpoint)
 	except (URLError, timeout) as error:
 		raise Lenny64Error(query, 'Socket or network error: %s' % error)
 	try:
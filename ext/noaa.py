@@ -4,9 +4,10 @@ from urllib.parse import urlencode
 from urllib.error import URLError
 from xml.etree import ElementTree
 
-from session.config import open_URL
 from data.utc import now
 
+from ext.httpClient import http_client, Endpoint
+
 
 # ---------- Constants ----------
 
@@ -15,10 +16,13 @@ decl_base_location = 'http://www.ngdc.noaa.gov/geomag-web/calculators/calculateD
 
 # -------------------------------
 
+METAR_endpoint = Endpoint('NOAA METAR server')
+decl_endpoint = Endpoint('NOAA declination calculator')
+
 
 def get_METAR(icao):
 	try:
-		response = open_URL('%s/%s.TXT' % (METAR_base_location, icao))
+		response = http_client.request('%s/%s.TXT' % (METAR_base_location, icao), endpoint=METAR_endpoint, conditional=True)
 		return response.decode('ascii').split('\n')[1] + '='
 	except URLError:
 		print('Could not download METAR for station %s' % icao)
@@ -43,7 +47,7 @@ def get_declination(earth_location):
 			'browserRequest': 'false'
 		}
 		#DEBUG print('%s?%s' % (decl_base_location, urlencode(q_items)))
-		response = open_URL('%s?%s' % (decl_base_location, urlencode(q_items)))
+		response = http_client.request('%s?%s' % (decl_base_location, urlencode(q_items)), endpoint=decl_endpoint)
 		xml = ElementTree.fromstring(response)
 		if xml.tag == 'maggridresult':
 			res_elt = xml.find('result')
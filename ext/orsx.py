@@ -1,5 +1,6 @@
-from PyQt5.QtCore import QThread
+from PyQt5.QtCore import QThread, QMutex
 from xml.etree import ElementTree
+from io import BytesIO
 from time import sleep
 from socket import timeout
 
@@ -7,7 +8,7 @@ from urllib.parse import urlencode
 from urllib.error import URLError
 
 from session.manager import HandoverBlocked
-from session.config import settings, open_URL
+from session.config import settings
 from session.env import env
 
 from data.util import some
@@ -20,10 +21,13 @@ from data.strip import Strip, received_from_detail, assigned_altitude_detail, as
 from models.ATCs import ATC
 from gui.misc import Ticker, signals
 
+from ext.httpClient import http_client, Endpoint
+
 
 # ---------- Constants ----------
 
-SX_update_interval = 3 * 1000 # milliseconds
+SX_min_poll_interval = 3 * 1000 # milliseconds; after a poll with activity, or a handover
+SX_max_poll_interval = 6 * 1000 # milliseconds; reached by doubling the interval on quiet polls; delays incoming handovers
 ATCpie_hidden_string = '__ATC-pie__' # to recognise ATC-pie sender in <pilot> elements
 
 ORSX_account_name = 'ATC-pie'
@@ -31,6 +35,8 @@ ORSX_account_password = ''
 
 # -------------------------------
 
+ORSX_endpoint = Endpoint('ORSX server')
+
 
 
 
@@ -48,7 +54,8 @@ def server_query(cmd, dict_data):
 	qdict.update(dict_data)
 	try:
 		#print('\nPOST %s DATA: %s' % (cmd, post_data))
-		response = open_URL('%s/%s' % (settings.ORSX_server_name, cmd), postData=bytes(urlencode(qdict), encoding='utf8'))
+		response = http_client.request('%s/%s' % (settings.ORSX_server_name, cmd), \
+				postData=bytes(urlencode(qdict), encoding='utf8'), endpoint=ORSX_endpoint)
 		#print('RESPONSE: %s\n' % response)
 		return response
 	except (URLError, timeout) as error:
@@ -102,12 +109,12 @@ def send_update(fgms_id, strip, handover=None): # if handover None: acknowledge
 class WwStripExchanger:
 	def __init__(self, gui):
 		self.updater = SxUpdater(gui)
-		self.update_ticker = Ticker(self.updater.start, parent=gui)
+		self.update_ticker = Ticker(self.poll, parent=gui, name='ORSX poll')
 		self.gui = gui
 		self.running = False
 	
 	def start(self):
-		self.update_ticker.start(SX_update_interval)
+		self.update_ticker.start(SX_min_poll_interval)
 		self.running = True
 	
 	def stopAndWait(self):
@@ -115,15 +122,26 @@ class WwStripExchanger:
 			self.update_ticker.stop()
 			self.updater.wait()
 			self.running = False
-		self.updater.ATCs_on_last_run.clear()
-		self.updater.current_contact_claims.clear()
+		self.updater.reset()
 	
 	def isRunning(self):
 		return self.running
 	
+	def poll(self):
+		if not self.updater.isRunning():
+			if self.update_ticker.interval() != self.updater.poll_interval:
+				self.update_ticker.setInterval(self.updater.poll_interval)
+			self.updater.start()
+	
 	def connectedATCs(self):
 		return self.updater.ATCs_on_last_run[:]
 	
+	def takeATCupdates(self):
+		'''
+		Returns a pair: connected ATC list, set of callsigns new or changed since last call
+		'''
+		return self.updater.takeATCupdates()
+	
 	def isConnected(self, atc_callsign):
 		return any(atc.callsign == atc_callsign for atc in self.updater.ATCs_on_last_run)
 	
@@ -140,6 +158,9 @@ class WwStripExchanger:
 			raise HandoverBlocked('Unlinked strips cannot be sent through the OpenRadar system.')
 		else:
 			SXsender(self.gui, strip, acft.identifier, handover=atc_id).start()
+			self.updater.poll_interval = SX_min_poll_interval # to see the handover through without delay
+			if self.update_ticker.interval() > SX_min_poll_interval:
+				self.update_ticker.setInterval(SX_min_poll_interval)
 
 
 # ------------------------------------------------------------------------------
@@ -160,88 +181,156 @@ class SXsender(QThread):
 
 
 class SxUpdater(QThread):
+	'''
+	Polls the server, parsing the response as it is read. The server sends the full list of ATCs in range
+	on every poll, but flight plans only when something changes; only the new or changed ATCs are reported
+	as such, and the poll interval grows while nothing happens, unless a radar contact is claimed by another
+	ATC (who could hand it over: received strips only come with a poll).
+	'''
 	def __init__(self, gui):
 		QThread.__init__(self, parent=gui)
 		self.ATCs_on_last_run = [] # list of ATC objects
 		self.current_contact_claims = {} # claimed ACFT callsign -> claiming ATC callsign
+		self.ATC_signatures = {} # callsign -> (signature, ATC); signature is the tuple of element texts received
+		self.changed_ATCs = set() # callsigns new or changed since last taken
+		self.ATC_mutex = QMutex() # Critical: ATC list and changes, taken by session manager
+		self.poll_interval = SX_min_poll_interval
+	
+	def reset(self):
+		self.ATC_mutex.lock()
+		self.ATCs_on_last_run = []
+		self.ATC_signatures.clear()
+		self.changed_ATCs.clear()
+		self.ATC_mutex.unlock()
+		self.current_contact_claims.clear()
+		self.poll_interval = SX_min_poll_interval
+	
+	def takeATCupdates(self):
+		self.ATC_mutex.lock()
+		result = self.ATCs_on_last_run[:], self.changed_ATCs
+		self.changed_ATCs = set()
+		self.ATC_mutex.unlock()
+		return result
 	
 	def run(self):
 		## PREPARING QUERY
 		pos = env.radarPos()
+		contacts = [acft.identifier for acft in env.radar.contacts()]
 		qdict = {
 			'username': settings.MP_social_name,
       'lon': pos.lon,
       'lat': pos.lat,
       'range': some(settings.ORSX_handover_range, settings.radar_range),
       'xmlVersion': '1.0',
-      'contacts': ','.join(acft.identifier for acft in env.radar.contacts()) # should this be all FGMS connections?
+      'contacts': ','.join(contacts) # should this be all FGMS connections?
 		}
 		if settings.publicised_frequency != None:
 			qdict['frequency'] = str(settings.publicised_frequency)
 		server_response = server_query('getFlightplans', qdict)
 		## USING RESPONSE
+		activity = False
 		if server_response != None:
+			new_signatures = None # set when ATC list is complete
+			in_ATC_list = False
 			try:
-				ww_root = ElementTree.fromstring(server_response)
+				for event, elt in ElementTree.iterparse(BytesIO(server_response), events=('start', 'end')):
+					if elt.tag == 'atcsInRange':
+						in_ATC_list = event == 'start'
+						if event == 'start':
+							ATC_elements = []
+						else:
+							new_signatures = self.readATCs(ATC_elements)
+					elif event == 'end':
+						if elt.tag == 'atc' and in_ATC_list:
+							ATC_elements.append(elt) # NOTE the server sends the full list each time
+						elif elt.tag == 'flightplan': # NOTE the server only sends those when something changes
+							activity = True
+							self.readFlightplan(elt)
+							elt.clear()
 			except ElementTree.ParseError as parse_error:
 				print('Parse error in SX server data: %s' % parse_error)
-				return
-			new_ATCs = []
-			
-			# ATCs first
-			for ww_atc in ww_root.find('atcsInRange').iter('atc'): # NOTE the server sends the full list each time
-				atc = ATC(ww_atc.find('callsign').text)
-				atc.social_name = ww_atc.find('username').text
-				atc.position = EarthCoords(float(ww_atc.find('lat').text), float(ww_atc.find('lon').text))
-				ww_frq = ww_atc.find('frequency').text
+			if new_signatures != None and self.updateATCs(new_signatures):
+				activity = True
+			my_callsign = settings.session_manager.myCallsign()
+			if any(self.current_contact_claims.get(cs, my_callsign) != my_callsign for cs in contacts):
+				activity = True # possible handover to us
+		self.poll_interval = SX_min_poll_interval if activity else min(SX_max_poll_interval, 2 * self.poll_interval)
+	
+	def readATCs(self, ATC_elements):
+		'''
+		Returns the new callsign -> (signature, ATC) dict, reusing the ATC objects whose signature is unchanged.
+		'''
+		result = {}
+		for ww_atc in ATC_elements:
+			signature = tuple(ww_atc.find(tag).text for tag in ['callsign', 'username', 'lat', 'lon', 'frequency'])
+			try:
+				known_signature, atc = self.ATC_signatures[signature[0]]
+			except KeyError:
+				known_signature = None
+			if signature != known_signature:
+				atc = ATC(signature[0])
+				atc.social_name = signature[1]
+				atc.position = EarthCoords(float(signature[2]), float(signature[3]))
 				try:
-					atc.frequency = CommFrequency(ww_frq)
+					atc.frequency = CommFrequency(signature[4])
 				except ValueError:
 					atc.frequency = None
-				new_ATCs.append(atc)
-			self.ATCs_on_last_run = new_ATCs
-			
-			# Then strip data (contact claims and handover)
-			for ww_flightplan in ww_root.iter('flightplan'): # NOTE the server only sends those when something changes
-				ww_header = ww_flightplan.find('header')
-				ww_callsign = ww_header.find('callsign').text
-				ww_owner = ww_header.find('owner').text
-				if ww_owner == None:
-					if ww_callsign in self.current_contact_claims:
-						del self.current_contact_claims[ww_callsign]
-				else:
-					self.current_contact_claims[ww_callsign] = ww_owner
-				
-				if ww_header.find('handover').text == settings.session_manager.myCallsign(): # RECEIVE A STRIP!
-					strip = Strip()
-					strip.writeDetail(received_from_detail, ww_owner)
-					strip.writeDetail(assigned_SQ_detail, ck_int(ww_header.find('squawk').text, base=8))
-					strip.writeDetail(assigned_altitude_detail, ww_header.find('assignedAlt').text)
-					# Ignored from WW header above: <flags>, <assignedRunway>, <assignedRoute>, <status>, <flight>
-					# Ignored from WW data below: <fuelTime>; used with ulterior motive: <pilot>
-					ww_data = ww_flightplan.find('data')
-					# ATC-pie hides a token in <pilot>, wake turb. on its left and callsign to its right
-					# e.g. <pilot>M__ATC-pie__X-FOO</pilot> for M turb. and X-FOO strip callsign
-					# If the token is absent, we know the strip is from OpenRadar
-					hidden_tokens = some(ww_data.find('pilot').text, '').split(ATCpie_hidden_string, maxsplit=1)
-					if len(hidden_tokens) == 1: # hidden marker NOT present; previous strip editor was OpenRadar
-						strip.writeDetail(FPL.CALLSIGN, ww_callsign)
-					else: # recognise strip edited with ATC-pie
-						strip.writeDetail(FPL.WTC, hidden_tokens[0])
-						strip.writeDetail(FPL.CALLSIGN, hidden_tokens[1])
-					strip.writeDetail(FPL.FLIGHT_RULES, ww_data.find('type').text)
-					strip.writeDetail(FPL.ACFT_TYPE, ww_data.find('aircraft').text)
-					strip.writeDetail(FPL.ICAO_DEP, ww_data.find('departure').text)
-					strip.writeDetail(FPL.ICAO_ARR, ww_data.find('destination').text)
-					strip.writeDetail(FPL.ROUTE, ww_data.find('route').text)
-					strip.writeDetail(FPL.CRUISE_ALT, ww_data.find('cruisingAlt').text)
-					spd = ck_int(ww_data.find('trueAirspeed').text)
-					if spd != None:
-						strip.writeDetail(FPL.TAS, Speed(spd))
-					strip.writeDetail(FPL.COMMENTS, ww_data.find('remarks').text)
-					# Possibly ignored details (OpenRadar confuses FPLs and strips): DEP time, EET, alt. AD, souls [*]
-					signals.receiveStrip.emit(strip)
-					send_update(ww_callsign, strip) # Acknowledge strip
+			result[signature[0]] = signature, atc
+		return result
+	
+	def updateATCs(self, new_signatures):
+		'''
+		Returns True if the ATC list has changed
+		'''
+		changed = { cs for cs, (sig, atc) in new_signatures.items() if self.ATC_signatures.get(cs, (None,))[0] != sig }
+		list_changed = changed != set() or new_signatures.keys() != self.ATC_signatures.keys()
+		self.ATC_mutex.lock()
+		self.ATC_signatures = new_signatures
+		self.ATCs_on_last_run = [atc for sig, atc in new_signatures.values()]
+		self.changed_ATCs |= changed
+		self.ATC_mutex.unlock()
+		return list_changed
+	
+	def readFlightplan(self, ww_flightplan):
+		ww_header = ww_flightplan.find('header')
+		ww_callsign = ww_header.find('callsign').text
+		ww_owner = ww_header.find('owner').text
+		if ww_owner == None:
+			if ww_callsign in self.current_contact_claims:
+				del self.current_contact_claims[ww_callsign]
+		else:
+			self.current_contact_claims[ww_callsign] = ww_owner
+		
+		if ww_header.find('handover').text == settings.session_manager.myCallsign(): # RECEIVE A STRIP!
+			strip = Strip()
+			strip.writeDetail(received_from_detail, ww_owner)
+			strip.writeDetail(assigned_SQ_detail, ck_int(ww_header.find('squawk').text, base=8))
+			strip.writeDetail(assigned_altitude_detail, ww_header.find('assignedAlt').text)
+			# Ignored from WW header above: <flags>, <assignedRunway>, <assignedRoute>, <status>, <flight>
+			# Ignored from WW data below: <fuelTime>; used with ulterior motive: <pilot>
+			ww_data = ww_flightplan.find('data')
+			# ATC-pie hides a token in <pilot>, wake turb. on its left and callsign to its right
+			# e.g. <pilot>M__ATC-pie__X-FOO</pilot> for M turb. and X-FOO strip callsign
+			# If the token is absent, we know the strip is from OpenRadar
+			hidden_tokens = some(ww_data.find('pilot').text, '').split(ATCpie_hidden_string, maxsplit=1)
+			if len(hidden_tokens) == 1: # hidden marker NOT present; previous strip editor was OpenRadar
+				strip.writeDetail(FPL.CALLSIGN, ww_callsign)
+			else: # recognise strip edited with ATC-pie
+				strip.writeDetail(FPL.WTC, hidden_tokens[0])
+				strip.writeDetail(FPL.CALLSIGN, hidden_tokens[1])
+			strip.writeDetail(FPL.FLIGHT_RULES, ww_data.find('type').text)
+			strip.writeDetail(FPL.ACFT_TYPE, ww_data.find('aircraft').text)
+			strip.writeDetail(FPL.ICAO_DEP, ww_data.find('departure').text)
+			strip.writeDetail(FPL.ICAO_ARR, ww_data.find('destination').text)
+			strip.writeDetail(FPL.ROUTE, ww_data.find('route').text)
+			strip.writeDetail(FPL.CRUISE_ALT, ww_data.find('cruisingAlt').text)
+			spd = ck_int(ww_data.find('trueAirspeed').text)
+			if spd != None:
+				strip.writeDetail(FPL.TAS, Speed(spd))
+			strip.writeDetail(FPL.COMMENTS, ww_data.find('remarks').text)
+			# Possibly ignored details (OpenRadar confuses FPLs and strips): DEP time, EET, alt. AD, souls [*]
+			signals.receiveStrip.emit(strip)
+			send_update(ww_callsign, strip) # Acknowledge strip
 
 
 
@@ -9,8 +9,9 @@ from data.ad import DirRunway, Helipad
 from data.nav import Navpoint, NavpointError, world_navpoint_db, world_routing_db
 from data.db import acft_db, acft_registration_formats, phon_airlines, phon_navpoints
 from data.elev import ElevationMap
+from data.magnetic import world_magnetic_model
 
-from PyQt5.QtGui import QPixmap, QColor
+from PyQt5.QtGui import QPixmap, QImage, QColor
 
 
 # ---------- Constants ----------
@@ -21,6 +22,7 @@ airlines_speech_file = 'resources/speech/airline-callsigns.phon'
 airport_entry_exit_file = 'resources/nav/AD-entry-exit'
 route_presets_file = 'resources/nav/route-presets'
 background_images_dir = 'resources/bg-img'
+magnetic_model_file = 'resources/geomag/WMM.COF'
 
 elev_map_file_fmt = 'resources/elev/%s.elev'
 navpoint_speech_file_fmt = 'resources/speech/navpoints/%s.phon'
@@ -121,7 +123,10 @@ def read_hand_drawing(file_name, db):
 		raise ValueError('Drawing file not found')
 
 
-def read_bg_img(icao, db):
+def read_bg_img(icao, db, decodeOnly=False):
+	'''
+	decodeOnly: give QImage objects instead of QPixmap, which can be done outside of the GUI thread (see bg_img_pixmaps)
+	'''
 	try:
 		with open(path.join(background_images_dir, '%s.lst' % icao), encoding='utf8') as f:
 			radar_background_layers = []
@@ -134,7 +139,7 @@ def read_bg_img(icao, db):
 						if tokens[1] == 'DRAW': # DRAWING SPEC, no corners given
 							radar_background_layers.append((False, tokens[0], tokens[2], read_hand_drawing(image_file, db)))
 						else:
-							pixmap = QPixmap(image_file)
+							pixmap = QImage(image_file) if decodeOnly else QPixmap(image_file)
 							if pixmap.isNull():
 								raise ValueError('Not found or unrecognised format')
 							if tokens[1] == 'LOOSE': # LOOSE STRIP BAY BACKGROUND
@@ -159,6 +164,20 @@ def read_bg_img(icao, db):
 		return [], []
 
 
+def bg_img_pixmaps(radar_background_layers, loose_strip_bay_backgrounds):
+	'''
+	converts the images of a read_bg_img(..., decodeOnly=True) result; must be called in the GUI thread
+	'''
+	radar_layers = []
+	for is_pixmap, src, title, constr in radar_background_layers:
+		if is_pixmap:
+			img, nw, se = constr
+			constr = QPixmap.fromImage(img), nw, se
+		radar_layers.append((is_pixmap, src, title, constr))
+	loose_backgrounds = [(src, QPixmap.fromImage(img), scale, title) for src, img, scale, title in loose_strip_bay_backgrounds]
+	return radar_layers, loose_backgrounds
+
+
 
 
 ##-----------------------------------##
@@ -208,6 +227,38 @@ def get_ground_elevation_map(location_code):
 
 
 
+##-----------------------------------##
+##                                   ##
+##      WORLD MAGNETIC MODEL         ##
+##                                   ##
+##-----------------------------------##
+
+
+def load_world_magnetic_model():
+	'''
+	reads a coefficient file in the NOAA "WMM.COF" format
+	'''
+	try:
+		with open(magnetic_model_file, encoding='utf8') as f:
+			header = f.readline().split()
+			world_magnetic_model.setEpoch(header[1], float(header[0]))
+			for line in f:
+				tokens = line.split()
+				if len(tokens) == 6:
+					world_magnetic_model.setCoefficients(int(tokens[0]), int(tokens[1]), *(float(token) for token in tokens[2:]))
+				elif len(tokens) == 1 and set(tokens[0]) == {'9'}: # end of coefficients
+					break
+				elif tokens != []:
+					print('Error on magnetic model line: %s' % line.strip())
+	except (IndexError, ValueError):
+		print('Bad magnetic model header in file: %s' % magnetic_model_file)
+	except FileNotFoundError:
+		print('Magnetic model file not found: %s' % magnetic_model_file)
+
+
+
+
+
 ##-----------------------------------------##
 ##                                         ##
 ##   AIRCRAFT DATA BASE + FGFS RENDERING   ##
@@ -341,8 +392,8 @@ def load_speech_data_file(src_file, fill_dict, clearDict=True):
 def load_airlines_db():
 	load_speech_data_file(airlines_speech_file, phon_airlines)
 
-def load_local_navpoint_speech_data(location):
-	load_speech_data_file(navpoint_speech_file_fmt % location, phon_navpoints)
+def load_local_navpoint_speech_data(location, fill_dict=phon_navpoints):
+	load_speech_data_file(navpoint_speech_file_fmt % location, fill_dict)
 
 
 
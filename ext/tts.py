@@ -1,12 +1,15 @@
 import re
+from time import monotonic
 from random import randint, choice
+from functools import lru_cache
 
-from PyQt5.QtCore import QThread
+from PyQt5.QtCore import QThread, QMutex, QMutexLocker
 
 from data.db import phon_airlines, phon_navpoints, get_TTS_string
 
 from session.config import settings
 from session.env import env
+from session.profiling import profiler
 
 try:
 	import pyttsx3
@@ -20,6 +23,8 @@ except ImportError:
 voice_rate_mean_value = 200 # words per minute
 voice_rate_max_diff = 30 # words per minute
 
+max_speech_queue_wait = 12 # seconds; older pending messages are dropped
+
 # Text-to-TTS backslashed command regexp groups: 1=command; 2=contents
 TTS_cmd_regexp = re.compile('\\\\(\w+)\{([^}]*)\}')
 
@@ -54,7 +59,22 @@ def new_voice():
 
 
 
+class PendingSpeech:
+	def __init__(self, calling_acft, text):
+		self.caller = calling_acft.identifier
+		self.coords = calling_acft.coords # function, to locate the RDF signal when speech starts
+		self.voice = calling_acft.pilotVoice()
+		self.text = text
+		self.queued_at = monotonic()
+
+
+
 class SpeechSynthesiser(QThread):
+	'''
+	Messages are queued and spoken in turn, without cutting each other off.
+	A caller's message still waiting to be spoken is superseded by its newer ones,
+	and messages waiting for too long are dropped instead of lagging behind the traffic.
+	'''
 	def __init__(self, gui):
 		'''
 		raises ImportError if the driver is not installed
@@ -64,12 +84,22 @@ class SpeechSynthesiser(QThread):
 		self.engine = pyttsx3.init(driverName=settings.TTS_driver)
 		vdct = { v.id: set(lang.decode('utf8') for lang in v.languages) for v in self.engine.getProperty('voices') }
 		en_voices.extend(vid for vid, langs in vdct.items() if any('en' in lang for lang in langs))
-		self.engine.connect('finished-utterance', self.onFinishUtterance) # NOTE if needed: this returns a token enabling disconnect
+		self.queue_lock = QMutex(QMutex.Recursive) # engine callbacks may fire while saying
+		self.pending = [] # PendingSpeech list, waiting for the engine to be free
+		self.speaking = None # PendingSpeech being spoken, or None if engine is idle
+		# NOTE if needed: the "connect" calls below return tokens enabling disconnect
+		self.engine.connect('started-utterance', self.onStartUtterance)
+		self.engine.connect('finished-utterance', self.onFinishUtterance)
 
 	def startup(self):
+		clear_speech_caches() # location-specific navpoint pronunciations may have changed
+		self.pending.clear()
+		self.speaking = None
 		self.start()
 
 	def shutdown(self):
+		with QMutexLocker(self.queue_lock):
+			self.pending.clear()
 		self.engine.endLoop()
 		en_voices.clear()
 
@@ -78,15 +108,34 @@ class SpeechSynthesiser(QThread):
 
 	def radioMsg(self, calling_acft, text):
 		if not settings.session_start_sound_lock:
-			self.engine.stop()
-			QThread.msleep(100)
-			self.engine.setProperty('voice', calling_acft.pilotVoice().driver_id)
-			self.engine.setProperty('rate', calling_acft.pilotVoice().rate)
-			env.rdf.receiveSignal(calling_acft.identifier, calling_acft.coords)
-			self.engine.say(text, calling_acft.identifier) # callsign used as name for callback on end of utterance
+			with QMutexLocker(self.queue_lock):
+				self.pending = [p for p in self.pending if p.caller != calling_acft.identifier] # superseded
+				self.pending.append(PendingSpeech(calling_acft, text))
+				if self.speaking == None:
+					self._sayNext()
+	
+	def _sayNext(self): # CAUTION: call with queue lock held
+		t = monotonic()
+		self.pending = [p for p in self.pending if t - p.queued_at <= max_speech_queue_wait]
+		if self.pending == []:
+			self.speaking = None
+		else:
+			self.speaking = self.pending.pop(0)
+			self.engine.setProperty('voice', self.speaking.voice.driver_id)
+			self.engine.setProperty('rate', self.speaking.voice.rate)
+			self.engine.say(self.speaking.text, self.speaking.caller) # callsign used as name for callbacks
+	
+	def onStartUtterance(self, name): # callback signature imposed by pyttsx3
+		with QMutexLocker(self.queue_lock):
+			if self.speaking != None and self.speaking.caller == name:
+				if profiler.enabled:
+					profiler.record('speech time to first audio', monotonic() - self.speaking.queued_at)
+				env.rdf.receiveSignal(name, self.speaking.coords)
 		
 	def onFinishUtterance(self, name, completed): # callback signature imposed by pyttsx3
 		env.rdf.dieSignal(name) # name is the original caller, used as RDF signal key
+		with QMutexLocker(self.queue_lock):
+			self._sayNext()
 
 
 # -------------------------------
@@ -99,6 +148,12 @@ def speech_str2tts(cmd_str):
 	return TTS_cmd_regexp.sub((lambda match: tts_string(match.group(1), match.group(2))), cmd_str)
 
 
+def clear_speech_caches():
+	for f in tts_string, speak_callsign_tail_number, speak_callsign_commercial_flight:
+		f.cache_clear()
+
+
+@lru_cache(maxsize=1024)
 def tts_string(cmd, arg):
 	if cmd == 'SPELL_ALPHANUMS':
 		return alphanum_word_regexp.sub((lambda match: speak_alphanums(match.group(0))), arg)
@@ -151,6 +206,7 @@ def tts_string(cmd, arg):
 def speak_alphanums(s):
 	return ' '.join(alphanum_tokens[tok] for tok in s)
 
+@lru_cache(maxsize=256)
 def speak_callsign_tail_number(tail_number, shorten=False):
 	str_split = tail_number.split('-')
 	if shorten:
@@ -172,6 +228,7 @@ def speak_callsign_tail_number(tail_number, shorten=False):
 		return speak_alphanums(''.join(str_split))
 
 
+@lru_cache(maxsize=256)
 def speak_callsign_commercial_flight(airline, flight_number):
 	res = [get_TTS_string(phon_airlines, airline)]
 	n = int(flight_number)
@@ -352,54 +352,6 @@ def import_airway_data():
 # =============================================== #
 
 
-def get_airport_data(icao):
-	result = AirportData()
-	result.navpoint = world_navpoint_db.findAirfield(icao)
-	
-	# START WITH SIMPLE ONE-LINERS
-	with open_airport_file(icao) as f:
-		for line in f:
-			row_type = line_code(line)
-			
-			if is_xplane_airport_header(line): # HEADER LINE; get elevation
-				tokens = line.split(maxsplit=2)
-				result.field_elevation = float(tokens[1])
-				
-			elif row_type == 100: # RUNWAY
-				tokens = line.split()
-				width = float(tokens[1])
-				surface = int(tokens[2])
-				name, lat, lon, disp_thr = tokens[8:12]
-				rwy1 = DirRunway(name, EarthCoords(float(lat), float(lon)), float(disp_thr))
-				name, lat, lon, disp_thr = tokens[17:21]
-				rwy2 = DirRunway(name, EarthCoords(float(lat), float(lon)), float(disp_thr))
-				result.addPhysicalRunway(width, surface, rwy1, rwy2)
-				
-			elif row_type == 102: # HELIPAD
-				tokens = line.split()
-				row_code, name, lat, lon, ori, l, w, surface = tokens[:8]
-				centre = EarthCoords(float(lat), float(lon))
-				result.helipads.append(Helipad(name, centre, int(surface), float(l), float(w), Heading(float(ori), True)))
-				
-			elif row_type == 14: # VIEWPOINT (NOTE: ATC-pie allows for more than one, though X-plane specifies one or zero)
-				row_code, lat, lon, height, ignore, name = line.split(maxsplit=5)
-				result.viewpoints.append((EarthCoords(float(lat), float(lon)), float(height), name.strip()))
-				
-			elif row_type == 19: # WINDSOCK
-				row_code, lat, lon, ignore_rest_of_line = line.split(maxsplit=3)
-				result.windsocks.append(EarthCoords(float(lat), float(lon)))
-				
-			elif row_type == 1302: # METADATA RECORD
-				tokens = line.split()
-				if len(tokens) == 3 and tokens[1] == 'transition_alt':
-					result.transition_altitude = int(tokens[2])
-	
-	# NOW COMPLEX MULTI-LINE READS
-	result.ground_net = get_ground_network(icao)
-	
-	return result
-
-
 # X-PLANE runway line example:
 # 100 29.87 1 1 0.00 0 2 1 07L 48.75115000 002.09846100 0.00 178.61 2 0 0 1 25R 48.75439400 002.11289900 0.00 0.00 2 1 0 0
 #
@@ -446,10 +398,6 @@ def get_airport_data(icao):
 # 4: name
 
 
-
-
-
-
 # X-PLANE frequency line example:
 # 50 11885 ATIS
 #
@@ -458,137 +406,184 @@ def get_airport_data(icao):
 # 1: integer frequency in 100*Hz
 # 2: description
 
-def get_frequencies(icao):
-	with open_airport_file(icao) as f:
-		result = []
-		for line in f:
-			tokens = line.split(maxsplit=2)
-			if tokens != []:
-				try:
-					comm_freq = CommFrequency('%s.%s' % (tokens[1][:3], tokens[1][3:])) # using a str so that it is correctly converted to an 8.33kHz-spaced freq
-					freq_type = { '50':'recorded', '51':'A/A', '52':'DEL', '53':'GND', '54':'TWR', '55':'APP', '56':'DEP' }[tokens[0]]
-					result.append((comm_freq, tokens[2].strip(), freq_type))
-				except (ValueError, KeyError, IndexError):
-					pass
-	return sorted(result, key=(lambda frqdata: str(frqdata[0])))
+frequency_types = { 50:'recorded', 51:'A/A', 52:'DEL', 53:'GND', 54:'TWR', 55:'APP', 56:'DEP' }
 
 
+# Example of TAXIWAY NODE spec line
+#   1201 47.53752190 -122.30826710 both 5416 A_start
+# Columns:
+#   1-2: lat-lon
+#   4: ID
 
+# Example of TAXIWAY EDGE spec line
+#   1202 5416 5417 twoway taxiway A
+# Columns:
+#   1-2: vertices
+#   4: "taxiway" or "runway" if on runway
+#   5: TWY name
 
-def get_airport_boundary(ICAO):
-	with open_airport_file(ICAO) as f:
-		result = []
-		line = f.readline()
-		line_number = 1
-		while line != '' and not line_code(line) == 130: # Airport boundary section
-			line = f.readline()
-			line_number += 1
-		if line != '':
-			path, _, closed, lines_read = read_xplane_node_sequence(f)
-			line_number += lines_read
-			if not closed:
-				print('Line %d: Boundary should end with a closing node' % line_number)
-			return path
+# Example of PARKING POSITION spec line
+#   1300 47.43931757 -122.29806851 88.78 gate jets|turboprops A2
+# Columns:
+#   1-2: lat-lon
+#   3: true heading when ACFT is parked
+#   4: "gate", "hangar", "misc" or "tie-down" ("misc" not considered as parking)
+#   5: pipe-deparated list heavy|jets|turboprops|props|helos or "all"
+#   6: unique name of position
+
+
+
+
+class ParsedAirport:
+	'''
+	Everything read from an airport file in one pass. Parsed airports are cached and shared
+	between all radar scenes and AirportData objects, so must not be modified after parsing.
+	'''
+	def __init__(self):
+		self.field_elevation = None
+		self.transition_altitude = None
+		self.runway_specs = [] # (width, surface, RWY 1 spec, RWY 2 spec) tuples; RWY specs are (name, thr coords, disp thr) tuples
+		self.helipad_specs = [] # Helipad constructor argument tuples
+		self.viewpoints = [] # (coords, height, name) tuples
+		self.windsocks = [] # coordinates
+		self.frequencies = [] # (CommFrequency, descr str, type str) tuples, sorted
+		self.boundary = None # QPainterPath
+		self.tarmac = [] # (descr str, surface int code, QPainterPath) tuples
+		self.holding_lines = [] # QPainterPath list
+		self.twy_centre_lines = [] # QPainterPath list
+		self.ground_net = GroundNetwork()
+
+
+parsed_airports = {} # ICAO -> ParsedAirport; cleared on every location launch
+
+def parsed_airport(icao):
+	try:
+		return parsed_airports[icao]
+	except KeyError:
+		result = parsed_airports[icao] = parse_airport_file(icao)
+		return result
 
+def forget_parsed_airports():
+	parsed_airports.clear()
 
-def get_taxiways(ICAO):
+
+def get_airport_data(icao):
 	'''
-	returns a list of (descr str, surface int code, QPainterPath) tuples
-	Each tuple defines a taxiway, to be drawn with the QPainterPath.
+	Returns a fresh AirportData (runway states are per object), built from the cached parsed airport.
 	'''
-	with open_airport_file(ICAO) as f:
-		result = []
+	result = AirportData()
+	result.navpoint = world_navpoint_db.findAirfield(icao)
+	parsed = parsed_airport(icao)
+	result.field_elevation = parsed.field_elevation
+	result.transition_altitude = parsed.transition_altitude
+	for width, surface, rwy1_spec, rwy2_spec in parsed.runway_specs:
+		result.addPhysicalRunway(width, surface, DirRunway(*rwy1_spec), DirRunway(*rwy2_spec))
+	result.helipads = [Helipad(*spec) for spec in parsed.helipad_specs]
+	result.viewpoints = list(parsed.viewpoints)
+	result.windsocks = list(parsed.windsocks)
+	result.ground_net = parsed.ground_net # not modified after parsing, so safely shared
+	return result
+
+
+def get_frequencies(icao):
+	return list(parsed_airport(icao).frequencies)
+
+
+def parse_airport_file(icao):
+	result = ParsedAirport()
+	source_edges = [] # GroundNetwork pretty labelling breaks if we add duplicate edges
+	with open_airport_file(icao) as f:
 		line = f.readline()
 		line_number = 1
 		while line != '': # not EOF
-			if line_code(line) == 110: # TWY section
+			row_type = line_code(line)
+			next_line = None # set when a section reader has already read the line after it
+			
+			if is_xplane_airport_header(line): # HEADER LINE; get elevation
+				tokens = line.split(maxsplit=2)
+				result.field_elevation = float(tokens[1])
+				
+			elif row_type == 100: # RUNWAY
+				tokens = line.split()
+				width = float(tokens[1])
+				surface = int(tokens[2])
+				name1, lat1, lon1, dthr1 = tokens[8:12]
+				name2, lat2, lon2, dthr2 = tokens[17:21]
+				result.runway_specs.append((width, surface, \
+						(name1, EarthCoords(float(lat1), float(lon1)), float(dthr1)), \
+						(name2, EarthCoords(float(lat2), float(lon2)), float(dthr2))))
+				
+			elif row_type == 102: # HELIPAD
+				tokens = line.split()
+				row_code, name, lat, lon, ori, l, w, surface = tokens[:8]
+				centre = EarthCoords(float(lat), float(lon))
+				result.helipad_specs.append((name, centre, int(surface), float(l), float(w), Heading(float(ori), True)))
+				
+			elif row_type == 14: # VIEWPOINT (NOTE: ATC-pie allows for more than one, though X-plane specifies one or zero)
+				row_code, lat, lon, height, ignore, name = line.split(maxsplit=5)
+				result.viewpoints.append((EarthCoords(float(lat), float(lon)), float(height), name.strip()))
+				
+			elif row_type == 19: # WINDSOCK
+				row_code, lat, lon, ignore_rest_of_line = line.split(maxsplit=3)
+				result.windsocks.append(EarthCoords(float(lat), float(lon)))
+				
+			elif row_type == 1302: # METADATA RECORD
+				tokens = line.split()
+				if len(tokens) == 3 and tokens[1] == 'transition_alt':
+					result.transition_altitude = int(tokens[2])
+				
+			elif row_type in frequency_types: # COMM FREQUENCY
+				tokens = line.split(maxsplit=2)
+				try:
+					comm_freq = CommFrequency('%s.%s' % (tokens[1][:3], tokens[1][3:])) # using a str so that it is correctly converted to an 8.33kHz-spaced freq
+					result.frequencies.append((comm_freq, tokens[2].strip(), frequency_types[row_type]))
+				except (ValueError, IndexError):
+					pass
+				
+			elif row_type == 130: # AIRPORT BOUNDARY (first one only)
+				path, _, closed, lines_read = read_xplane_node_sequence(f)
+				line_number += lines_read
+				if not closed:
+					print('Line %d: Boundary should end with a closing node' % line_number)
+				if result.boundary == None:
+					result.boundary = path
+				
+			elif row_type == 110: # TWY SECTION
 				header_tokens = line.strip().split(maxsplit=4)
 				#Replaced because of dodgy data found at VHXX: row_code, surface, ignore1, ignore2, descr = header_tokens
 				surface = int(header_tokens[1])
 				descr = header_tokens[4] if len(header_tokens) == 5 else ''
-				#print('Reading TWY section: %s' % descr)
 				twy_path, _, closed, lines_read = read_xplane_node_sequence(f)
 				line_number += lines_read
 				if not closed:
 					print('Line %d: X-plane taxiway should end with a closing node' % line_number)
 				# Read holes on this TWY:
-				line = f.readline()
+				next_line = f.readline()
 				line_number += 1
-				while is_xplane_node_line(line):
-					hole_path, _, closed, lines_read = read_xplane_node_sequence(f, first_line=line)
+				while is_xplane_node_line(next_line):
+					hole_path, _, closed, lines_read = read_xplane_node_sequence(f, first_line=next_line)
 					line_number += lines_read
 					if not closed:
 						print('Line %d: TWY hole should end with a closing node' % line_number)
 					twy_path.addPath(hole_path)
-					line = f.readline() # for new loop (more holes)
+					next_line = f.readline() # for new loop (more holes)
 					line_number += 1
-				result.append((descr, surface, twy_path))
-			else:
-				line = f.readline() # for new loop (more TWYs)
-				line_number += 1
-	return result
-	
-
-
-
-def get_airport_linear_objects(icao):
-	with open_airport_file(icao) as f:
-		holding_lines = []
-		twy_centre_lines = []
-		line = f.readline()
-		line_number = 1
-		while line != '': # not EOF
-			if line_code(line) == 120: # Linear feature; header can contain a name (ignored here)
+				result.tarmac.append((descr, surface, twy_path))
+				
+			elif row_type == 120: # LINEAR FEATURE; header can contain a name (ignored here)
 				path, paint_sequence, closed, lines_read = read_xplane_node_sequence(f)
 				line_number += lines_read
 				if any(t in [4, 5, 6, 54, 55, 56] for t in paint_sequence): # holding line
-					holding_lines.append(path)
+					result.holding_lines.append(path)
 				elif any(t in [1, 7, 51, 57] for t in paint_sequence): # TWY centre line
-					twy_centre_lines.append(path)
-				#elif any(t in [2, 8, 9, 52, 58, 59] for t in paint_sequence): # other non TWY edge lines
-				#	print(paint_sequence)
-				#	.append(path)
-			line = f.readline() # for more linear objects
-			line_number += 1
-	return holding_lines, twy_centre_lines
-
-
-
-# Example of TAXIWAY NODE spec line
-#   1201 47.53752190 -122.30826710 both 5416 A_start
-# Columns:
-#   1-2: lat-lon
-#   4: ID
-
-# Example of TAXIWAY EDGE spec line
-#   1202 5416 5417 twoway taxiway A
-# Columns:
-#   1-2: vertices
-#   4: "taxiway" or "runway" if on runway
-#   5: TWY name
-
-# Example of PARKING POSITION spec line
-#   1300 47.43931757 -122.29806851 88.78 gate jets|turboprops A2
-# Columns:
-#   1-2: lat-lon
-#   3: true heading when ACFT is parked
-#   4: "gate", "hangar", "misc" or "tie-down" ("misc" not considered as parking)
-#   5: pipe-deparated list heavy|jets|turboprops|props|helos or "all"
-#   6: unique name of position
-
-
-def get_ground_network(icao):
-	with open_airport_file(icao) as f:
-		ground_net = GroundNetwork()
-		source_edges = [] # GroundNetwork pretty labelling breaks if we add duplicate edges
-		line = f.readline()
-		line_number = 1
-		while line != '': # not EOF
-			if line_code(line) == 1201: # TWY node
+					result.twy_centre_lines.append(path)
+				
+			elif row_type == 1201: # TWY node
 				tokens = line.strip().split(maxsplit=5)
 				lat, lon, ignore, nid = tokens[1:5]
-				ground_net.addNode(nid, EarthCoords(float(lat), float(lon)))
-			elif line_code(line) == 1202: # TWY edge
+				result.ground_net.addNode(nid, EarthCoords(float(lat), float(lon)))
+				
+			elif row_type == 1202: # TWY edge
 				tokens = line.strip().split(maxsplit=5)
 				v1, v2 = tokens[1:3]
 				twy_name = rwy_spec = None
@@ -602,22 +597,28 @@ def get_ground_network(icao):
 				else:
 					source_edges.append({v1, v2})
 					try:
-						ground_net.addEdge(v1, v2, rwy_spec, twy_name)
+						result.ground_net.addEdge(v1, v2, rwy_spec, twy_name)
 					except KeyError:
 						print('Line %d: Invalid node for taxiway edge spec' % line_number)
-			elif line_code(line) == 1300: # parking_position
+				
+			elif row_type == 1300: # parking_position
 				tokens = line.strip().split(maxsplit=6)
 				if len(tokens) == 7:
 					lat, lon, hdg, typ, who, pkid = tokens[1:7]
 					if typ in ['gate', 'hangar', 'tie-down']:
 						pos = EarthCoords(float(lat), float(lon))
 						cats = [] if who == 'all' else who.split('|')
-						ground_net.addParkingPosition(pkid, pos, Heading(float(hdg), True), typ, cats)
+						result.ground_net.addParkingPosition(pkid, pos, Heading(float(hdg), True), typ, cats)
 				else:
 					print('Line %d: Invalid parking position spec' % line_number)
-			line = f.readline() # for new loop (more TWYs)
-			line_number += 1
-		return ground_net
+			
+			if next_line == None:
+				line = f.readline()
+				line_number += 1
+			else:
+				line = next_line
+	result.frequencies.sort(key=(lambda frqdata: str(frqdata[0])))
+	return result
 
 
 
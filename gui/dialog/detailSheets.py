@@ -29,6 +29,7 @@ from gui.widgets.miscWidgets import RadioKeyEventFilter
 
 unracked_strip_str = '(unracked)'
 link_new_FPL_str = 'New flight plan (opens editor)'
+FPL_match_time_window = timedelta(hours=12) # either side of current time
 
 # -------------------------------
 
@@ -36,7 +37,7 @@ link_new_FPL_str = 'New flight plan (opens editor)'
 
 def strip_sheet_FPL_match(callsign_filter, fpl):
 	return callsign_filter.upper() in some(fpl[FPL.CALLSIGN], '').upper() \
-			and env.linkedStrip(fpl) == None and fpl.flightIsInTimeWindow(timedelta(hours=12))
+			and env.linkedStrip(fpl) == None and fpl.flightIsInTimeWindow(FPL_match_time_window)
 
 
 
@@ -212,7 +213,9 @@ class StripDetailSheetDialog(QDialog, Ui_stripDetailsDialog, SharedDetailSheet):
 			self.linkFPL_reset_button.setEnabled(False)
 	
 	def updateMatchingFPLs(self, cs):
-		self.FPL_matches = env.FPLs.findAll(lambda fpl: strip_sheet_FPL_match(cs, fpl))
+		t = now()
+		self.FPL_matches = env.FPLs.findAll(lambda fpl: strip_sheet_FPL_match(cs, fpl), \
+				time_window=(t - FPL_match_time_window, t + FPL_match_time_window))
 		self.matchingFPLs_button.setVisible(len(self.FPL_matches) > 0)
 		self.matchingFPLs_button.setText('(%d)' % len(self.FPL_matches))
 	
@@ -1,9 +1,10 @@
 
 import re
 from math import atan, degrees
+from datetime import timedelta
 
 from PyQt5.QtCore import Qt, QDateTime, QTime, QAbstractTableModel
-from PyQt5.QtWidgets import QDialog, QMessageBox, QColorDialog, QLabel
+from PyQt5.QtWidgets import QDialog, QMessageBox, QColorDialog, QLabel, QMenu, QAction, QActionGroup
 from PyQt5.QtGui import QIcon
 
 from ui.postLennySessionDialog import Ui_postLennySessionDialog
@@ -33,6 +34,7 @@ from gui.widgets.miscWidgets import RadioKeyEventFilter
 # ---------- Constants ----------
 
 version_string_placeholder = '##version##'
+discarded_strips_time_filters = [('Any time', None), ('Last 15 min', timedelta(minutes=15)), ('Last hour', timedelta(hours=1))]
 
 # -------------------------------
 
@@ -204,10 +206,42 @@ class DiscardedStripsDialog(QDialog, Ui_discardedStripsDialog):
 		self.setWindowTitle(dialog_title)
 		self.model = view_model
 		self.strip_view.setModel(view_model)
+		self.time_filter = None # max age of strips listed
+		self.filterCallsign_edit.setClearButtonEnabled(True)
+		self.filterSQ_edit.setClearButtonEnabled(True)
+		time_action_group = QActionGroup(self)
+		for text, max_age in discarded_strips_time_filters:
+			action = QAction(text, self)
+			action.setCheckable(True)
+			action.setChecked(max_age == None)
+			action.triggered.connect(lambda ignore_checked, t=max_age: self.filterTime(t))
+			time_action_group.addAction(action)
+		time_filter_menu = QMenu(self)
+		time_filter_menu.addActions(time_action_group.actions())
+		self.filterTime_button.setMenu(time_filter_menu)
+		self.filterCallsign_edit.textChanged.connect(self.filterCallsign)
+		self.filterSQ_edit.textChanged.connect(self.filterSQ)
 		self.clear_button.clicked.connect(self.model.forgetStrips)
 		self.recall_button.clicked.connect(self.recallSelectedStrips)
 		self.close_button.clicked.connect(self.accept)
 	
+	def filterCallsign(self, text):
+		self.model.setSearch(callsign=(None if text.strip() == '' else text.strip()))
+	
+	def filterSQ(self, text):
+		try:
+			self.model.setSearch(squawk=(None if text.strip() == '' else int(text, 8)))
+		except ValueError:
+			self.model.setSearch(squawk=-1) # no match for an invalid code
+	
+	def filterTime(self, max_age):
+		self.time_filter = max_age
+		self.model.setSearch(time_range=(None if max_age == None else (now() - max_age, None)))
+	
+	def showEvent(self, event):
+		if self.time_filter != None: # slide time window to now
+			self.filterTime(self.time_filter)
+	
 	def recallSelectedStrips(self):
 		strips = [self.model.stripAt(index) for index in self.strip_view.selectedIndexes()]
 		if strips != []:
@@ -107,19 +107,29 @@ class MouseOverLabelledItem(QGraphicsItem):
 		self.child_item = graphics_item
 		self.child_item.setParentItem(self)
 		self.setFlag(QGraphicsItem.ItemIgnoresTransformations, self.child_item.flags() & QGraphicsItem.ItemIgnoresTransformations)
-		self.label_item = MouseOverTextLabelItem(self, lbl_colour_name)
-		self.label_item.setPos(0, self.child_item.boundingRect().top())
-		self.label_item.setVisible(False)
+		self.label_item = None # created on first mouse-over or pin; most never get one
+		self.label_text = ''
+		self.label_colour_name = lbl_colour_name
 		self.setAcceptHoverEvents(True)
 		self.pin_layer = pin_layer
 	
+	def _labelItem(self):
+		if self.label_item == None:
+			self.label_item = MouseOverTextLabelItem(self, self.label_colour_name)
+			self.label_item.setLabelText(self.label_text)
+			self.label_item.setPos(0, self.child_item.boundingRect().top())
+			self.label_item.setVisible(False)
+		return self.label_item
+	
 	def setMouseOverText(self, text):
-		self.label_item.setLabelText(text)
+		self.label_text = text
+		if self.label_item != None:
+			self.label_item.setLabelText(text)
 	
 	def pinLabel(self, toggle):
 		assert self.pin_layer != None
 		self.setAcceptHoverEvents(not toggle)
-		self.label_item.setPlacedAbove(not toggle)
+		self._labelItem().setPlacedAbove(not toggle)
 		self.label_item.setVisible(toggle)
 		if toggle:
 			self.label_item.setPos(0, self.child_item.boundingRect().bottom())
@@ -137,10 +147,11 @@ class MouseOverLabelledItem(QGraphicsItem):
 		return not self.acceptHoverEvents()
 	
 	def hoverEnterEvent(self, event):
-		self.label_item.setVisible(True)
+		self._labelItem().setVisible(True)
 	
 	def hoverLeaveEvent(self, event):
-		self.label_item.setVisible(False)
+		if self.label_item != None:
+			self.label_item.setVisible(False)
 	
 	def mouseDoubleClickEvent(self, event):
 		if self.pin_layer != None and event.button() == Qt.LeftButton and not event.modifiers() & Qt.ShiftModifier:
@@ -165,21 +176,26 @@ class MouseOverTextLabelItem(QGraphicsItem):
 		self.text = ''
 		self.colour_name = colour_name
 		self.placed_above = True
+		self.bounding_rect = None # cached on first use; font metrics are costly
 	
 	def setPlacedAbove(self, b):
-		self.placed_above = b
 		self.prepareGeometryChange()
+		self.placed_above = b
+		self.bounding_rect = None
 	
 	def setLabelText(self, text):
-		self.text = text
 		self.prepareGeometryChange()
+		self.text = text
+		self.bounding_rect = None
 	
 	def boundingRect(self):
-		rect = QRectF(QFontMetrics(self.scene().font()).boundingRect(text_label_max_rect, Qt.AlignCenter, self.text))
-		width = rect.width() + 2 * MouseOverTextLabelItem.margin
-		height = rect.height() + 2 * MouseOverTextLabelItem.margin
-		top_coord = -height if self.placed_above else 0
-		return QRectF(-width / 2, top_coord, width, height)
+		if self.bounding_rect == None:
+			rect = QRectF(QFontMetrics(self.scene().font()).boundingRect(text_label_max_rect, Qt.AlignCenter, self.text))
+			width = rect.width() + 2 * MouseOverTextLabelItem.margin
+			height = rect.height() + 2 * MouseOverTextLabelItem.margin
+			top_coord = -height if self.placed_above else 0
+			self.bounding_rect = QRectF(-width / 2, top_coord, width, height)
+		return self.bounding_rect
 		
 	def paint(self, painter, option, widget):
 		painter.setPen(new_pen(settings.colour(self.colour_name)))
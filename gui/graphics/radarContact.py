@@ -47,12 +47,26 @@ taxiing_maxSpeed = Speed(30) # speed above which aircraft are considered airborn
 
 # ============  ROOT ITEM (all child items follow)  ============
 
+class Dirty:
+	'''
+	Flags for what changed since an AircraftItem was last updated.
+	'''
+	POSITION = 1   # new radar blip: position, history, transponder, soft links
+	STRIP = 2      # linked strip details
+	SELECTION = 4  # selected aircraft or scene display options
+	CONFLICT = 8   # conflict status (detected on update)
+	ALL = POSITION | STRIP | SELECTION | CONFLICT
+
+
 class AircraftItem(QGraphicsItem):
 	
 	def __init__(self, acft):
 		QGraphicsItem.__init__(self, parent=None)
 		self.radar_contact = acft
 		self.setAcceptedMouseButtons(Qt.NoButton)
+		self.setFlag(QGraphicsItem.ItemHasNoContents, True)
+		self.dirty = Dirty.ALL
+		self.last_conflict = acft.conflict
 		# Children graphics items
 		self.route_item = RouteItem(self)
 		self.position_history_item = PositionHistoryItem(self)
@@ -64,12 +78,21 @@ class AircraftItem(QGraphicsItem):
 		self.radar_tag_item = RadarTagItem(self)
 		self.selection_indicator_item = SelectionIndicatorItem(self)
 	
-	def updateItem(self):
+	def updateItem(self, soft_link_strips=None):
 		'''
-		Update positions, rotations and visibility of child items and self
+		Update positions, rotations and visibility of child items and self, as far as dirty flags require.
+		soft_link_strips if given: dict of soft-linked strips keyed by id of their identified contact
 		'''
+		dirty = self.dirty
+		self.dirty = 0
+		if self.radar_contact.conflict != self.last_conflict:
+			self.last_conflict = self.radar_contact.conflict
+			dirty |= Dirty.CONFLICT
+		if dirty == 0:
+			return
 		selected = self.radar_contact is selection.acft
-		self.setPos(self.radar_contact.coords().toQPointF())
+		if dirty & Dirty.POSITION:
+			self.setPos(self.radar_contact.coords().toQPointF())
 		# self.acft_body_item always visible
 		self.selection_indicator_item.setVisible(selected)
 		# Update visibility of child items
@@ -83,12 +106,14 @@ class AircraftItem(QGraphicsItem):
 			self.radar_tag_item.setVisible(False)
 		else: # Regular case: radar visible and not ignored
 			strip = env.linkedStrip(self.radar_contact)
-			self.position_history_item.setVisible(True)
-			self.position_history_item.updateHistory()
+			if dirty & Dirty.POSITION or not self.position_history_item.isVisible():
+				self.position_history_item.setVisible(True)
+				self.position_history_item.updateHistory()
 			self.route_item.setVisible(Conflict.DEPENDS_ON_ALT <= self.radar_contact.conflict <= Conflict.PATH_CONFLICT \
 				or self.scene().show_all_routes \
 				or selected and self.scene().show_selected_ACFT_assignments)
-			self.route_item.updateRouteItem()
+			if self.route_item.isVisible(): # hidden route is recomputed when shown again
+				self.route_item.updateRouteItem()
 			self.separation_ring_item.setVisible(self.scene().show_separation_rings \
 				or self.radar_contact.conflict >= Conflict.DEPENDS_ON_ALT)
 			# Course line
@@ -101,13 +126,17 @@ class AircraftItem(QGraphicsItem):
 				self.vectors_item.setVisible(self.scene().show_all_vectors \
 					or selected and self.scene().show_selected_ACFT_assignments)
 			# Other
-			try:
-				sl_strip = env.strips.findStrip(lambda s: s.lookup(soft_link_detail) is self.radar_contact)
-				self.soft_link_indicator_item.setVisible(sl_strip.linkedAircraft() is not self.radar_contact)
-			except StopIteration:
-				self.soft_link_indicator_item.setVisible(False)
-			self.XPDR_call_indicator_item.setVisible(self.radar_contact.xpdrIdent() \
-					or self.radar_contact.xpdrCode() in XPDR_emergency_codes)
+			if dirty & (Dirty.POSITION | Dirty.STRIP):
+				if soft_link_strips == None:
+					try:
+						sl_strip = env.strips.findStrip(lambda s: s.lookup(soft_link_detail) is self.radar_contact)
+					except StopIteration:
+						sl_strip = None
+				else:
+					sl_strip = soft_link_strips.get(id(self.radar_contact), None)
+				self.soft_link_indicator_item.setVisible(sl_strip != None and sl_strip.linkedAircraft() is not self.radar_contact)
+				self.XPDR_call_indicator_item.setVisible(self.radar_contact.xpdrIdent() \
+						or self.radar_contact.xpdrCode() in XPDR_emergency_codes)
 			self.radar_tag_item.setVisible(self.scene().show_unlinked_tags or strip != None)
 			if self.radar_tag_item.isVisible():
 				self.radar_tag_item.updateInfoText()
@@ -5,16 +5,19 @@ from PyQt5.QtWidgets import QGraphicsItem, QGraphicsScene, QInputDialog
 from session.config import settings
 from session.env import env
 from session.manager import SessionType
+from session.profiling import profiler
 
-from ext.xplane import get_taxiways, get_airport_boundary, get_airport_linear_objects
+from ext.xplane import parsed_airport
 
 from data.acft import Aircraft
+from data.conflict import Conflict
 from data.coords import RadarCoords, EarthCoords, dist_str
 from data.params import Heading, TTF_str
 from data.nav import Navpoint
+from data.strip import soft_link_detail
 
 from gui.misc import signals, selection
-from gui.graphics.radarContact import AircraftItem
+from gui.graphics.radarContact import AircraftItem, Dirty
 from gui.graphics.radarTag import TextBoxItem
 from gui.graphics.airport import RunwayItem, HelipadItem, TarmacSectionItem, \
 		ParkingPositionItem, AirportGroundNetItem, AirportLinearObjectItem, WindsockItem, TowerItem
@@ -28,6 +31,8 @@ from gui.graphics.miscGraphics import new_pen, EmptyGraphicsItem, \
 bg_radar_circle_step = 20
 navpoint_indicator_timeout = 3000 # milliseconds
 init_speed_mark_count = 2 # one minute of fly time each
+offscreen_contact_margin = 100 # pixels around the view within which contacts are fully updated
+scene_BSP_tree_depth = 10 # fixed, so that adding/removing contacts does not trigger index rebuilds
 
 # -------------------------------
 
@@ -49,8 +54,32 @@ navpoint_colours = {
 	Navpoint.FIX: 'nav_fix', Navpoint.RNAV: 'nav_RNAV'
 }
 
+LOD_min_view_scales = { # layer -> minimum view scale (pixels per NM) for layer to be drawn
+	Layer.NAV_AIRFIELDS: 2, Layer.NAV_FIXES: 6, Layer.RNAV_POINTS: 6,
+	Layer.TAXIWAY_LINES: 50, Layer.HOLDING_LINES: 50, Layer.GROUND_NET: 50, Layer.PARKING_POSITIONS: 100
+}
+
+
 
+shared_navpoints = None # navpoint DB that the specs below were built from
+shared_navpoint_specs_by_layer = {} # layer -> (navpoint, label, QPointF) list
 
+def shared_navpoint_specs():
+	'''
+	Navpoint drawing specs computed once for all radar scenes, rebuilt if the navpoint DB changes.
+	'''
+	global shared_navpoints
+	if shared_navpoints is not env.navpoints:
+		shared_navpoint_specs_by_layer.clear()
+		for layer in navpoint_layers.values():
+			shared_navpoint_specs_by_layer[layer] = []
+		for p in env.navpoints.findAll(types=navpoint_layers.keys()):
+			if p.type == Navpoint.AD and p.code == settings.location_code:
+				continue # do not draw base airport navpoint
+			label = '%s\n%s' % (p.code, p.frequency) if p.type in [Navpoint.VOR, Navpoint.NDB] else p.code
+			shared_navpoint_specs_by_layer[navpoint_layers[p.type]].append((p, label, p.coordinates.toQPointF()))
+		shared_navpoints = env.navpoints
+	return shared_navpoint_specs_by_layer
 
 
 
@@ -158,10 +187,20 @@ class RadarScene(QGraphicsScene):
 		self.measuring_tool = MeasuringToolItem()
 		self.using_special_tool = False # Makes the difference between normal measuring and "special" tool
 		self.setBackgroundBrush(settings.colour('radar_background'))
+		self.setItemIndexMethod(QGraphicsScene.BspTreeIndex)
+		self.setBspTreeDepth(scene_BSP_tree_depth)
 		self.additional_AD_items = []
+		self.view_scale = None # pixels per NM, set by view for level of detail; None if unknown
+		self.layer_toggles = { l: True for l in Layer.radar_layer_names }
+		self.last_selected_ACFT = None
+		self.contact_update_timer = QTimer(self) # coalesces contact updates into one per event loop turn
+		self.contact_update_timer.setSingleShot(True)
+		self.contact_update_timer.setInterval(0)
+		self.contact_update_timer.timeout.connect(self.flushContactUpdates)
 		# Create layers
 		self.layers = { l:EmptyGraphicsItem() for l in Layer.radar_layer_names }
 		for layer in self.layers.values():
+			layer.setFlag(QGraphicsItem.ItemHasNoContents, True)
 			self.addItem(layer)
 		self.pinned_navpoints_layer = EmptyGraphicsItem()
 		self.addItem(self.pinned_navpoints_layer)
@@ -189,25 +228,8 @@ class RadarScene(QGraphicsScene):
 		if env.airport_data != None:
 			self._drawAirportData(env.airport_data, False) # things that are drawn for additional airports, but these do not reset
 		
-		# Populate navpoints
-		for p in env.navpoints.findAll(types=navpoint_layers.keys()):
-			if p.type == Navpoint.AD and p.code == settings.location_code:
-				continue # do not draw base airport navpoint
-			if p.type == Navpoint.VOR:
-				base_item = NavVORItem(p)
-			elif p.type == Navpoint.NDB:
-				base_item = NavNDBItem(p)
-			elif p.type == Navpoint.FIX:
-				base_item = NavFixItem(p)
-			elif p.type == Navpoint.RNAV:
-				base_item = RnavItem(p)
-			elif p.type == Navpoint.AD:
-				base_item = NavAirfieldItem(p)
-			label = '%s\n%s' % (p.code, p.frequency) if p.type in [Navpoint.VOR, Navpoint.NDB] else p.code
-			item = MouseOverLabelledItem(base_item, navpoint_colours[p.type], self.pinned_navpoints_layer)
-			item.setMouseOverText(label)
-			item.setPos(p.coordinates.toQPointF())
-			self.addToLayer(navpoint_layers[p.type], item)
+		# Navpoint layers are populated on first show (see setLayerVisible)
+		self.unpopulated_navpoint_layers = set(navpoint_layers.values())
 		
 		# Populate aircraft already in contact
 		for acft in env.radar.contacts():
@@ -221,7 +243,7 @@ class RadarScene(QGraphicsScene):
 		env.strips.rwyBoxFreed.connect(self.updateRunways)
 		env.rdf.signalChanged.connect(self.updateRdfLine)
 		signals.aircraftKilled.connect(self.removeAircraftItem)
-		signals.stripInfoChanged.connect(self.updateContacts)
+		signals.stripInfoChanged.connect(self.updateAfterStripInfoChanged)
 		signals.selectionChanged.connect(self.updateAfterSelectionChanged)
 		signals.runwayUseChanged.connect(self.updateRunwayNamesVisibility)
 		signals.generalSettingsChanged.connect(self.updateAfterGeneralSettingsChanged) # in case e.g. interpret XPDR FL toggle
@@ -239,7 +261,7 @@ class RadarScene(QGraphicsScene):
 		env.strips.rwyBoxFreed.disconnect(self.updateRunways)
 		env.rdf.signalChanged.disconnect(self.updateRdfLine)
 		signals.aircraftKilled.disconnect(self.removeAircraftItem)
-		signals.stripInfoChanged.disconnect(self.updateContacts)
+		signals.stripInfoChanged.disconnect(self.updateAfterStripInfoChanged)
 		signals.selectionChanged.disconnect(self.updateAfterSelectionChanged)
 		signals.runwayUseChanged.disconnect(self.updateRunwayNamesVisibility)
 		signals.generalSettingsChanged.disconnect(self.updateAfterGeneralSettingsChanged)
@@ -251,20 +273,19 @@ class RadarScene(QGraphicsScene):
 	
 	## MISC.
 	def _drawAirportData(self, ad_data, resets):
-		ad_boundary_path = get_airport_boundary(ad_data.navpoint.code)
-		holding_lines, twy_centre_lines = get_airport_linear_objects(ad_data.navpoint.code)
-		for twy in get_taxiways(ad_data.navpoint.code):
+		parsed = parsed_airport(ad_data.navpoint.code) # cached; no file read if already parsed
+		for twy in parsed.tarmac:
 			self.addToLayer(Layer.TARMAC, TarmacSectionItem(*twy), resets)
-		self.addToLayer(Layer.AIRPORT_OBJECTS, AirportLinearObjectItem(ad_boundary_path, 'nav_airfield'), resets)
+		self.addToLayer(Layer.AIRPORT_OBJECTS, AirportLinearObjectItem(parsed.boundary, 'nav_airfield'), resets)
 		for pos, height, name in ad_data.viewpoints:
 			item = TowerItem(name)
 			item.setPos(pos.toQPointF())
 			self.addToLayer(Layer.AIRPORT_OBJECTS, item, resets)
 		for windsock_coords in ad_data.windsocks:
 			self.addToLayer(Layer.AIRPORT_OBJECTS, WindsockItem(windsock_coords), resets)
-		for qpath in holding_lines:
+		for qpath in parsed.holding_lines:
 			self.addToLayer(Layer.HOLDING_LINES, AirportLinearObjectItem(qpath, 'AD_holding_lines'), resets)
-		for qpath in twy_centre_lines:
+		for qpath in parsed.twy_centre_lines:
 			self.addToLayer(Layer.TAXIWAY_LINES, AirportLinearObjectItem(qpath, 'AD_taxiway_lines'), resets)
 		for i in range(ad_data.physicalRunwayCount()):
 			self.addToLayer(Layer.RUNWAYS, RunwayItem(ad_data, i), resets)
@@ -279,6 +300,51 @@ class RadarScene(QGraphicsScene):
 		self.addToLayer(Layer.GROUND_NET, AirportGroundNetItem(ad_data.ground_net), resets)
 		self.updateRunwayNamesVisibility()
 	
+	def _populateNavpointLayer(self, layer):
+		if layer in self.unpopulated_navpoint_layers:
+			self.unpopulated_navpoint_layers.remove(layer)
+			for p, label, qpos in shared_navpoint_specs()[layer]:
+				if p.type == Navpoint.VOR:
+					base_item = NavVORItem(p)
+				elif p.type == Navpoint.NDB:
+					base_item = NavNDBItem(p)
+				elif p.type == Navpoint.FIX:
+					base_item = NavFixItem(p)
+				elif p.type == Navpoint.RNAV:
+					base_item = RnavItem(p)
+				elif p.type == Navpoint.AD:
+					base_item = NavAirfieldItem(p)
+				item = MouseOverLabelledItem(base_item, navpoint_colours[p.type], self.pinned_navpoints_layer)
+				item.setMouseOverText(label)
+				item.setPos(qpos)
+				self.addToLayer(layer, item)
+	
+	def setLayerVisible(self, layer, toggle):
+		self.layer_toggles[layer] = toggle
+		self._updateLayerVisibility(layer)
+	
+	def _updateLayerVisibility(self, layer):
+		min_scale = LOD_min_view_scales.get(layer, None)
+		show = self.layer_toggles[layer] and (min_scale == None or self.view_scale == None or self.view_scale >= min_scale)
+		if show:
+			self._populateNavpointLayer(layer)
+		self.layers[layer].setVisible(show)
+	
+	def setViewScale(self, scale):
+		self.view_scale = scale
+		for layer in LOD_min_view_scales:
+			self._updateLayerVisibility(layer)
+	
+	def visibleContactArea(self):
+		'''
+		Scene rect in which contacts are fully updated, or None if scene is not viewed.
+		'''
+		views = self.views()
+		if views == []:
+			return None
+		m = offscreen_contact_margin
+		return views[0].mapToScene(views[0].viewport().rect().adjusted(-m, -m, m, m)).boundingRect()
+	
 	def updateBgColours(self):
 		self.setBackgroundBrush(settings.colour('radar_background'))
 	
@@ -296,6 +362,7 @@ class RadarScene(QGraphicsScene):
 			self.additional_AD_items.append(item)
 	
 	def pinNavpoint(self, p):
+		self._populateNavpointLayer(navpoint_layers[p.type])
 		try:
 			next(item for item in self.layerItems(navpoint_layers[p.type]) if item.child_item.navpoint is p).pinLabel(True)
 		except StopIteration:
@@ -340,7 +407,7 @@ class RadarScene(QGraphicsScene):
 	def showGroundNetworks(self, toggle):
 		self.show_ground_networks = toggle
 		self.layers[Layer.GROUND_NET].setVisible(False)
-		self.layers[Layer.GROUND_NET].setVisible(True)
+		self._updateLayerVisibility(Layer.GROUND_NET)
 	
 	def showTaxiwayNames(self, toggle):
 		self.show_taxiway_names = toggle
@@ -394,6 +461,7 @@ class RadarScene(QGraphicsScene):
 		self.lock_pan_zoom = toggle
 	
 	def drawAdditionalAirportData(self, ad_data):
+		self._populateNavpointLayer(Layer.NAV_AIRFIELDS)
 		try: # look for item to replace
 			try: # in pinned items...
 				replaced = next(item for item in self.pinned_navpoints_layer.childItems() if \
@@ -444,7 +512,8 @@ class RadarScene(QGraphicsScene):
 			print('Graphics item not found for zombie %s' % zombie.identifier)
 	
 	def updateAfterRadarBlip(self):
-		self.updateContacts()
+		self.markContactsDirty(Dirty.POSITION)
+		self.flushContactUpdates()
 		self.updateRunways()
 		self.updateRdfLine()
 	
@@ -453,14 +522,46 @@ class RadarScene(QGraphicsScene):
 			if isinstance(item, RunwayItem):
 				item.updateItem()
 	
-	def updateContacts(self):
+	def markContactsDirty(self, flags, pred=None):
+		for item in self.layerItems(Layer.AIRCRAFT):
+			if pred == None or pred(item.radar_contact):
+				item.dirty |= flags
+	
+	@profiler.profiled('radar scene contact updates')
+	def flushContactUpdates(self):
+		'''
+		Updates dirty contact items. Those out of view are only moved, and keep their other updates pending
+		until they come into view, unless selected or in conflict (their routes can cross the view).
+		'''
+		self.contact_update_timer.stop()
+		visible_area = self.visibleContactArea()
+		soft_link_strips = None # built on first full update
 		for item in self.layerItems(Layer.AIRCRAFT):
-			item.updateItem()
-			item.setVisible(self.show_GND_modes or not item.radar_contact.xpdrGND() or env.linkedStrip(item.radar_contact) != None)
+			if item.dirty != 0:
+				contact = item.radar_contact
+				qpos = contact.coords().toQPointF()
+				if visible_area != None and not visible_area.contains(qpos) and contact is not selection.acft \
+						and max(contact.conflict, item.last_conflict) < Conflict.DEPENDS_ON_ALT:
+					item.setPos(qpos)
+				else:
+					if soft_link_strips == None:
+						soft_link_strips = { id(s.lookup(soft_link_detail)): s for s in env.strips.listStrips(lambda s: s.lookup(soft_link_detail) != None) }
+					item.updateItem(soft_link_strips=soft_link_strips)
+					item.setVisible(self.show_GND_modes or not contact.xpdrGND() or env.linkedStrip(contact) != None)
+	
+	def updateContacts(self):
+		self.markContactsDirty(Dirty.ALL)
+		self.flushContactUpdates()
+	
+	def updateAfterStripInfoChanged(self):
+		self.markContactsDirty(Dirty.STRIP)
+		self.contact_update_timer.start()
 	
 	def updateAfterSelectionChanged(self):
-		for item in self.layerItems(Layer.AIRCRAFT):
-			item.updateItem()
+		previous = self.last_selected_ACFT
+		self.last_selected_ACFT = selection.acft
+		self.markContactsDirty(Dirty.SELECTION, pred=(lambda acft: acft is previous or acft is selection.acft))
+		self.contact_update_timer.start()
 	
 	def updateAfterGeneralSettingsChanged(self):
 		for item in self.layerItems(Layer.AIRCRAFT):
@@ -1,8 +1,9 @@
-from PyQt5.QtWidgets import QWidget, QMessageBox
+from PyQt5.QtWidgets import QWidget, QMessageBox, QProgressDialog
 from ui.launcher import Ui_launcher
 
 from session.config import settings, default_map_range_AD, default_map_range_CTR, version_string, app_icon_path
 from session.env import env
+from session.loader import StagedLoader, LoadingStage
 
 from data.util import some
 from data.coords import EarthCoords
@@ -10,6 +11,8 @@ from data.nav import world_navpoint_db, Navpoint, NavpointError
 from data.radar import Radar
 from data.comms import RadioDirectionFinder
 from data.params import Heading
+from data.db import phon_navpoints
+from data.magnetic import world_magnetic_model
 
 from models.FPLs import FlightPlanModel
 from models.ATCs import AtcTableModel
@@ -18,9 +21,10 @@ from models.discardedStrips import DiscardedStripModel
 from models.cpdlc import CpdlcHistoryModel
 
 from ext.noaa import get_declination
-from ext.xplane import get_airport_data, get_frequencies, import_ILS_capabilities
-from ext.resources import read_bg_img, read_point_spec, get_ground_elevation_map, load_local_navpoint_speech_data
+from ext.xplane import get_airport_data, get_frequencies, import_ILS_capabilities, forget_parsed_airports
+from ext.resources import read_bg_img, bg_img_pixmaps, read_point_spec, get_ground_elevation_map, load_local_navpoint_speech_data
 
+from gui.misc import signals
 from gui.main import MainWindow
 
 
@@ -28,6 +32,7 @@ from gui.main import MainWindow
 
 min_map_range = 20
 max_map_range = 1000
+loading_progress_delay = 500 # ms before progress dialog shows up
 
 point_spec_help_message = 'Valid point specifications:' \
 	'\n - decimal coordinates, e.g. 35.8765,-90.567' \
@@ -47,6 +52,29 @@ def valid_location_code(code):
 
 
 
+## Location loading stages, run in worker threads (see session.loader)
+
+def load_airport(icao):
+	airport_data = get_airport_data(icao) # includes the ground network
+	import_ILS_capabilities(airport_data)
+	return airport_data
+
+def load_declination(): # radar position must be set
+	return world_magnetic_model.declination(env.radarPos()) if world_magnetic_model.isLoaded() else None
+
+def load_elevation_map(location_code):
+	try:
+		return get_ground_elevation_map(location_code)
+	except FileNotFoundError:
+		return None
+
+def load_navpoint_speech_data(location_code):
+	result = {}
+	load_local_navpoint_speech_data(location_code, fill_dict=result)
+	return result
+
+
+
 class ATCpieLauncher(QWidget, Ui_launcher):
 	def __init__(self, parent=None):
 		QWidget.__init__(self, parent)
@@ -56,6 +84,8 @@ class ATCpieLauncher(QWidget, Ui_launcher):
 		self.logo_widget.setStyleSheet('border-image: url(%s) 0 0 0 0 stretch stretch' % app_icon_path)
 		self.version_info.setText('Version: %s' % version_string)
 		self.last_selected_ICAO = None
+		self.location_loader = None
+		self.loading_progress = None
 		self.updateCtrLocationsList()
 		self.ctrLocationCode_edit.lineEdit().textChanged.connect(self.updateStartButton)
 		self.ctrLocationCode_edit.activated.connect(self.selectListedCtrLocation)
@@ -66,6 +96,7 @@ class ATCpieLauncher(QWidget, Ui_launcher):
 		self.radarPosHelp_button.clicked.connect(self.showRadarPosHelp)
 		self.start_button.clicked.connect(self.launchWithWindowInput)
 		self.exit_button.clicked.connect(self.close)
+		signals.mainWindowClosing.connect(self.cancelLocationLoading)
 		self.AD_radioButton.setChecked(True)
 	
 	def switchMode(self, ad_mode):
@@ -112,70 +143,141 @@ class ATCpieLauncher(QWidget, Ui_launcher):
 	
 	def launch(self, location_code, mapRange=None, ctrPos=None):
 		'''
-		Raise ValueError with error message if launch fails.
+		Starts loading the location data in the background; the session window opens when the essentials are ready.
+		Raise ValueError with error message if launch fails immediately; later failures are reported in a message box.
 		'''
 		settings.map_range = some(mapRange, (default_map_range_AD if ctrPos == None else default_map_range_CTR))
 		print('Setting up session %s in %s mode at location %s...' % \
 				(settings.sessionID(), ('AD' if ctrPos == None else 'CTR'), location_code))
-		try:
-			if ctrPos == None: # Airport mode
-				env.airport_data = get_airport_data(location_code)
-				import_ILS_capabilities(env.airport_data)
-				EarthCoords.setRadarPos(env.airport_data.navpoint.coordinates)
-				env.frequencies = get_frequencies(env.airport_data.navpoint.code)
-				try:
-					settings.restoreLocalSettings_AD(env.airport_data)
-					settings.first_time_at_location = False
-				except FileNotFoundError:
-					print('No airport settings file found; using defaults.')
-					settings.primary_METAR_station = location_code # guess on first run; AD may have a weather station
-				try:
-					env.elevation_map = get_ground_elevation_map(location_code)
-					print('Loaded ground elevation map.')
-				except FileNotFoundError:
-					print('No elevation map found; using field elevation.')
-			else: # CTR mode
+		env.airport_data = None
+		env.elevation_map = None
+		forget_parsed_airports() # those of previous sessions
+		settings.radar_background_images, settings.loose_strip_bay_backgrounds = [], [] # until loaded
+		stages = []
+		if ctrPos == None: # Airport mode
+			stages.append(LoadingStage('airport data', (lambda: load_airport(location_code)), apply=self.applyAirportData))
+			radar_pos_stages = ['airport data'] # radar position is the airport's
+			stages.append(LoadingStage('elevation map', (lambda: load_elevation_map(location_code)), \
+					apply=self.applyElevationMap, requires=radar_pos_stages, essential=False))
+		else: # CTR mode
+			try:
 				radar_position = read_point_spec(ctrPos, world_navpoint_db)
-				EarthCoords.setRadarPos(radar_position)
-				env.frequencies = []
-				try:
-					settings.restoreLocalSettings_CTR(location_code)
-					settings.first_time_at_location = False
-				except FileNotFoundError:
-					print('No CTR settings file found; using defaults.')
-				try:
-					if settings.CTR_radar_positions[location_code] != ctrPos:
-						print('Overriding previously saved radar position.')
-				except KeyError:
-					print('Creating new CTR position.')
-				settings.CTR_radar_positions[location_code] = ctrPos
-				self.updateCtrLocationsList()
-		except NavpointError as err:
-			raise ValueError('Navpoint error: %s' % err)
-		else:
+			except NavpointError as err:
+				raise ValueError('Navpoint error: %s' % err)
+			EarthCoords.setRadarPos(radar_position)
 			print('Radar position is: %s' % env.radarPos())
-			Heading.declination = get_declination(env.radarPos())
-			env.navpoints = world_navpoint_db.subDB(lambda p: env.pointOnMap(p.coordinates))
-			env.radar = Radar(self) # CAUTION: uses airport data; make sure it is already in env
-			env.rdf = RadioDirectionFinder(env.radarPos())
-			env.cpdlc = CpdlcHistoryModel(self)
-			env.strips = LiveStripModel(self)
-			env.FPLs = FlightPlanModel(self)
-			env.ATCs = AtcTableModel(self)
-			env.discarded_strips = DiscardedStripModel(self)
+			env.frequencies = []
 			try:
-				settings.restoreGeneralAndSystemSettings()
+				settings.restoreLocalSettings_CTR(location_code)
+				settings.first_time_at_location = False
 			except FileNotFoundError:
-				print('No general settings file found; using defaults.')
-			settings.radar_background_images, settings.loose_strip_bay_backgrounds = read_bg_img(location_code, env.navpoints)
-			load_local_navpoint_speech_data(location_code)
-			session_window = MainWindow(self)
-			session_window.show()
-			if settings.first_time_at_location:
-				title = 'New %s location' % ('radar centre' if env.airport_data == None else 'airport')
-				msg = 'This is your first time at %s.\nPlease configure location settings.' % location_code
-				QMessageBox.information(session_window, title, msg)
-				session_window.openLocalSettings()
-
+				print('No CTR settings file found; using defaults.')
+			try:
+				if settings.CTR_radar_positions[location_code] != ctrPos:
+					print('Overriding previously saved radar position.')
+			except KeyError:
+				print('Creating new CTR position.')
+			settings.CTR_radar_positions[location_code] = ctrPos
+			self.updateCtrLocationsList()
+			radar_pos_stages = []
+		stages.append(LoadingStage('magnetic declination', load_declination, apply=self.applyDeclination, requires=radar_pos_stages))
+		stages.append(LoadingStage('online declination', (lambda: get_declination(env.radarPos())), \
+				apply=self.applyOnlineDeclination, requires=['magnetic declination'], essential=False))
+		stages.append(LoadingStage('navpoints in range', (lambda: world_navpoint_db.rangeSubDB(env.radarPos(), settings.map_range)), \
+				apply=self.applyNavpointsInRange, requires=radar_pos_stages))
+		stages.append(LoadingStage('background images', (lambda: read_bg_img(location_code, env.navpoints, decodeOnly=True)), \
+				apply=self.applyBackgroundImages, requires=['navpoints in range'], essential=False))
+		stages.append(LoadingStage('navpoint speech data', (lambda: load_navpoint_speech_data(location_code)), \
+				apply=self.applyNavpointSpeechData))
+		self.location_loader = StagedLoader(stages, parent=self)
+		self.location_loader.stageApplied.connect(self.updateLoadingProgress)
+		self.location_loader.essentialsReady.connect(lambda: self.openSession(location_code))
+		self.location_loader.failed.connect(self.locationLoadingFailed)
+		self.loading_progress = QProgressDialog('Loading location data...', 'Cancel', 0, self.location_loader.essentialStageCount(), self)
+		self.loading_progress.setWindowTitle('Starting %s' % location_code)
+		self.loading_progress.setMinimumDuration(loading_progress_delay)
+		self.loading_progress.canceled.connect(self.userCancelledLoading)
+		self.loading_progress.setValue(0)
+		self.location_loader.start()
+	
+	def cancelLocationLoading(self):
+		if self.location_loader != None:
+			self.location_loader.cancel()
+	
+	def userCancelledLoading(self):
+		self.cancelLocationLoading()
+		print('Location loading cancelled.')
+		self.show()
+	
+	def updateLoadingProgress(self, stage_name):
+		if self.location_loader.stages[stage_name].essential:
+			self.loading_progress.setLabelText('Loaded %s.' % stage_name)
+			self.loading_progress.setValue(self.location_loader.appliedEssentialStageCount()) # closes dialog when complete
+	
+	def locationLoadingFailed(self, stage_name, error_message):
+		self.loading_progress.reset()
+		QMessageBox.critical(self, 'Start-up error', 'Error loading %s: %s' % (stage_name, error_message))
+		self.show()
+	
+	
+	## Stage results, applied in GUI thread
+	
+	def applyAirportData(self, airport_data):
+		env.airport_data = airport_data
+		EarthCoords.setRadarPos(env.airport_data.navpoint.coordinates)
+		print('Radar position is: %s' % env.radarPos())
+		env.frequencies = get_frequencies(env.airport_data.navpoint.code)
+		try:
+			settings.restoreLocalSettings_AD(env.airport_data)
+			settings.first_time_at_location = False
+		except FileNotFoundError:
+			print('No airport settings file found; using defaults.')
+			settings.primary_METAR_station = env.airport_data.navpoint.code # guess on first run; AD may have a weather station
+	
+	def applyElevationMap(self, elevation_map):
+		env.elevation_map = elevation_map
+		print('No elevation map found; using field elevation.' if elevation_map == None else 'Loaded ground elevation map.')
+	
+	def applyDeclination(self, declination):
+		Heading.declination = declination
+		if declination == None:
+			print('No magnetic model loaded; waiting for online declination.')
+	
+	def applyOnlineDeclination(self, declination):
+		if declination != None: # NOAA web service reached
+			if Heading.declination != None and abs(declination - Heading.declination) >= .1:
+				print('Online magnetic declination %.1f overrides local model value %.1f.' % (declination, Heading.declination))
+			Heading.declination = declination
+	
+	def applyNavpointsInRange(self, navpoints):
+		env.navpoints = navpoints
+	
+	def applyBackgroundImages(self, bg_img):
+		settings.radar_background_images, settings.loose_strip_bay_backgrounds = bg_img_pixmaps(*bg_img)
+		signals.backgroundImagesReloaded.emit()
+	
+	def applyNavpointSpeechData(self, speech_data):
+		phon_navpoints.clear()
+		phon_navpoints.update(speech_data)
+	
+	def openSession(self, location_code):
+		env.radar = Radar(self) # CAUTION: uses airport data; make sure it is already in env
+		env.rdf = RadioDirectionFinder(env.radarPos())
+		env.cpdlc = CpdlcHistoryModel(self)
+		env.strips = LiveStripModel(self)
+		env.FPLs = FlightPlanModel(self)
+		env.ATCs = AtcTableModel(self)
+		env.discarded_strips = DiscardedStripModel(self)
+		try:
+			settings.restoreGeneralAndSystemSettings()
+		except FileNotFoundError:
+			print('No general settings file found; using defaults.')
+		session_window = MainWindow(self)
+		session_window.show()
+		if settings.first_time_at_location:
+			title = 'New %s location' % ('radar centre' if env.airport_data == None else 'airport')
+			msg = 'This is your first time at %s.\nPlease configure location settings.' % location_code
+			QMessageBox.information(session_window, title, msg)
+			session_window.openLocalSettings()
 
 
@@ -6,7 +6,7 @@ from PyQt5.QtWidgets import QMainWindow, QInputDialog, QFileDialog, QMessageBox,
 
 from ui.mainWindow import Ui_mainWindow
 
-from models.liveStrips import default_rack_name
+from models.liveStrips import default_rack_name, saved_strip_board_file
 from models.discardedStrips import ShelfFilterModel
 
 from data.coords import EarthCoords
@@ -23,6 +23,7 @@ from session.flightGearMP import FlightGearMultiPlayerSessionManager
 from session.teacher import TeacherSessionManager
 from session.student import StudentSessionManager
 from session.solo import SoloSessionManager_AD, SoloSessionManager_CTR
+from session.profiling import profiler
 
 from ext.resources import read_bg_img, read_route_presets, import_entry_exit_data
 from ext.sct import extract_sector
@@ -153,6 +154,20 @@ class MainWindow(QMainWindow, Ui_mainWindow):
 		toolbar_menu.addAction(self.workspace_viewToolbar_action)
 		self.toolbars_view_menuAction.setMenu(toolbar_menu)
 		
+		self.profiling_system_action = QAction('Profile hot paths', self)
+		self.profiling_system_action.setCheckable(True)
+		self.profiling_system_action.setChecked(profiler.enabled)
+		self.profiling_system_action.toggled.connect(self.toggleProfiling)
+		self.exportProfiling_system_action = QAction('Export profiling report', self)
+		self.exportProfiling_system_action.triggered.connect(self.exportProfilingReport)
+		self.restoreStripBoard_system_action = QAction('Restore last strip board', self)
+		self.restoreStripBoard_system_action.triggered.connect(self.restoreStripBoard)
+		self.menuTools.addSeparator()
+		self.menuTools.addAction(self.restoreStripBoard_system_action)
+		self.menuTools.addSeparator()
+		self.menuTools.addAction(self.profiling_system_action)
+		self.menuTools.addAction(self.exportProfiling_system_action)
+		
 		if env.airport_data == None or len(env.airport_data.viewpoints) == 0:
 			self.viewpointSelection_view_menuAction.setEnabled(False)
 		else:
@@ -346,7 +361,7 @@ class MainWindow(QMainWindow, Ui_mainWindow):
 		signals.openShelfRequest.connect(self.shelf_dialog.exec)
 		signals.privateAtcChatRequest.connect(lambda: self.raiseDock(self.atcTextChat_dock))
 		signals.stripRecall.connect(recover_strip)
-		env.radar.blip.connect(env.strips.refreshViews)
+		env.radar.blip.connect(env.strips.refreshLiveStrips)
 		env.radar.lostContact.connect(self.aircraftHasDisappeared)
 		signals.aircraftKilled.connect(self.aircraftHasDisappeared)
 		env.strips.rwyBoxFreed.connect(lambda box, strip: env.airport_data.physicalRunway_restartWtcTimer(box, strip.lookup(FPL.WTC)))
@@ -379,8 +394,8 @@ class MainWindow(QMainWindow, Ui_mainWindow):
 		self.central_workspace.restoreWorkspaceWindows(settings.saved_workspace_windows)
 		self.central_workspace.switchWindowedView(settings.saved_workspace_windowed_view) # keep this after restoring windows!
 		
-		self.subsecond_ticker = Ticker(signals.fastClockTick.emit, parent=self)
-		self.subminute_ticker = Ticker(signals.slowClockTick.emit, parent=self)
+		self.subsecond_ticker = Ticker(signals.fastClockTick.emit, parent=self, name='fast clock')
+		self.subminute_ticker = Ticker(signals.slowClockTick.emit, parent=self, name='slow clock')
 		self.subsecond_ticker.start_stopOnZero(subsecond_tick_interval)
 		self.subminute_ticker.start_stopOnZero(subminute_tick_interval)
 		self.towerView_cheat_menu.setEnabled(False)
@@ -502,6 +517,8 @@ class MainWindow(QMainWindow, Ui_mainWindow):
 	def sessionHasEnded(self):
 		env.radar.stopSweeping()
 		env.radar.resetContacts()
+		if env.strips.count() > 0:
+			self.saveStripBoard()
 		env.strips.removeAllStrips()
 		env.FPLs.clearFPLs()
 		env.rdf.clearAllSignals()
@@ -631,6 +648,47 @@ class MainWindow(QMainWindow, Ui_mainWindow):
 			QMessageBox.information(self, 'Done extracting', \
 				'Background drawings extracted.\nSee console for summary and files created in the output directory.')
 	
+	def toggleProfiling(self, toggle):
+		if not toggle and profiler.stats != {}:
+			print('Profiling report (slowest first):\n%s' % profiler.reportStr())
+		profiler.setEnabled(toggle)
+	
+	def exportProfilingReport(self):
+		if profiler.stats == {}:
+			QMessageBox.critical(self, 'Profiling report', 'Nothing recorded yet. Enable hot path profiling first.')
+		else:
+			json_file = settings.outputFileName('profile', ext='json')
+			csv_file = settings.outputFileName('profile', ext='csv')
+			try:
+				profiler.exportJSON(json_file)
+				profiler.exportCSV(csv_file)
+				QMessageBox.information(self, 'Profiling report', 'Report exported to:\n%s\n%s' % (json_file, csv_file))
+			except OSError as err:
+				QMessageBox.critical(self, 'Profiling report', 'Could not write report: %s' % err)
+	
+	def saveStripBoard(self):
+		try:
+			data = env.strips.boardSnapshot() # encoded before opening, so a failure keeps the previous board
+			with open(saved_strip_board_file(), 'wb') as f:
+				f.write(data)
+		except (OSError, ValueError) as err:
+			print('ERROR: Could not save strip board: %s' % err)
+	
+	def restoreStripBoard(self):
+		if env.strips.count() > 0:
+			QMessageBox.critical(self, 'Restore strip board', 'Strip board must be empty to restore the last one.')
+			return
+		try:
+			with open(saved_strip_board_file(), 'rb') as f:
+				restored = env.strips.restoreBoard(f.read())
+		except FileNotFoundError:
+			QMessageBox.critical(self, 'Restore strip board', 'No strip board saved at this location.')
+		except (OSError, ValueError) as err:
+			QMessageBox.critical(self, 'Restore strip board', 'Could not restore strip board: %s' % err)
+		else:
+			signals.stripInfoChanged.emit()
+			signals.statusBarMsg.emit('%d strips restored.' % len(restored))
+	
 	def repositionRadarBgImages(self):
 		radar_panel = self.central_workspace.getCurrentRadarPanel()
 		if radar_panel == None:
@@ -3,6 +3,7 @@ from datetime import timedelta
 
 from PyQt5.QtCore import pyqtSignal, QObject, QTimer
 
+from data.util import some
 from data.acft import Aircraft
 from data.strip import Strip, assigned_heading_detail, assigned_altitude_detail, assigned_speed_detail, assigned_SQ_detail
 from data.fpl import FPL
@@ -15,6 +16,7 @@ from data.weather import Weather
 
 from session.config import settings
 from session.env import env
+from session.profiling import profiler
 
 
 # ---------- Constants ----------
@@ -281,13 +283,22 @@ selection = Selection()
 
 
 class Ticker(QTimer):
-	def __init__(self, action_callback, parent=None):
+	def __init__(self, action_callback, parent=None, name=None):
 		'''
 		start can be overridden with a timedelta or numeric milliseconds
+		name: for profiling; ticks are timed against their interval to detect overruns
 		'''
 		QTimer.__init__(self, parent)
 		self.do_action = action_callback
-		self.timeout.connect(self.do_action)
+		self.profiling_name = 'tick: %s' % some(name, getattr(action_callback, '__qualname__', 'unnamed'))
+		self.timeout.connect(self._tick)
+	
+	def _tick(self):
+		if profiler.enabled:
+			with profiler.scope(self.profiling_name, budget=self.interval() / 1000):
+				self.do_action()
+		else:
+			self.do_action()
 	
 	def start_stopOnZero(self, t, immediate=True):
 		t = int(1000 * t.total_seconds() if isinstance(t, timedelta) else t)
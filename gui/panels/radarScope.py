@@ -50,11 +50,11 @@ class ScopeFrame(QWidget, Ui_radarScopeFrame):
 		self.rebuildImgToggleMenu()
 		# Nav menu
 		nav_menu = QMenu()
-		self._addMenuToggleAction(nav_menu, 'Navaids', True, self.scene.layers[Layer.NAV_AIDS].setVisible)
-		self._addMenuToggleAction(nav_menu, 'Fixes', False, self.scene.layers[Layer.NAV_FIXES].setVisible)
-		self._addMenuToggleAction(nav_menu, 'RNAV points', False, self.scene.layers[Layer.RNAV_POINTS].setVisible)
+		self._addMenuToggleAction(nav_menu, 'Navaids', True, lambda b: self.scene.setLayerVisible(Layer.NAV_AIDS, b))
+		self._addMenuToggleAction(nav_menu, 'Fixes', False, lambda b: self.scene.setLayerVisible(Layer.NAV_FIXES, b))
+		self._addMenuToggleAction(nav_menu, 'RNAV points', False, lambda b: self.scene.setLayerVisible(Layer.RNAV_POINTS, b))
 		nav_menu.addSeparator()
-		self._addMenuToggleAction(nav_menu, 'Airfields', False, self.scene.layers[Layer.NAV_AIRFIELDS].setVisible)
+		self._addMenuToggleAction(nav_menu, 'Airfields', False, lambda b: self.scene.setLayerVisible(Layer.NAV_AIRFIELDS, b))
 		self.nav_menuButton.setMenu(nav_menu)
 		# AD menu
 		AD_menu = QMenu()
@@ -63,10 +63,10 @@ class ScopeFrame(QWidget, Ui_radarScopeFrame):
 		self._addMenuToggleAction(AD_menu, 'Highlight TWYs under mouse', True, self.scene.highlightEdgesOnMouseover)
 		self._addMenuToggleAction(AD_menu, 'RWY names always visible', False, self.scene.setRunwayNamesAlwaysVisible)
 		AD_menu.addSeparator()
-		self._addMenuToggleAction(AD_menu, 'Parking positions', True, self.scene.layers[Layer.PARKING_POSITIONS].setVisible)
-		self._addMenuToggleAction(AD_menu, 'Holding lines', False, self.scene.layers[Layer.HOLDING_LINES].setVisible)
-		self._addMenuToggleAction(AD_menu, 'Taxiway centre lines', False, self.scene.layers[Layer.TAXIWAY_LINES].setVisible)
-		self._addMenuToggleAction(AD_menu, 'Other objects', True, self.scene.layers[Layer.AIRPORT_OBJECTS].setVisible)
+		self._addMenuToggleAction(AD_menu, 'Parking positions', True, lambda b: self.scene.setLayerVisible(Layer.PARKING_POSITIONS, b))
+		self._addMenuToggleAction(AD_menu, 'Holding lines', False, lambda b: self.scene.setLayerVisible(Layer.HOLDING_LINES, b))
+		self._addMenuToggleAction(AD_menu, 'Taxiway centre lines', False, lambda b: self.scene.setLayerVisible(Layer.TAXIWAY_LINES, b))
+		self._addMenuToggleAction(AD_menu, 'Other objects', True, lambda b: self.scene.setLayerVisible(Layer.AIRPORT_OBJECTS, b))
 		self.AD_menuButton.setMenu(AD_menu)
 		# LDG menu
 		if env.airport_data == None:
@@ -99,7 +99,7 @@ class ScopeFrame(QWidget, Ui_radarScopeFrame):
 		# OPTIONS menu
 		options_menu = QMenu()
 		self.autoCentre_action = self._addMenuToggleAction(options_menu, 'Centre on indications', False, None)
-		self._addMenuToggleAction(options_menu, 'Show custom labels', True, self.scene.layers[Layer.CUSTOM_LABELS].setVisible)
+		self._addMenuToggleAction(options_menu, 'Show custom labels', True, lambda b: self.scene.setLayerVisible(Layer.CUSTOM_LABELS, b))
 		self.showRdfLine_action = self._addMenuToggleAction(options_menu, 'Show RDF line', False, self.scene.showRdfLine)
 		options_menu.addSeparator()
 		drawAirport_action = QAction('Draw additional airport...', self)
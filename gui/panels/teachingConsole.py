@@ -14,6 +14,7 @@ from data.weather import mkWeather, gust_diff_threshold
 from session.config import settings
 from session.env import env
 from session.manager import SessionType, student_callsign, teacher_callsign
+from session.teacher import load_named_situations, save_named_situations
 
 from gui.misc import IconFile, signals, selection
 from gui.dialog.miscDialogs import yesNo_question
@@ -142,7 +143,7 @@ class SituationSnapshotModel(QAbstractTableModel):
 				return '%d + %d' % (spawned, len(sit) - spawned)
 		elif role == Qt.ToolTipRole:
 			if col == 0:
-				return 'Saved %s' % rel_datetime_str(t, seconds=True) if name != None else 'Double-click to name this entry.'
+				return 'Saved %s' % rel_datetime_str(t, seconds=True) if name != None else 'Double-click to name this entry and keep it for later sessions.'
 			elif col == 1:
 				return 'Spawned + unspawned count'
 
@@ -152,6 +153,7 @@ class SituationSnapshotModel(QAbstractTableModel):
 			sit, t, old_name = self.snapshots[row]
 			self.snapshots[row] = sit, t, (None if value == '' else value)
 			self.dataChanged.emit(index, index)
+			self.saveNamedSnapshots()
 			return True
 		else:
 			return False
@@ -168,9 +170,22 @@ class SituationSnapshotModel(QAbstractTableModel):
 	
 	def removeSnapshot(self, row):
 		self.beginRemoveRows(QModelIndex(), row, row)
-		del self.snapshots[row]
+		sit, t, name = self.snapshots.pop(row)
 		self.endRemoveRows()
+		if name != None:
+			self.saveNamedSnapshots()
 		return True
+	
+	def loadNamedSnapshots(self):
+		'''
+		replaces current contents with the named situations saved for the location
+		'''
+		self.beginResetModel()
+		self.snapshots = load_named_situations()
+		self.endResetModel()
+	
+	def saveNamedSnapshots(self):
+		save_named_situations([snapshot for snapshot in self.snapshots if snapshot[2] != None])
 
 
 
@@ -262,6 +277,7 @@ class TeachingConsole(QWidget, Ui_teachingConsole):
 			self.updateAcftSection()
 			self._updateCloudLayerHeightWidgets()
 			self._updateAtcButtons()
+			self.situationSnapshots_tableModel.loadNamedSnapshots()
 			self._updateSnapshotsButtons()
 			self.applyWeather() # initialises the weather for the session
 	
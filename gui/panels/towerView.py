@@ -7,7 +7,7 @@ from session.config import settings
 from session.env import env
 from data.coords import pitchLookAt
 from data.params import Heading
-from ext.fgfs import TelnetSessionThreader, initial_FOV
+from ext.fgfs import initial_FOV
 from gui.misc import signals, selection
 
 
@@ -40,11 +40,8 @@ class TowerViewControllerPane(QWidget, Ui_towerViewControllerPane):
 			self.runway_select.addItems([r.name for r in env.airport_data.allRunways(sortByName=True)])
 		self.setEnabled(False)
 		self.target_acft = None
-		self.tracker = TelnetSessionThreader(self, self.lookAtTargetAircraft_commands, loopInterval=tracker_interval)
 		signals.towerViewProcessToggled.connect(self.setEnabled)
-		signals.towerViewProcessToggled.connect(self.tracker.stop)
-		signals.sessionEnded.connect(self.tracker.stop)
-		signals.mainWindowClosing.connect(self.tracker.stop)
+		signals.sessionEnded.connect(self.stopTracking)
 		self.lookAtAircraft_OK_button.clicked.connect(self.lookAtSelectedAircraft)
 		self.lookAtRunway_OK_button.clicked.connect(self.lookAtRunway)
 		self.lookNorth_button.clicked.connect(lambda: self.lookInDirection(Heading(360, true_panel_directions)))
@@ -62,6 +59,9 @@ class TowerViewControllerPane(QWidget, Ui_towerViewControllerPane):
 		else:
 			return lookAt_commands(self.target_acft.liveCoords(), self.target_acft.liveGeometricAlt())
 	
+	def stopTracking(self):
+		settings.controlled_tower_viewer.stopTracking()
+	
 	# # # # # # # # # # # # # #
 	
 	def ensureDayLight(self):
@@ -76,16 +76,16 @@ class TowerViewControllerPane(QWidget, Ui_towerViewControllerPane):
 	def lookAtSelectedAircraft(self):
 		self.target_acft = selection.acft
 		if self.target_acft == None:
-			self.tracker.stop()
+			self.stopTracking()
 		elif self.trackAircraft_tickBox.isChecked():
-			self.tracker.start() # Does nothing to the thread if it is already running
+			settings.controlled_tower_viewer.startTracking(self.lookAtTargetAircraft_commands, tracker_interval)
 		else:
-			self.tracker.stop()
+			self.stopTracking()
 			settings.controlled_tower_viewer.sendCmd(self.lookAtTargetAircraft_commands())
 		
 	def lookAtRunway(self):
 		rwy = env.airport_data.runway(self.runway_select.currentText())
-		self.tracker.stop()
+		self.stopTracking()
 		index = self.runwayPoint_select.currentIndex()
 		if index == 0: # RWY threshold
 			p = rwy.threshold()
@@ -94,7 +94,7 @@ class TowerViewControllerPane(QWidget, Ui_towerViewControllerPane):
 		settings.controlled_tower_viewer.sendCmd(lookAt_commands(p, env.elevation(p)))
 	
 	def lookInDirection(self, d):
-		self.tracker.stop()
+		self.stopTracking()
 		commands = ['set /sim/current-view/goal-heading-offset-deg %g' % -d.trueAngle(), 'set /sim/current-view/goal-pitch-offset-deg 0']
 		settings.controlled_tower_viewer.sendCmd(commands)
 		self.dropBinoculars_button.clicked.connect(lambda: self.setFOV(initial_FOV))
@@ -23,11 +23,11 @@ class FlightPlanTableView(QTableView):
 		if selection.fpl == None:
 			self.clearSelection()
 		else:
-			try:
-				src_index = env.FPLs.findFPL(lambda fpl: fpl is selection.fpl)[1]
-				self.selectRow(self.model().mapFromSource(self.model().sourceModel().index(src_index, 0)).row())
-			except StopIteration:
+			src_row = env.FPLs.rowOf(selection.fpl)
+			if src_row == None:
 				self.clearSelection()
+			else:
+				self.selectRow(self.model().mapFromSource(self.model().sourceModel().index(src_row, 0)).row())
 	
 	def mousePressEvent(self, event):
 		QTableView.mousePressEvent(self, event)
@@ -2,6 +2,8 @@ from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtWidgets import QGraphicsView
 from PyQt5.QtGui import QTransform
 
+from session.profiling import profiler
+
 
 # ---------- Constants ----------
 
@@ -20,6 +22,28 @@ class RadarScopeView(QGraphicsView):
 	
 	def setScaleFactor(self, sc):
 		self.setTransform(QTransform.fromScale(sc, sc))
+		self.scene().setViewScale(sc)
+		self.scene().flushContactUpdates() # contacts coming into view
+	
+	def scrollContentsBy(self, dx, dy):
+		QGraphicsView.scrollContentsBy(self, dx, dy)
+		if self.scene() != None:
+			self.scene().flushContactUpdates() # contacts coming into view
+	
+	def resizeEvent(self, event):
+		QGraphicsView.resizeEvent(self, event)
+		if self.scene() != None:
+			self.scene().flushContactUpdates() # contacts coming into view
+	
+	
+	## FRAME TIMES
+	
+	def paintEvent(self, event):
+		if profiler.enabled:
+			with profiler.scope('radar scope paint'):
+				QGraphicsView.paintEvent(self, event)
+		else:
+			QGraphicsView.paintEvent(self, event)
 	
 	
 	## MOUSE
@@ -1,9 +1,10 @@
 
+from bisect import bisect_left, bisect_right
 from datetime import timedelta
 
 from PyQt5.QtCore import Qt, QModelIndex, QAbstractTableModel
 
-from data.util import pop_all, some
+from data.util import some
 from data.fpl import FPL
 from data.utc import now
 
@@ -26,6 +27,15 @@ class FlightPlanModel(QAbstractTableModel):
 	def __init__(self, parent):
 		QAbstractTableModel.__init__(self, parent)
 		self.FPL_list = []
+		self.indexed_edit_count = None # FPL.edit_count when indexes were built; None if list has changed since
+		self.FPL_rows = {} # id(FPL) -> row
+		self.online_ID_index = {} # online ID -> FPL
+		self.callsign_index = {} # upper case callsign -> FPL list, in row order
+		self.dep_AD_index = {} # ICAO code -> FPL list, in row order
+		self.arr_AD_index = {} # ICAO code -> FPL list, in row order
+		self.FPLs_by_dep_time = [] # FPLs with a departure time, sorted by it
+		self.dep_times = [] # departure times, parallel to above for bisection
+		self.max_EET = timedelta(0) # longest EET among the above
 	
 	def refreshViews(self): # [[*]]
 		self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, self.columnCount() - 1))
@@ -108,13 +118,15 @@ class FlightPlanModel(QAbstractTableModel):
 		position = self.rowCount()
 		self.beginInsertRows(QModelIndex(), position, position)
 		self.FPL_list.insert(position, fpl)
+		self.indexed_edit_count = None
 		self.endInsertRows()
 		return True
 	
 	def removeFPL(self, fpl):
-		row = next(i for i in range(len(self.FPL_list)) if self.FPL_list[i] is fpl)
+		row = self.rowOf(fpl)
 		self.beginRemoveRows(QModelIndex(), row, row)
 		del self.FPL_list[row]
+		self.indexed_edit_count = None
 		self.endRemoveRows()
 		return True
 	
@@ -123,10 +135,45 @@ class FlightPlanModel(QAbstractTableModel):
 		if pred == None:
 			self.FPL_list.clear()
 		else:
-			pop_all(self.FPL_list, lambda fpl: pred(fpl))
+			self.FPL_list = [fpl for fpl in self.FPL_list if not pred(fpl)]
+		self.indexed_edit_count = None
 		self.endResetModel()
 		return True
 	
+	def mergeOnlineFPLs(self, online_FPLs):
+		'''
+		Merges a full download of online flight plans: unknown ones are added; known ones take the online
+		status, comments and details (except those modified locally); those no longer online are removed.
+		Views are reset at most once. Returns the list of flight plans added.
+		'''
+		self._updateIndexes()
+		added = {} # online ID -> FPL
+		for online_fpl in online_FPLs:
+			got_FPL = self.online_ID_index.get(online_fpl.online_id, added.get(online_fpl.online_id))
+			if got_FPL == None:
+				added[online_fpl.online_id] = online_fpl
+			else:
+				got_FPL.setOnlineStatus(online_fpl.status())
+				got_FPL.setOnlineComments(online_fpl.onlineComments())
+				for d in FPL.details:
+					if d not in got_FPL.modified_details and got_FPL[d] != online_fpl[d]:
+						got_FPL.details[d] = online_fpl[d]
+		online_IDs = { fpl.online_id for fpl in online_FPLs }
+		kept = [fpl for fpl in self.FPL_list if not fpl.existsOnline() or fpl.online_id in online_IDs]
+		if len(kept) < len(self.FPL_list) or len(added) > 0:
+			self.beginResetModel()
+			self.FPL_list = kept + list(added.values())
+			self.endResetModel()
+		self.indexed_edit_count = None # details were written directly
+		return list(added.values())
+	
+	def rowOf(self, fpl):
+		'''
+		Returns None if flight plan is not in the model
+		'''
+		self._updateIndexes()
+		return self.FPL_rows.get(id(fpl))
+	
 	def findFPL(self, pred):
 		'''
 		Returns a flight plan satisfying pred, and its index.
@@ -134,16 +181,64 @@ class FlightPlanModel(QAbstractTableModel):
 		'''
 		return next((fpl, i) for i, fpl in enumerate(self.FPL_list) if pred(fpl)) # or StopIteration
 	
-	def findAll(self, pred=None):
+	def findOnlineFPL(self, online_id):
 		'''
-		Returns a list of the flight plans satisfying pred, or all if None.
+		Returns None if no flight plan has the given online ID
 		'''
-		if pred == None:
-			return self.FPL_list[:]
+		self._updateIndexes()
+		return self.online_ID_index.get(online_id)
+	
+	def findAll(self, pred=None, callsign=None, dep=None, arr=None, time_window=None):
+		'''
+		Returns a list of the flight plans satisfying all criteria given, or all if none:
+		- pred: bool function of FPL
+		- callsign: case-insensitive
+		- dep, arr: ICAO codes of departure and arrival airports
+		- time_window: (datetime, datetime) pair the flight must overlap (see FPL.flightIsInTimeWindow)
+		'''
+		if callsign == None and dep == None and arr == None and time_window == None:
+			candidates = self.FPL_list
 		else:
-			return [fpl for fpl in self.FPL_list if pred(fpl)]
+			self._updateIndexes()
+			selections = [] # FPL lists to intersect
+			if callsign != None:
+				selections.append(self.callsign_index.get(callsign.upper(), []))
+			if dep != None:
+				selections.append(self.dep_AD_index.get(dep, []))
+			if arr != None:
+				selections.append(self.arr_AD_index.get(arr, []))
+			if time_window != None:
+				lo, hi = time_window
+				i = bisect_left(self.dep_times, lo - self.max_EET)
+				j = bisect_right(self.dep_times, hi)
+				selections.append([fpl for fpl in self.FPLs_by_dep_time[i:j] if some(fpl.ETA(), fpl[FPL.TIME_OF_DEP]) >= lo])
+			selections.sort(key=len)
+			others = [{ id(fpl) for fpl in lst } for lst in selections[1:]]
+			candidates = [fpl for fpl in selections[0] if all(id(fpl) in s for s in others)]
+			candidates.sort(key=(lambda fpl: self.FPL_rows[id(fpl)]))
+		return [fpl for fpl in candidates if pred == None or pred(fpl)]
 	
 	def FPL(self, index):
 		return self.FPL_list[index]
+	
+	def _updateIndexes(self):
+		if self.indexed_edit_count == FPL.edit_count:
+			return
+		self.FPL_rows = { id(fpl): row for row, fpl in enumerate(self.FPL_list) }
+		self.online_ID_index = { fpl.online_id: fpl for fpl in reversed(self.FPL_list) if fpl.existsOnline() } # first in rows
+		self.callsign_index.clear()
+		self.dep_AD_index.clear()
+		self.arr_AD_index.clear()
+		for fpl in self.FPL_list:
+			if fpl[FPL.CALLSIGN] != None:
+				self.callsign_index.setdefault(fpl[FPL.CALLSIGN].upper(), []).append(fpl)
+			if fpl[FPL.ICAO_DEP] != None:
+				self.dep_AD_index.setdefault(fpl[FPL.ICAO_DEP], []).append(fpl)
+			if fpl[FPL.ICAO_ARR] != None:
+				self.arr_AD_index.setdefault(fpl[FPL.ICAO_ARR], []).append(fpl)
+		self.FPLs_by_dep_time = sorted((fpl for fpl in self.FPL_list if fpl[FPL.TIME_OF_DEP] != None), key=(lambda fpl: fpl[FPL.TIME_OF_DEP]))
+		self.dep_times = [fpl[FPL.TIME_OF_DEP] for fpl in self.FPLs_by_dep_time]
+		self.max_EET = max([timedelta(0)] + [fpl[FPL.EET] for fpl in self.FPLs_by_dep_time if fpl[FPL.EET] != None])
+		self.indexed_edit_count = FPL.edit_count
 
 
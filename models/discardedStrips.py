@@ -1,81 +1,255 @@
+from bisect import bisect_left, bisect_right
+from collections import deque
+
 from PyQt5.QtCore import Qt, QModelIndex, QAbstractListModel, QSortFilterProxyModel
 from PyQt5.QtGui import QIcon
 
-from data.util import some, pop_all
+from session.config import settings
 
+from data.util import some
+from data.fpl import FPL
 from data.utc import now, rel_datetime_str
-from data.strip import sent_to_detail, shelved_detail
+from data.strip import Strip, sent_to_detail, shelved_detail, assigned_SQ_detail, handover_details
 
 from gui.misc import IconFile
 
 
 # ---------- Constants ----------
 
+discarded_strips_kept_in_memory = 100
+discarded_strips_file_base_name = 'discarded-strips'
+
 # -------------------------------
 
 
+class DiscardedStripEntry:
+	'''
+	What the archive keeps in memory for every discarded strip: enough to list and search it.
+	"strip" is None if spilled to the archive file and not read back since.
+	'''
+	def __init__(self, strip, timestamp, seq):
+		self.strip = strip
+		self.timestamp = timestamp
+		self.seq = seq # increasing in discarding order
+		self.callsign = strip.callsign()
+		self.squawk = strip.lookup(assigned_SQ_detail)
+		self.sent_to = strip.lookup(sent_to_detail)
+		self.shelved = bool(strip.lookup(shelved_detail))
+		self.file_offset = None # position of the strip line in the archive file, once written
+
+
+
+
 class DiscardedStripModel(QAbstractListModel):
+	'''
+	Rows are in reverse discarding order (most recent first). Only the most recently discarded or recalled
+	strips are kept in memory; older ones are appended to a session output file with their handover details
+	(other details are lost), and read back when accessed with getStrip.
+	'''
 	def __init__(self, parent):
 		QAbstractListModel.__init__(self, parent)
-		self.discarded_strips = [] # (strip, timestamp) list
-		self.handed_over_icon = QIcon(IconFile.panel_ATCs)
-		self.deleted_icon = QIcon(IconFile.button_bin)
-		self.shelved_icon = QIcon(IconFile.button_shelf)
-
+		self.entries = [] # DiscardedStripEntry list, in discarding order
+		self.entry_seqs = [] # entry sequence numbers, parallel to self.entries for bisection
+		self.entry_times = [] # entry timestamps, parallel to self.entries for bisection
+		self.next_seq = 0
+		self.callsign_index = {} # upper case callsign -> DiscardedStripEntry list, in discarding order
+		self.squawk_index = {} # int -> DiscardedStripEntry list, in discarding order
+		self.strips_in_memory = deque() # entries with a strip in memory, in order of arrival
+		self.archive_file = settings.outputFileName(discarded_strips_file_base_name, ext='lst')
+		self.icons = None # (handed over, deleted, shelved) QIcons, created on first display
+	
+	def _entryAt(self, row):
+		return self.entries[len(self.entries) - 1 - row]
+	
+	def _row(self, entry):
+		return len(self.entries) - 1 - bisect_left(self.entry_seqs, entry.seq)
+	
 	def rowCount(self, parent=None):
-		return len(self.discarded_strips)
+		return len(self.entries)
 	
 	def data(self, index, role):
-		strip, timestamp = self.discarded_strips[index.row()]
+		entry = self._entryAt(index.row())
 		if role == Qt.DisplayRole:
-			line1 = some(strip.callsign(), '?')
-			toATC = strip.lookup(sent_to_detail)
-			if toATC == None:
-				line2 = 'Shelved ' if strip.lookup(shelved_detail) else 'Deleted '
+			line1 = some(entry.callsign, '?')
+			if entry.sent_to == None:
+				line2 = 'Shelved ' if entry.shelved else 'Deleted '
 			else:
-				line1 += ' >> ' + toATC
+				line1 += ' >> ' + entry.sent_to
 				line2 = 'Sent '
-			line2 += rel_datetime_str(timestamp)
+			line2 += rel_datetime_str(entry.timestamp)
 			## RETURN
 			return '%s\n  %s' % (line1, line2)
 		elif role == Qt.DecorationRole:
-			if strip.lookup(sent_to_detail) == None: # was deleted or shelved
-				return self.shelved_icon if strip.lookup(shelved_detail) else self.deleted_icon
+			if self.icons == None:
+				self.icons = QIcon(IconFile.panel_ATCs), QIcon(IconFile.button_bin), QIcon(IconFile.button_shelf)
+			handed_over_icon, deleted_icon, shelved_icon = self.icons
+			if entry.sent_to == None: # was deleted or shelved
+				return shelved_icon if entry.shelved else deleted_icon
 			else: # was handed over
-				return self.handed_over_icon
+				return handed_over_icon
 	
 	def getStrip(self, row):
-		return self.discarded_strips[row][0]
+		entry = self._entryAt(row)
+		if entry.strip == None:
+			entry.strip = self._readStrip(entry)
+			self._keepInMemory(entry)
+		return entry.strip
+	
+	def isShelved(self, row):
+		return self._entryAt(row).shelved
+	
+	def search(self, callsign=None, squawk=None, time_range=None):
+		'''
+		Returns the rows of the strips matching all criteria given, in row order:
+		- callsign: case-insensitive
+		- squawk: assigned SQ (int)
+		- time_range: (datetime, datetime) discarding time bounds, inclusive, either possibly None
+		'''
+		t_lo, t_hi = some(time_range, (None, None))
+		if callsign == None and squawk == None:
+			n = len(self.entries)
+			lo = 0 if t_lo == None else bisect_left(self.entry_times, t_lo)
+			hi = n if t_hi == None else bisect_right(self.entry_times, t_hi)
+			return list(range(n - hi, n - lo))
+		if callsign == None:
+			matches = self.squawk_index.get(squawk, [])
+		else:
+			matches = self.callsign_index.get(callsign.upper(), [])
+			if squawk != None:
+				matches = [e for e in matches if e.squawk == squawk]
+		return [self._row(e) for e in reversed(matches) \
+			if (t_lo == None or e.timestamp >= t_lo) and (t_hi == None or e.timestamp <= t_hi)]
 	
 	def addStrip(self, strip):
+		entry = DiscardedStripEntry(strip, now(), self.next_seq)
+		self.next_seq += 1
 		self.beginInsertRows(QModelIndex(), 0, 0)
-		self.discarded_strips.insert(0, (strip, now()))
+		self.entries.append(entry)
+		self.entry_seqs.append(entry.seq)
+		self.entry_times.append(entry.timestamp)
+		if entry.callsign != None: # indexed before rows are signalled, for searches on insertion
+			self.callsign_index.setdefault(entry.callsign.upper(), []).append(entry)
+		if entry.squawk != None:
+			self.squawk_index.setdefault(entry.squawk, []).append(entry)
 		self.endInsertRows()
+		self._keepInMemory(entry)
+	
+	def forgetEntries(self, pred):
+		'''
+		pred is a bool function of DiscardedStripEntry, so that spilled strips need not be read back
+		'''
+		runs = [] # (first, last + 1) index ranges of entries to forget
+		for i, entry in enumerate(self.entries):
+			if pred(entry):
+				if runs != [] and runs[-1][1] == i:
+					runs[-1] = runs[-1][0], i + 1
+				else:
+					runs.append((i, i + 1))
+		for first, end in reversed(runs): # most recent first, so that indices of remaining runs are unchanged
+			n = len(self.entries)
+			self.beginRemoveRows(QModelIndex(), n - end, n - 1 - first)
+			for entry in self.entries[first:end]:
+				self._unindex(entry)
+			del self.entries[first:end]
+			del self.entry_seqs[first:end]
+			del self.entry_times[first:end]
+			self.endRemoveRows()
 	
-	def forgetStrips(self, pred):
-		self.beginResetModel()
-		pop_all(self.discarded_strips, lambda elt: pred(elt[0]))
-		self.endResetModel()
-
 	def remove(self, strip):
-		self.forgetStrips(lambda s: s is strip)
+		self.forgetEntries(lambda entry: entry.strip is strip)
+	
+	## INTERNAL
+	
+	def _unindex(self, entry):
+		if entry.callsign != None:
+			lst = self.callsign_index[entry.callsign.upper()]
+			del lst[next(i for i, e in enumerate(lst) if e is entry)]
+			if lst == []:
+				del self.callsign_index[entry.callsign.upper()]
+		if entry.squawk != None:
+			lst = self.squawk_index[entry.squawk]
+			del lst[next(i for i, e in enumerate(lst) if e is entry)]
+			if lst == []:
+				del self.squawk_index[entry.squawk]
+		if entry.strip != None:
+			self.strips_in_memory.remove(entry)
+	
+	def _keepInMemory(self, entry):
+		self.strips_in_memory.append(entry)
+		while len(self.strips_in_memory) > discarded_strips_kept_in_memory:
+			oldest = self.strips_in_memory[0]
+			if oldest.file_offset == None:
+				try:
+					self._writeStrip(oldest)
+				except OSError as err:
+					print('ERROR: Could not write to discarded strip archive: %s' % err)
+					return # keep strips in memory
+			self.strips_in_memory.popleft()
+			oldest.strip = None
+	
+	def _writeStrip(self, entry):
+		line = entry.strip.encodeDetails(handover_details) + '\n'
+		with open(self.archive_file, 'ab') as f:
+			offset = f.tell()
+			f.write(line.encode('utf8'))
+		entry.file_offset = offset
+	
+	def _readStrip(self, entry):
+		try:
+			with open(self.archive_file, 'rb') as f:
+				f.seek(entry.file_offset)
+				strip = Strip.fromEncodedDetails(f.readline().decode('utf8').rstrip('\n'))
+		except OSError as err:
+			print('ERROR: Could not read from discarded strip archive: %s' % err)
+			strip = Strip()
+			strip.writeDetail(FPL.CALLSIGN, entry.callsign)
+			strip.writeDetail(assigned_SQ_detail, entry.squawk)
+		strip.writeDetail(sent_to_detail, entry.sent_to)
+		strip.writeDetail(shelved_detail, entry.shelved)
+		return strip
 
 
 
 
 class ShelfFilterModel(QSortFilterProxyModel):
+	'''
+	Shelved or other discarded strips, optionally restricted to the results of a source model search.
+	'''
 	def __init__(self, parent, source, shelf):
 		QSortFilterProxyModel.__init__(self, parent)
 		self.setSourceModel(source)
 		self.is_shelf = shelf
+		self.search_criteria = {} # DiscardedStripModel.search keyword args; empty to accept all
+		self.search_rows = None # source rows found with search_criteria; None if no search
+		source.rowsInserted.connect(self._updateSearch)
+		source.rowsRemoved.connect(self._updateSearch)
 	
 	def stripAt(self, index):
 		return self.sourceModel().getStrip(self.mapToSource(index).row())
 	
 	def filterAcceptsRow(self, sourceRow, sourceParent):
-		return bool(self.sourceModel().getStrip(sourceRow).lookup(shelved_detail)) == self.is_shelf
+		return self.sourceModel().isShelved(sourceRow) == self.is_shelf \
+			and (self.search_rows == None or sourceRow in self.search_rows)
+	
+	def setSearch(self, **criteria):
+		'''
+		criteria: as DiscardedStripModel.search; those given as None are dropped
+		'''
+		for key, value in criteria.items():
+			if value == None:
+				self.search_criteria.pop(key, None)
+			else:
+				self.search_criteria[key] = value
+		self._updateSearch()
+	
+	def _updateSearch(self): # source rows shift when strips are added or forgotten
+		if self.search_criteria == {}:
+			if self.search_rows == None:
+				return
+			self.search_rows = None
+		else:
+			self.search_rows = set(self.sourceModel().search(**self.search_criteria))
+		self.invalidateFilter()
 	
 	def forgetStrips(self):
-		self.sourceModel().forgetStrips(lambda strip: bool(strip.lookup(shelved_detail)) == self.is_shelf)
-
-
+		self.sourceModel().forgetEntries(lambda entry: entry.shelved == self.is_shelf)
@@ -1,10 +1,13 @@
 from PyQt5.QtCore import Qt, pyqtSignal, QModelIndex, QAbstractTableModel, QMimeData, QByteArray
 
-from session.config import settings
+from session.config import settings, airport_settings_filename_pattern, CTR_settings_filename_pattern
+from session.env import env
+from session.profiling import profiler
 
 from data.util import some
 from data.coords import EarthCoords
-from data.strip import Strip, strip_mime_type, rack_detail, runway_box_detail, duplicate_callsign_detail
+from data.strip import Strip, strip_mime_type, rack_detail, runway_box_detail, \
+		duplicate_callsign_detail, soft_link_detail, encode_strip_board, decode_strip_board
 from data.fpl import FPL
 
 from gui.graphics.miscGraphics import coloured_square_icon
@@ -13,10 +16,16 @@ from gui.graphics.miscGraphics import coloured_square_icon
 # ---------- Constants ----------
 
 default_rack_name = 'Default'
+saved_strip_board_file_suffix = '.strips'
 
 # -------------------------------
 
 
+def saved_strip_board_file():
+	pattern = CTR_settings_filename_pattern if env.airport_data == None else airport_settings_filename_pattern
+	return (pattern % settings.location_code)[:-len('.ini')] + saved_strip_board_file_suffix
+
+
 class LiveStripModel(QAbstractTableModel):
 	stripMoved = pyqtSignal(Strip)
 	rwyBoxFilled = pyqtSignal(int, Strip) # physical RWY index, strip boxed
@@ -29,22 +38,81 @@ class LiveStripModel(QAbstractTableModel):
 			self.rack_names.insert(0, default_rack_name)
 		self.racked_strips = [[] for r in self.rack_names] # (Strip list) list, in rack order
 		self.unracked_strips = [] # Strip list, in either loose bays or runway boxes
+		self.all_strips = None # cached concatenation of the above (racked first, in rack order), or None to rebuild
+		self.indexed_callsigns = {} # Strip -> upper case callsign counted for it in callsign_counts (or None)
+		self.callsign_counts = {} # upper case callsign -> number of strips indexed with it (multiset)
+		self.refreshed_changes = {} # Strip -> its change count when its cells were last refreshed
 	
+	@profiler.profiled('strip model refresh')
 	def refreshViews(self): # [[*]]
-		all_strips = self.listStrips()
-		for s in all_strips:
-			s.writeDetail(duplicate_callsign_detail, None)
-		while len(all_strips) > 0:
-			s = all_strips.pop()
-			cs = s.callsign(fpl=True)
-			if cs != None:
-				for s2 in all_strips:
-					cs2 = s2.callsign(fpl=True)
-					if cs2 != None and cs.upper() == cs2.upper():
-						s.writeDetail(duplicate_callsign_detail, True)
-						s2.writeDetail(duplicate_callsign_detail, True)
+		'''
+		Updates duplicate callsign flags and all rack cells; for any change in what strips may show.
+		'''
+		self._updateDuplicateCallsigns()
+		for strip in self._allStrips():
+			self.refreshed_changes[strip] = strip.change_count
 		self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, self.columnCount() - 1))
 	
+	@profiler.profiled('strip model refresh')
+	def refreshLiveStrips(self): # [[*]]
+		'''
+		Updates duplicate callsign flags and the rack cells of strips possibly showing changes after a radar
+		sweep: those written to or (soft-)linked since last refresh, those with live contact or CPDLC data, and
+		those following any of them in a rack if spacing hints are shown.
+		'''
+		self._updateDuplicateCallsigns()
+		changed = set()
+		for strip in self._allStrips():
+			if strip.change_count != self.refreshed_changes.get(strip) or strip.linkedAircraft() != None \
+					or strip.lookup(soft_link_detail) != None or settings.strip_CPDLC_integration \
+					and env.cpdlc.currentDataLink(strip.callsign(fpl=True)) != None:
+				changed.add(strip)
+				self.refreshed_changes[strip] = strip.change_count
+		for irack, lst in enumerate(self.racked_strips):
+			first_changed = None # first row of the current range of changed rows
+			for row, strip in enumerate(lst + [None]): # None closes the last range
+				if strip != None and (strip in changed or settings.APP_spacing_hints and row > 0 and lst[row - 1] in changed):
+					if first_changed == None:
+						first_changed = row
+				elif first_changed != None:
+					self.dataChanged.emit(self.index(first_changed, irack), self.index(row - 1, irack))
+					first_changed = None
+	
+	def _updateDuplicateCallsigns(self):
+		'''
+		Strip callsigns can change without going through the model (e.g. linked flight plan edits),
+		so the callsign index is reconciled with every strip here, in linear time.
+		Duplicate callsign flags are then written where they change.
+		'''
+		all_strips = self._allStrips()
+		for strip in all_strips:
+			cs = strip.callsign(fpl=True)
+			self._indexCallsign(strip, (None if cs == None else cs.upper()))
+		for strip in all_strips:
+			cs = self.indexed_callsigns[strip]
+			dup = cs != None and self.callsign_counts[cs] > 1
+			if dup != bool(strip.lookup(duplicate_callsign_detail)):
+				strip.writeDetail(duplicate_callsign_detail, (True if dup else None))
+	
+	def _indexCallsign(self, strip, cs):
+		'''
+		cs: upper case callsign to count for the strip, or None to uncount
+		'''
+		old_cs = self.indexed_callsigns.get(strip)
+		if cs != old_cs:
+			if old_cs != None:
+				self.callsign_counts[old_cs] -= 1
+				if self.callsign_counts[old_cs] == 0:
+					del self.callsign_counts[old_cs]
+			if cs != None:
+				self.callsign_counts[cs] = self.callsign_counts.get(cs, 0) + 1
+		self.indexed_callsigns[strip] = cs
+	
+	def _allStrips(self):
+		if self.all_strips == None:
+			self.all_strips = [s for lst in self.racked_strips for s in lst] + self.unracked_strips
+		return self.all_strips
+	
 	def validNewRackName(self, name):
 		return name not in ['', default_rack_name] + self.rackNames()
 
@@ -154,16 +222,19 @@ class LiveStripModel(QAbstractTableModel):
 		'''
 		Returns a count of all strips, possibly filtered if bool function is given
 		'''
-		return len(self.listStrips(pred))
+		if pred == None:
+			return len(self._allStrips())
+		else:
+			return sum(1 for s in self._allStrips() if pred(s))
 	
 	def listStrips(self, pred=None):
 		'''
 		Returns a list of all strips, possibly filtered if bool function is given
 		'''
 		if pred == None:
-			return [s for lst in self.racked_strips for s in lst] + self.unracked_strips
+			return self._allStrips()[:] # copy, as the model keeps its own
 		else:
-			return [s for s in self.listStrips(pred=None) if pred(s)]
+			return [s for s in self._allStrips() if pred(s)]
 	
 	def findStrip(self, pred):
 		'''
@@ -177,6 +248,7 @@ class LiveStripModel(QAbstractTableModel):
 	
 	def addStrip(self, strip, pos=None):
 		rack = strip.lookup(rack_detail)
+		self.all_strips = None
 		if rack == None: # loose or boxed strip to add
 			self.unracked_strips.append(strip)
 			box = strip.lookup(runway_box_detail)
@@ -196,6 +268,10 @@ class LiveStripModel(QAbstractTableModel):
 	
 	def removeStrip(self, strip):
 		racked, index = self._findStripIndex(lambda s: s is strip)
+		self.all_strips = None
+		self._indexCallsign(strip, None)
+		del self.indexed_callsigns[strip]
+		self.refreshed_changes.pop(strip, None)
 		if racked:
 			rack_list = self.racked_strips[index.column()]
 			del rack_list[index.row()]
@@ -218,6 +294,10 @@ class LiveStripModel(QAbstractTableModel):
 		self.unracked_strips.clear()
 		for lst in self.racked_strips:
 			lst.clear()
+		self.all_strips = None
+		self.indexed_callsigns.clear()
+		self.callsign_counts.clear()
+		self.refreshed_changes.clear()
 		self.endRemoveRows()
 		return True
 	
@@ -242,6 +322,51 @@ class LiveStripModel(QAbstractTableModel):
 		self.stripMoved.emit(strip)
 		self.endResetModel()
 	
+	## WHOLE BOARD ##
+	
+	def boardSnapshot(self):
+		'''
+		Returns the binary encoding of all strips with their racks and linked FPLs (see encode_strip_board).
+		'''
+		return encode_strip_board(self.rack_names, self._allStrips())
+	
+	def restoreBoard(self, data):
+		'''
+		Adds the strips of an encoded board, and any missing racks; raises ValueError if data is invalid.
+		Strips are linked to the FPLs of the model with the same online IDs, or to local FPLs with identical
+		details (e.g. left from a previous restore), if any; other FPLs are added.
+		Strips for a runway box already filled or unavailable here are racked, like loose strips (not in a bay).
+		Returns the list of strips added.
+		'''
+		rack_names, strips = decode_strip_board(data)
+		for rack in rack_names:
+			if rack not in self.rack_names:
+				self.addRack(rack)
+		box_count = 0 if env.airport_data == None else env.airport_data.physicalRunwayCount()
+		filled_boxes = { s.lookup(runway_box_detail) for s in self.unracked_strips }
+		for strip in strips:
+			fpl = strip.linkedFPL()
+			if fpl != None:
+				if fpl.existsOnline():
+					known_FPL = env.FPLs.findOnlineFPL(fpl.online_id)
+				else:
+					known_FPL = next((f for f in env.FPLs.findAll(callsign=fpl[FPL.CALLSIGN]) \
+							if not f.existsOnline() and f.details == fpl.details), None)
+				if known_FPL == None:
+					env.FPLs.addFPL(fpl)
+				else:
+					strip.linkFPL(known_FPL, autoFillOK=False)
+			rack = strip.lookup(rack_detail)
+			box = strip.lookup(runway_box_detail)
+			if rack == None and (box == None or box >= box_count or box in filled_boxes):
+				strip.writeDetail(runway_box_detail, None)
+				strip.writeDetail(rack_detail, default_rack_name)
+			elif rack != None and rack not in self.rack_names:
+				self.addRack(rack)
+			filled_boxes.add(strip.lookup(runway_box_detail))
+			self.addStrip(strip)
+		return strips
+	
 	## RACK ACCESSORS ##
 	
 	def rackNames(self):
@@ -287,6 +412,7 @@ class LiveStripModel(QAbstractTableModel):
 	def removeRack(self, name):
 		c = self.rackIndex(name)
 		self.beginRemoveColumns(QModelIndex(), c, c)
+		self.all_strips = None
 		del self.racked_strips[c]
 		del self.rack_names[c]
 		self.endRemoveColumns()
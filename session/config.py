@@ -5,7 +5,6 @@ from os import getpid, path
 from datetime import timedelta
 from xml.etree import ElementTree
 from xml.dom import minidom
-from urllib.request import Request, urlopen
 
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QColor
@@ -128,15 +127,6 @@ default_colour_specs = {
 # -------------------------------
 
 
-def open_URL(url, postData=None, timeout=5):
-	'''
-	May raise urllib.request.urlopen exceptions like URLError
-	'''
-	req = Request(url, data=postData, headers={'User-Agent': 'ATC-pie/%s' % version_string})
-	return urlopen(req, timeout=timeout).read()
-
-
-
 
 
 class XpdrAssignmentRange:
@@ -265,6 +255,8 @@ class Settings:
 		self.lenny64_password_md5 = ''
 		self.FPL_update_interval = timedelta(minutes=2)
 		self.METAR_update_interval = timedelta(minutes=5)
+		self.METAR_cache_max_age = timedelta(hours=2) # older cached METARs are not used on session start
+		self.FPL_cache_max_age = timedelta(days=1) # same for downloaded flight plans
 		
 		# Solo sessions
 		self.solo_aircraft_types = ['C172', 'AT43', 'A320', 'A346', 'A388', 'B744', 'B737', 'B772', 'B773']
@@ -527,6 +519,8 @@ class Settings:
 		root.append(xmlelt('lenny64_password_md5', self.lenny64_password_md5))
 		root.append(xmlelt('FPL_update_interval', str(int(self.FPL_update_interval.total_seconds() / 60))))
 		root.append(xmlelt('METAR_update_interval', str(int(self.METAR_update_interval.total_seconds() / 60))))
+		root.append(xmlelt('METAR_cache_max_age', str(int(self.METAR_cache_max_age.total_seconds() / 60))))
+		root.append(xmlelt('FPL_cache_max_age', str(int(self.FPL_cache_max_age.total_seconds() / 60))))
 		root.append(xmllstelt('solo_aircraft_types', self.solo_aircraft_types, lambda t: xmlelt('aircraft_type', t)))
 		root.append(xmlelt('solo_restrict_to_available_liveries', str(int(self.solo_restrict_to_available_liveries))))
 		root.append(xmlelt('solo_prefer_entry_exit_ADs', str(int(self.solo_prefer_entry_exit_ADs))))
@@ -741,6 +735,12 @@ class Settings:
 		METAR_update_interval = root.find('METAR_update_interval')
 		if METAR_update_interval != None:
 			self.METAR_update_interval = timedelta(minutes=int(METAR_update_interval.text))
+		METAR_cache_max_age = root.find('METAR_cache_max_age')
+		if METAR_cache_max_age != None:
+			self.METAR_cache_max_age = timedelta(minutes=int(METAR_cache_max_age.text))
+		FPL_cache_max_age = root.find('FPL_cache_max_age')
+		if FPL_cache_max_age != None:
+			self.FPL_cache_max_age = timedelta(minutes=int(FPL_cache_max_age.text))
 		
 		solo_aircraft_types = root.find('solo_aircraft_types')
 		if solo_aircraft_types != None:
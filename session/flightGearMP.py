@@ -7,17 +7,18 @@ try:
 except ImportError:
 	irc_available = False
 
-from PyQt5.QtCore import QMutex, QThread
+from PyQt5.QtCore import QMutex, QThread, pyqtSignal
 
 from data.util import pop_all, some, INET_addr_str
 from data.comms import ChatMessage
 from data.weather import Weather
-from data.fpl import FPL, FplError
+from data.fpl import FplError
 from data.utc import now
 from data.strip import Strip, handover_details, received_from_detail
 
 from session.config import settings
 from session.env import env
+from session.onlineCache import online_cache
 from session.manager import SessionManager, SessionType, HandoverBlocked
 
 from ext.fgfs import is_ATC_model
@@ -25,6 +26,7 @@ from ext.fgms import FGMShandshaker, FGMSlistener, FgmsAircraft, update_FgmsAirc
 from ext.orsx import WwStripExchanger
 from ext.fgfs import send_packet_to_views
 from ext.noaa import get_METAR
+from ext.httpClient import http_client
 from ext.lenny64 import Lenny64Error, download_FPLs, file_new_FPL, upload_FPL_updates, set_FPL_status
 
 from gui.actions import transfer_selected_or_instruct, answer_who_has
@@ -33,6 +35,8 @@ from gui.misc import signals, selection, Ticker
 
 # ---------- Constants ----------
 
+FPL_check_days = range(-4, 5) # days around today
+
 minimum_chat_message_send_count = 8
 session_tick_interval = 500 # ms
 
@@ -65,48 +69,75 @@ class WeatherUpdater(QThread):
 			return self.known_info[station]
 		except KeyError:
 			self.start() # This trick works only if station is the primary or in the additional ones
+	
+	def restoreCachedWeather(self):
+		'''
+		Fills in last-known weather from the online cache, unless too old; revalidated on next run.
+		'''
+		for station in [settings.primary_METAR_station] + settings.additional_METAR_stations:
+			metar = online_cache.cachedMETAR(station, settings.METAR_cache_max_age)
+			if metar != None and station not in self.known_info:
+				self.known_info[station] = w = Weather(metar)
+				signals.newWeather.emit(station, w)
 		
 	def run(self):
 		wanted = [settings.primary_METAR_station] + settings.additional_METAR_stations
 		for key in list(self.known_info): # buliding list of keys to allow deletion in loop
 			if key not in wanted:
 				del self.known_info[key]
-		for station in wanted:
-			new_metar = get_METAR(station)
+		received = {}
+		for station, new_metar in zip(wanted, http_client.fanOut(get_METAR, wanted)):
 			if new_metar != None:
+				received[station] = new_metar
 				prev = self.known_info.get(station, None)
 				self.known_info[station] = w = Weather(new_metar)
 				if prev == None or w.isNewerThan(prev):
 					signals.newWeather.emit(station, w)
+		if received != {}:
+			online_cache.storeMETARs(received)
 
 
 
 
 class FPLchecker(QThread):
+	'''
+	Downloads are merged into the FPL model in the GUI thread, which reads its indexes.
+	'''
+	_downloaded = pyqtSignal(list) # online FPL list; emitted from checker thread
+	
 	def __init__(self, parent):
 		QThread.__init__(self, parent)
+		self._downloaded.connect(self.mergeDownload) # queued: checker object lives in GUI thread
+	
+	def restoreCachedFPLs(self):
+		'''
+		Merges the flight plans last downloaded for the checked days, unless too old; revalidated on next run.
+		No new FPL signals are emitted for them.
+		'''
+		today = now().date()
+		cached_FPLs = []
+		for day in [today + i * timedelta(days=1) for i in FPL_check_days]:
+			cached_FPLs.extend(some(online_cache.cachedFPLs(day, settings.FPL_cache_max_age), []))
+		if cached_FPLs != []: # otherwise merging would drop any online FPLs already listed
+			env.FPLs.mergeOnlineFPLs(cached_FPLs)
 		
 	def run(self):
 		try:
-			day = now().date()
-			online_IDs = set()
-			for i in range(-4, 5):
-				for online_fpl in download_FPLs(day + i * timedelta(days=1)):
-					online_IDs.add(online_fpl.online_id)
-					try:
-						got_FPL = env.FPLs.findFPL(lambda fpl: fpl.online_id == online_fpl.online_id)[0]
-					except StopIteration:
-						env.FPLs.addFPL(online_fpl)
-						signals.newFPL.emit(online_fpl)
-					else:
-						got_FPL.setOnlineStatus(online_fpl.status())
-						got_FPL.setOnlineComments(online_fpl.onlineComments())
-						for d in FPL.details:
-							if d not in got_FPL.modified_details and got_FPL[d] != online_fpl[d]:
-								got_FPL.details[d] = online_fpl[d]
-			env.FPLs.clearFPLs(pred=(lambda fpl: fpl.existsOnline() and fpl.online_id not in online_IDs))
+			today = now().date()
+			days = [today + i * timedelta(days=1) for i in FPL_check_days]
+			downloaded = dict(zip(days, http_client.fanOut(download_FPLs, days)))
 		except Lenny64Error as err:
 			print('Could not check for online flight plans. %s' % err)
+		else:
+			online_cache.storeFPLs(downloaded) # before the merge, which may share the FPL objects with the model
+			online_FPLs = []
+			for fpls in downloaded.values():
+				online_FPLs.extend(fpls)
+			self._downloaded.emit(online_FPLs)
+	
+	def mergeDownload(self, online_FPLs):
+		for fpl in env.FPLs.mergeOnlineFPLs(online_FPLs):
+			signals.newFPL.emit(fpl)
 
 
 
@@ -256,7 +287,7 @@ class FlightGearMultiPlayerSessionManager(SessionManager):
 		self.has_online_FPLs = True
 		self.my_callsign = callsign
 		self.socket = None # None here when simulation NOT running
-		self.session_ticker = Ticker(self.sessionTick, parent=gui)
+		self.session_ticker = Ticker(self.sessionTick, parent=gui, name='FGMS session')
 		self.IRC_communicator = IrcCommunicator(gui, callsign) if irc_available and settings.MP_IRC_enabled else None
 		self.WW_strip_exchanger = WwStripExchanger(gui)
 		self.connection_list_mutex = QMutex() # Critical: session ticker clearing zombies vs. FGMS listener adding traffic
@@ -287,6 +318,8 @@ class FlightGearMultiPlayerSessionManager(SessionManager):
 				self.IRC_communicator.start()
 			if settings.MP_ORSX_enabled:
 				self.WW_strip_exchanger.start()
+			self.weather_updater.restoreCachedWeather()
+			self.FPL_checker.restoreCachedFPLs()
 			self.FPL_ticker.start_stopOnZero(settings.FPL_update_interval)
 			self.METAR_ticker.start_stopOnZero(settings.METAR_update_interval)
 			signals.fplUpdateRequest.connect(self.FPL_checker.start)
@@ -430,14 +463,17 @@ class FlightGearMultiPlayerSessionManager(SessionManager):
 		pop_all(self.FGMS_connections, FgmsAircraft.isZombie)
 		# update ATC model before unlocking mutex
 		old_register = env.ATCs.knownATCs()
-		updated = []
-		for atc in self.WW_strip_exchanger.connectedATCs():
-			env.ATCs.updateATC(atc.callsign, atc.position, atc.social_name, atc.frequency)
-			updated.append(atc.callsign)
+		known = set(old_register)
+		updated = set()
+		WW_ATCs, WW_changes = self.WW_strip_exchanger.takeATCupdates()
+		for atc in WW_ATCs:
+			if atc.callsign in WW_changes or atc.callsign not in known: # no need to update others
+				env.ATCs.updateATC(atc.callsign, atc.position, atc.social_name, atc.frequency)
+			updated.add(atc.callsign)
 		for c in self.FGMS_connections:
 			if is_ATC_model(c.aircraft_type) and c.identifier not in updated:
 				env.ATCs.updateATC(c.identifier, c.liveCoords(), c.ATCpie_social_name, c.ATCpie_publicised_frequency)
-				updated.append(c.identifier)
+				updated.add(c.identifier)
 		for had_callsign in old_register:
 			if had_callsign not in updated:
 				env.ATCs.removeATC(had_callsign)
@@ -0,0 +1,106 @@
+
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import Qt, QObject, pyqtSignal
+
+
+# ---------- Constants ----------
+
+loader_worker_count = 4
+
+# -------------------------------
+
+
+class LoadingStage:
+	'''
+	"load" is called in a worker thread, only after all the "requires" stages are applied. It may read what
+	they have set but must not modify GUI objects or the session environment, which "apply" is for:
+	it is called in the GUI thread with the load result. Essential stages are those to complete before a
+	session can be opened.
+	'''
+	def __init__(self, name, load, apply=None, requires=[], essential=True):
+		self.name = name
+		self.load = load
+		self.apply = apply
+		self.requires = requires
+		self.essential = essential
+
+
+
+class StagedLoader(QObject):
+	'''
+	Runs a set of loading stages in a worker pool, each as soon as the stages it requires are applied.
+	A failing essential stage cancels the whole loading; failing optional stages are only reported,
+	and count as applied for the stages requiring them.
+	'''
+	stageApplied = pyqtSignal(str)
+	essentialsReady = pyqtSignal()
+	finished = pyqtSignal()
+	failed = pyqtSignal(str, str) # stage name, error message
+	_stageLoaded = pyqtSignal(str, object, object) # stage name, result, exception raised; emitted from worker threads
+	
+	def __init__(self, stages, parent=None):
+		QObject.__init__(self, parent)
+		self.stages = { stage.name: stage for stage in stages }
+		self.results = {} # stage name -> result, for applied stages
+		self.futures = {} # stage name -> Future, for started stages
+		self.executor = None
+		self.cancelled = False
+		self._stageLoaded.connect(self._applyStage, type=Qt.QueuedConnection) # applied in GUI thread, even if already loaded on submission
+	
+	def essentialStageCount(self):
+		return sum(1 for stage in self.stages.values() if stage.essential)
+	
+	def appliedEssentialStageCount(self):
+		return sum(1 for name in self.results if self.stages[name].essential)
+	
+	def isRunning(self):
+		return self.executor != None
+	
+	def start(self):
+		self.executor = ThreadPoolExecutor(max_workers=loader_worker_count)
+		self._startReadyStages()
+	
+	def cancel(self):
+		if self.isRunning():
+			self.cancelled = True
+			for future in self.futures.values():
+				future.cancel() # only cancels stages not yet running; others complete but are ignored
+			self._shutdown()
+	
+	def _shutdown(self):
+		self.executor.shutdown(wait=False)
+		self.executor = None
+	
+	def _startReadyStages(self):
+		for name, stage in self.stages.items():
+			if name not in self.futures and all(req in self.results for req in stage.requires):
+				self.futures[name] = self.executor.submit(stage.load)
+				self.futures[name].add_done_callback(lambda f, name=name: self._emitStageLoaded(name, f))
+	
+	def _emitStageLoaded(self, name, future): # called in worker thread
+		if not future.cancelled():
+			exception = future.exception()
+			self._stageLoaded.emit(name, (None if exception != None else future.result()), exception)
+	
+	def _applyStage(self, name, result, exception):
+		if self.cancelled:
+			return
+		stage = self.stages[name]
+		if exception != None:
+			print('Loading stage "%s" failed: %s' % (name, exception))
+			if stage.essential:
+				self.cancel()
+				self.failed.emit(name, str(exception))
+				return
+		elif stage.apply != None:
+			stage.apply(result)
+		self.results[name] = result
+		self.stageApplied.emit(name)
+		if stage.essential and self.appliedEssentialStageCount() == self.essentialStageCount():
+			self.essentialsReady.emit()
+		if len(self.results) == len(self.stages):
+			self._shutdown()
+			self.finished.emit()
+		else:
+			self._startReadyStages()
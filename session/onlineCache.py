@@ -0,0 +1,101 @@
+
+import pickle
+from os import replace
+from threading import Lock
+from datetime import timedelta
+
+from data.utc import now
+
+
+# ---------- Constants ----------
+
+online_cache_file = 'settings/online-cache'
+cache_entry_lifetime = timedelta(days=10) # older entries are dropped on save, whatever the staleness limits
+
+# -------------------------------
+
+
+class OnlineCache:
+	'''
+	Last-known online data, kept on disk between runs so that sessions can start with it while it is
+	revalidated: METARs per station, and downloaded flight plans per day.
+	Flight plans are stored pickled as soon as given, so that later changes to the FPL objects are not saved.
+	Methods are thread-safe (called from online checker threads).
+	'''
+	def __init__(self, file_name):
+		self.file_name = file_name
+		self.lock = Lock()
+		self.loaded = False
+		self.METARs = {} # station -> (METAR str, time received)
+		self.FPL_days = {} # date -> (pickled FPL list, time received)
+	
+	def cachedMETAR(self, station, max_age):
+		'''
+		returns None if not cached or older than max_age
+		'''
+		with self.lock:
+			self._load()
+			try:
+				metar, t = self.METARs[station]
+			except KeyError:
+				return None
+		return metar if now() - t <= max_age else None
+	
+	def cachedFPLs(self, day, max_age):
+		'''
+		returns a new FPL list, or None if not cached or older than max_age
+		'''
+		with self.lock:
+			self._load()
+			try:
+				pickled, t = self.FPL_days[day]
+			except KeyError:
+				return None
+		return pickle.loads(pickled) if now() - t <= max_age else None
+	
+	def storeMETARs(self, metars):
+		'''
+		metars: station -> METAR str dict
+		'''
+		t = now()
+		with self.lock:
+			self._load()
+			self.METARs.update((station, (metar, t)) for station, metar in metars.items())
+			self._save()
+	
+	def storeFPLs(self, FPLs_by_day):
+		'''
+		FPLs_by_day: date -> FPL list dict
+		'''
+		t = now()
+		with self.lock:
+			self._load()
+			self.FPL_days.update((day, (pickle.dumps(fpls), t)) for day, fpls in FPLs_by_day.items())
+			self._save()
+	
+	def _load(self):
+		if not self.loaded:
+			self.loaded = True
+			try:
+				with open(self.file_name, 'rb') as f:
+					self.METARs, self.FPL_days = pickle.load(f)
+			except FileNotFoundError:
+				pass
+			except Exception as err:
+				print('ERROR: Could not read online data cache: %s' % err)
+	
+	def _save(self):
+		expiry = now() - cache_entry_lifetime
+		for d in self.METARs, self.FPL_days:
+			for key in [k for k, (v, t) in d.items() if t < expiry]:
+				del d[key]
+		try:
+			with open(self.file_name + '.tmp', 'wb') as f:
+				pickle.dump((self.METARs, self.FPL_days), f)
+			replace(self.file_name + '.tmp', self.file_name) # not to leave a truncated cache if interrupted
+		except OSError as err:
+			print('ERROR: Could not save online data cache: %s' % err)
+
+
+
+online_cache = OnlineCache(online_cache_file)
@@ -0,0 +1,157 @@
+
+import json
+import csv
+from time import perf_counter
+from functools import wraps
+from threading import Lock
+from collections import deque
+
+
+# ---------- Constants ----------
+
+profiling_window = 500 # most recent durations kept per scope for percentiles
+reported_percentiles = [50, 90, 99]
+
+# -------------------------------
+
+
+class ScopeStats:
+	def __init__(self, name):
+		self.name = name
+		self.count = 0
+		self.total = 0 # seconds
+		self.worst = 0 # seconds
+		self.overruns = 0 # times a budget was given and exceeded
+		self.recent = deque(maxlen=profiling_window) # seconds, most recent last
+	
+	def add(self, duration, budget=None):
+		self.count += 1
+		self.total += duration
+		self.worst = max(self.worst, duration)
+		if budget != None and duration > budget:
+			self.overruns += 1
+		self.recent.append(duration)
+	
+	def percentile(self, p):
+		'''
+		over the recent window, in seconds; None if nothing recorded
+		'''
+		if len(self.recent) == 0:
+			return None
+		ordered = sorted(self.recent)
+		return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+	
+	def summary(self):
+		'''
+		dict of JSON-friendly values; times in milliseconds
+		'''
+		result = { 'scope': self.name, 'count': self.count, 'overruns': self.overruns, \
+			'mean_ms': 1000 * self.total / self.count if self.count > 0 else None, 'max_ms': 1000 * self.worst }
+		for p in reported_percentiles:
+			v = self.percentile(p)
+			result['p%d_ms' % p] = None if v == None else 1000 * v
+		return result
+
+
+
+class ProfilingScope:
+	'''
+	Context manager timing a block into the profiler, if enabled when entering.
+	'''
+	def __init__(self, profiler, name, budget):
+		self.profiler = profiler
+		self.name = name
+		self.budget = budget
+		self.t0 = None
+	
+	def __enter__(self):
+		self.t0 = perf_counter() if self.profiler.enabled else None
+		return self
+	
+	def __exit__(self, exc_type, exc_value, traceback):
+		if self.t0 != None:
+			self.profiler.record(self.name, perf_counter() - self.t0, budget=self.budget)
+		return False
+
+
+
+class Profiler:
+	'''
+	Named timing scopes around hot paths, toggled at run-time. When disabled, instrumented code only
+	pays an attribute test; nothing is recorded.
+	A scope given a budget (seconds) counts overruns, e.g. a tick taking longer than its interval;
+	only the first overrun of each scope is printed, the others are counted in the report.
+	Scopes may be recorded from any thread.
+	'''
+	def __init__(self):
+		self.enabled = False
+		self.stats = {} # str -> ScopeStats
+		self.lock = Lock() # guards stats and their contents
+	
+	def setEnabled(self, toggle):
+		if toggle and not self.enabled:
+			with self.lock:
+				self.stats.clear()
+		self.enabled = toggle
+	
+	def record(self, name, duration, budget=None):
+		with self.lock:
+			try:
+				stats = self.stats[name]
+			except KeyError:
+				stats = self.stats[name] = ScopeStats(name)
+			stats.add(duration, budget=budget)
+			first_overrun = budget != None and duration > budget and stats.overruns == 1
+		if first_overrun:
+			print('WARNING: Overrun in %s: %.0f ms for a %.0f ms budget (further overruns counted in profiling report)' \
+					% (name, 1000 * duration, 1000 * budget))
+	
+	def scope(self, name, budget=None):
+		return ProfilingScope(self, name, budget)
+	
+	def profiled(self, name, budget=None):
+		'''
+		function decorator
+		'''
+		def decorator(f):
+			@wraps(f)
+			def wrapper(*args, **kwargs):
+				if not self.enabled:
+					return f(*args, **kwargs)
+				t0 = perf_counter()
+				try:
+					return f(*args, **kwargs)
+				finally:
+					self.record(name, perf_counter() - t0, budget=budget)
+			return wrapper
+		return decorator
+	
+	def report(self):
+		'''
+		list of scope summaries, by decreasing total time spent
+		'''
+		with self.lock:
+			return [st.summary() for st in sorted(self.stats.values(), key=(lambda st: -st.total))]
+	
+	def reportStr(self):
+		lines = []
+		for s in self.report():
+			lines.append('%s: %d calls, mean %.2f ms, p90 %.2f ms, max %.2f ms%s' % (s['scope'], s['count'], \
+				s['mean_ms'], s['p90_ms'], s['max_ms'], '' if s['overruns'] == 0 else ', %d OVERRUNS' % s['overruns']))
+		return '\n'.join(lines)
+	
+	def exportJSON(self, file_name):
+		with open(file_name, 'w', encoding='utf8') as f:
+			json.dump(self.report(), f, indent=2)
+	
+	def exportCSV(self, file_name):
+		fields = ['scope', 'count', 'overruns', 'mean_ms', 'max_ms'] + ['p%d_ms' % p for p in reported_percentiles]
+		with open(file_name, 'w', encoding='utf8', newline='') as f:
+			writer = csv.DictWriter(f, fields)
+			writer.writeheader()
+			writer.writerows(self.report())
+
+
+
+profiler = Profiler()
+
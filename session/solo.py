@@ -58,7 +58,7 @@ class SoloSessionManager(SessionManager):
 	def __init__(self, gui):
 		SessionManager.__init__(self, gui)
 		self.session_type = SessionType.SOLO
-		self.session_ticker = Ticker(self.tickSessionOnce, parent=gui)
+		self.session_ticker = Ticker(self.tickSessionOnce, parent=gui, name='solo session')
 		self.weather_ticker = Ticker(self.setNewWeather, parent=gui)
 		self.spawn_timer = QTimer(gui)
 		self.spawn_timer.setSingleShot(True)
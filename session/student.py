@@ -12,7 +12,8 @@ from data.strip import Strip, received_from_detail, handover_details
 from session.config import settings
 from session.env import env
 from session.manager import SessionManager, SessionType, student_callsign, teacher_callsign
-from session.teacher import TeachingMsg, TeachingSessionWire, CPDLC_transfer_cmd_prefix, CPDLC_message_cmd_prefix
+from session.teacher import TeachingMsg, TeachingSessionWire, TrafficFrameDecoder, \
+		CPDLC_transfer_cmd_prefix, CPDLC_message_cmd_prefix
 
 from ext.fgfs import send_packet_to_views
 from ext.fgms import update_FgmsAircraft_list
@@ -35,6 +36,7 @@ class StudentSessionManager(SessionManager):
 		self.teacher_socket = QTcpSocket() # this socket connects to the teacher
 		self.teacher_paused_at = None # pause time if session is paused; None otherwise
 		self.traffic = [] # FgmsAircraft list
+		self.traffic_decoder = None
 		self.known_METAR = None
 	
 	def start(self):
@@ -46,6 +48,7 @@ class StudentSessionManager(SessionManager):
 			self.teacher.messageArrived.connect(self.receiveMsgFromTeacher)
 			print('Connected to teacher.')
 			self.traffic.clear()
+			self.traffic_decoder = TrafficFrameDecoder()
 			self.running = True
 			signals.sessionStarted.emit()
 		else:
@@ -56,6 +59,7 @@ class StudentSessionManager(SessionManager):
 			self.running = False
 			self.teacher.messageArrived.disconnect(self.receiveMsgFromTeacher)
 			self.teacher_socket.disconnected.disconnect(self.disconnected)
+			self.teacher.flush()
 			self.teacher_socket.disconnectFromHost()
 			print('Disconnected.')
 			self.traffic.clear()
@@ -121,11 +125,18 @@ class StudentSessionManager(SessionManager):
 				env.cpdlc.endDataLink(callsign)
 			for acft in pop_all(self.traffic, lambda a: a.identifier == callsign):
 				signals.aircraftKilled.emit(acft)
-		elif msg.type == TeachingMsg.TRAFFIC: # traffic update; contains FGMS packet
-			fgms_packet = msg.binData()
-			update_FgmsAircraft_list(self.traffic, fgms_packet)
-			send_packet_to_views(fgms_packet)
-			self.teacher.sendMessage(TeachingMsg(TeachingMsg.TRAFFIC))
+		elif msg.type == TeachingMsg.TRAFFIC: # traffic update; contains a frame of traffic changes
+			try:
+				frame_number, fgms_packets = self.traffic_decoder.decodeFrame(msg.binData())
+			except ValueError as err:
+				print('ERROR: %s; requesting key frame.' % err)
+				self.teacher.sendMessage(TeachingMsg(TeachingMsg.TRAFFIC))
+			else:
+				if fgms_packets != None: # not skipped while waiting for a key frame
+					for fgms_packet in fgms_packets:
+						update_FgmsAircraft_list(self.traffic, fgms_packet)
+						send_packet_to_views(fgms_packet)
+					self.teacher.sendMessage(TeachingMsg(TeachingMsg.TRAFFIC, data=frame_number.to_bytes(4, 'big')))
 		elif msg.type == TeachingMsg.SIM_PAUSED:
 			self.teacher_paused_at = now()
 			signals.sessionPaused.emit()
@@ -1,12 +1,16 @@
+import pickle
+import struct
+from time import monotonic
 from socket import socket, AF_INET, SOCK_DGRAM, SOL_SOCKET, SO_REUSEADDR
 
-from PyQt5.QtCore import QObject, pyqtSignal
-from PyQt5.QtNetwork import QTcpServer, QHostAddress
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtNetwork import QTcpServer, QHostAddress, QAbstractSocket
 from PyQt5.QtWidgets import QMessageBox, QInputDialog
 
 from ai.controlled import ControlledAircraft
 
 from data.util import pop_all
+from data.coords import EarthCoords
 from data.fpl import FPL
 from data.utc import now
 from data.db import wake_turb_cat
@@ -16,12 +20,13 @@ from data.weather import Weather
 from data.strip import Strip, handover_details, received_from_detail, sent_to_detail, \
 		assigned_SQ_detail, assigned_heading_detail, assigned_altitude_detail, assigned_speed_detail
 
-from session.config import settings
+from session.config import settings, airport_settings_filename_pattern, CTR_settings_filename_pattern
 from session.env import env
 from session.manager import SessionManager, SessionType, HandoverBlocked, student_callsign, teacher_callsign
 from session.solo import Status, SoloParams
 
 from ext.fgfs import send_packet_to_views
+from ext.fgms import mkFgmsMsg_position
 from ext.tts import speech_str2txt
 
 from gui.misc import selection, signals, Ticker
@@ -32,73 +37,150 @@ from gui.dialog.miscDialogs import yesNo_question
 # ---------- Constants ----------
 
 teacher_ticker_interval = 200 # ms
-max_noACK_traffic = 20
+max_noACK_traffic = 5 # traffic frames, i.e. ticks
 new_traffic_XPDR_mode = 'C'
 
 CPDLC_transfer_cmd_prefix = 'XFR:'
 CPDLC_message_cmd_prefix = 'MSG:'
 
+saved_situations_file_suffix = '.situations'
+
+traffic_coords_quantum = 1e-7 # degrees of lat/lon (about 1 cm)
+traffic_angles_quantum = .1 # degrees
+traffic_stats_latency_samples = 100
+
 # -------------------------------
 
 
 
+def saved_situations_file():
+	pattern = CTR_settings_filename_pattern if env.airport_data == None else airport_settings_filename_pattern
+	return (pattern % settings.location_code)[:-len('.ini')] + saved_situations_file_suffix
+
+
+def load_named_situations():
+	'''
+	returns the (situation, time, name) list saved for the current location, possibly empty
+	'''
+	try:
+		with open(saved_situations_file(), 'rb') as f:
+			return pickle.load(f)
+	except FileNotFoundError:
+		return []
+	except Exception as err:
+		print('ERROR: Could not read saved teaching situations: %s' % err)
+		return []
+
+
+def save_named_situations(named_situations):
+	try:
+		with open(saved_situations_file(), 'wb') as f:
+			pickle.dump(named_situations, f)
+	except Exception as err:
+		print('ERROR: Could not save teaching situations: %s' % err)
+
+
+
+
+
+
 class TeachingMsg:
 	msg_types = ACFT_KILLED, SIM_PAUSED, SIM_RESUMED, ATC_TEXT_CHAT, \
 							STRIP_EXCHANGE, SX_LIST, WEATHER, TRAFFIC, PTT, CPDLC = range(10)
 	
 	def __init__(self, msg_type, data=None):
 		self.type = msg_type
-		self.data = b''
+		self.data = bytearray()
 		if data != None:
 			self.appendData(data)
 	
 	def appendData(self, data):
-		self.data += data if isinstance(data, bytes) else data.encode('utf8')
+		self.data.extend(data if isinstance(data, (bytes, bytearray)) else data.encode('utf8'))
 	
 	def binData(self):
-		return self.data
+		return bytes(self.data)
 	
 	def strData(self):
 		return self.data.decode('utf8')
 
 
 
+class TeachingMsgFramer:
+	'''
+	Frame format: message type (1 byte), data length (4 bytes, big endian), data.
+	Received bytes are accumulated until frames are complete, however fragmented.
+	'''
+	header_size = 5
+	
+	def __init__(self):
+		self.buffer = bytearray()
+	
+	def feed(self, data):
+		'''
+		returns the list of TeachingMsg completed by the new data
+		'''
+		self.buffer.extend(data)
+		msgs = []
+		i = 0
+		while len(self.buffer) - i >= TeachingMsgFramer.header_size:
+			data_len = int.from_bytes(self.buffer[i+1:i+5], 'big')
+			end = i + TeachingMsgFramer.header_size + data_len
+			if end > len(self.buffer):
+				break
+			msgs.append(TeachingMsg(self.buffer[i], data=self.buffer[i+TeachingMsgFramer.header_size:end]))
+			i = end
+		del self.buffer[:i]
+		return msgs
+	
+	def frame(msg, out_buffer): # STATIC
+		'''
+		appends the framed message to the given bytearray
+		'''
+		out_buffer.append(msg.type)
+		out_buffer.extend(len(msg.data).to_bytes(4, 'big'))
+		out_buffer.extend(msg.data)
+
+
+
 
 
 
 class TeachingSessionWire(QObject):
+	'''
+	Messages sent are buffered and written to the socket together on the next event loop turn.
+	'''
 	messageArrived = pyqtSignal(TeachingMsg)
 	
 	def __init__(self, socket):
 		QObject.__init__(self)
 		self.socket = socket
-		self.got_msg_type = None
-		self.got_data_len = None
+		self.framer = TeachingMsgFramer()
+		self.out_buffer = bytearray()
+		self.flush_timer = QTimer(self)
+		self.flush_timer.setSingleShot(True)
+		self.flush_timer.timeout.connect(self.flush)
 		self.socket.readyRead.connect(self.readAvailableBytes)
 
 	def readAvailableBytes(self):
-		if self.got_msg_type == None:
-			if self.socket.bytesAvailable() < 1:
-				return
-			self.got_msg_type = int.from_bytes(self.socket.read(1), 'big')
-		if self.got_data_len == None:
-			if self.socket.bytesAvailable() < 4:
-				return
-			self.got_data_len = int.from_bytes(self.socket.read(4), 'big')
-		if self.socket.bytesAvailable() < self.got_data_len:
-			return
-		self.messageArrived.emit(TeachingMsg(self.got_msg_type, data=self.socket.read(self.got_data_len)))
-		self.got_msg_type = self.got_data_len = None
-		if self.socket.bytesAvailable() > 0:
-			self.socket.readyRead.emit()
+		for msg in self.framer.feed(self.socket.read(self.socket.bytesAvailable())):
+			self.messageArrived.emit(msg)
 	
 	def sendMessage(self, msg):
 		#DEBUG if msg.type != TeachingMsg.TRAFFIC:
 		#DEBUG 	print('Sending: %s' % msg.data)
-		buf = msg.type.to_bytes(1, 'big') # message type code
-		buf += len(msg.data).to_bytes(4, 'big') # length of data
-		buf += msg.data # message data
-		self.socket.write(buf)
+		TeachingMsgFramer.frame(msg, self.out_buffer)
+		if not self.flush_timer.isActive():
+			self.flush_timer.start(0)
+	
+	def flush(self):
+		self.flush_timer.stop()
+		if len(self.out_buffer) > 0:
+			try:
+				if self.socket.state() == QAbstractSocket.ConnectedState:
+					self.socket.write(bytes(self.out_buffer))
+			except RuntimeError: # socket already deleted
+				pass
+			del self.out_buffer[:]
 
 
 
@@ -107,12 +189,248 @@ class TeachingSessionWire(QObject):
 
 # -------------------------------
 
+#
+# TRAFFIC message data format:
+#   header: frame number (uint32), ACFT count (uint16)
+#   for each ACFT in the frame: callsign (uint8 length + utf8), field mask (uint8),
+#   then the fields included in the mask, in order of the bits below.
+# ACFT missing from a frame have left the traffic. Other fields are unchanged since previous frame.
+# Frame number 1 is a key frame, with all fields of all ACFT.
+# Traffic ACK messages contain the acknowledged frame number (uint32).
+# An empty traffic message from the student requests a key frame, after which numbering restarts.
+#
+
+traffic_field_bits = MODEL, POSITION, ALTITUDE, ORIENTATION, PROPERTIES = [1 << i for i in range(5)]
+
+property_value_tags = { bool: b'b', int: b'i', float: b'f', str: b's' }
+
+
+def quantised_traffic_state(model, coords, amsl, hdg, pitch, roll, properties):
+	return model, \
+		(int(round(coords.lat / traffic_coords_quantum)), int(round(coords.lon / traffic_coords_quantum))), \
+		int(round(amsl)), \
+		(int(round(hdg / traffic_angles_quantum)) % int(360 / traffic_angles_quantum), \
+				int(round(pitch / traffic_angles_quantum)), int(round(roll / traffic_angles_quantum))), \
+		properties
+
+
+def pack_short_str(s, len_fmt='!B'):
+	b = s.encode('utf8')
+	return struct.pack(len_fmt, len(b)) + b
+
+
+def unpack_short_str(data, i, len_fmt='!B'):
+	n = struct.unpack_from(len_fmt, data, i)[0]
+	i += struct.calcsize(len_fmt)
+	return data[i:i+n].decode('utf8'), i + n
+
+
+
+class TrafficFrameEncoder:
+	'''
+	Batches all traffic into one frame per tick, with only the fields changed since the previous
+	frame (TCP guarantees delivery and order, so the last frame sent is the student's base).
+	If the student fails to decode a frame, it requests a key frame and the encoder is reset.
+	'''
+	def __init__(self):
+		self.frame_number = 0
+		self.sent_states = {} # callsign -> quantised state as last sent
+	
+	def reset(self):
+		self.frame_number = 0
+		self.sent_states.clear()
+	
+	def encodeFrame(self, traffic):
+		'''
+		traffic: (callsign, FGMS position values) list
+		returns the frame number and data to send
+		'''
+		self.frame_number += 1
+		buf = [struct.pack('!IH', self.frame_number, len(traffic))]
+		new_states = {}
+		for callsign, values in traffic:
+			state = quantised_traffic_state(*values)
+			new_states[callsign] = state
+			prev = self.sent_states.get(callsign)
+			mask = 0
+			fields = []
+			if prev == None or state[0] != prev[0]:
+				mask |= MODEL
+				fields.append(pack_short_str(state[0]))
+			if prev == None or state[1] != prev[1]:
+				mask |= POSITION
+				fields.append(struct.pack('!ii', *state[1]))
+			if prev == None or state[2] != prev[2]:
+				mask |= ALTITUDE
+				fields.append(struct.pack('!i', state[2]))
+			if prev == None or state[3] != prev[3]:
+				mask |= ORIENTATION
+				fields.append(struct.pack('!Hhh', *state[3]))
+			if prev == None or state[4] != prev[4]:
+				mask |= PROPERTIES
+				fields.append(self._packProperties(state[4]))
+			buf.append(pack_short_str(callsign))
+			buf.append(struct.pack('!B', mask))
+			buf.extend(fields)
+		self.sent_states = new_states
+		return self.frame_number, b''.join(buf)
+	
+	def _packProperties(self, properties):
+		buf = [struct.pack('!H', len(properties))]
+		for code, value in properties.items():
+			tag = property_value_tags[type(value)]
+			buf.append(struct.pack('!H', code) + tag)
+			if tag == b'b':
+				buf.append(struct.pack('!?', value))
+			elif tag == b'i':
+				buf.append(struct.pack('!i', value))
+			elif tag == b'f':
+				buf.append(struct.pack('!d', value))
+			else:
+				buf.append(pack_short_str(value, len_fmt='!H'))
+		return b''.join(buf)
+
+
+
+class TrafficFrameDecoder:
+	'''
+	Student side of the TrafficFrameEncoder. Rebuilds the full FGMS packets of the traffic.
+	'''
+	def __init__(self):
+		self.states = {} # callsign -> [model, (lat, lon), amsl, (hdg, pitch, roll), properties]
+		self.awaiting_key_frame = False
+	
+	def decodeFrame(self, data):
+		'''
+		returns the frame number and the list of FGMS position packets for the traffic in the frame,
+		or None instead of the list if frame is a delta received while waiting for a key frame
+		raises ValueError if frame is corrupt or refers to unknown aircraft; a key frame is then awaited
+		'''
+		try:
+			frame_number, count = struct.unpack_from('!IH', data, 0)
+			if frame_number == 1:
+				self.states = {}
+				self.awaiting_key_frame = False
+			elif self.awaiting_key_frame:
+				return frame_number, None
+			i = struct.calcsize('!IH')
+			new_states = {}
+			packets = []
+			for n in range(count):
+				callsign, i = unpack_short_str(data, i)
+				mask = data[i]
+				i += 1
+				state = self.states[callsign][:] if callsign in self.states else [None] * 5
+				if mask & MODEL:
+					state[0], i = unpack_short_str(data, i)
+				if mask & POSITION:
+					state[1] = struct.unpack_from('!ii', data, i)
+					i += 8
+				if mask & ALTITUDE:
+					state[2] = struct.unpack_from('!i', data, i)[0]
+					i += 4
+				if mask & ORIENTATION:
+					state[3] = struct.unpack_from('!Hhh', data, i)
+					i += 6
+				if mask & PROPERTIES:
+					state[4], i = self._unpackProperties(data, i)
+				if None in state:
+					raise ValueError('Incomplete state for %s' % callsign)
+				new_states[callsign] = state
+				packets.append(self._mkPacket(callsign, state))
+		except (struct.error, IndexError, KeyError, UnicodeDecodeError, ValueError) as err:
+			self.awaiting_key_frame = True
+			raise ValueError('Bad traffic frame: %s' % err)
+		self.states = new_states
+		return frame_number, packets
+	
+	def _unpackProperties(self, data, i):
+		res = {}
+		count = struct.unpack_from('!H', data, i)[0]
+		i += 2
+		for n in range(count):
+			code = struct.unpack_from('!H', data, i)[0]
+			tag = data[i+2:i+3]
+			i += 3
+			if tag == b'b':
+				res[code] = struct.unpack_from('!?', data, i)[0]
+				i += 1
+			elif tag == b'i':
+				res[code] = struct.unpack_from('!i', data, i)[0]
+				i += 4
+			elif tag == b'f':
+				res[code] = struct.unpack_from('!d', data, i)[0]
+				i += 8
+			elif tag == b's':
+				res[code], i = unpack_short_str(data, i, len_fmt='!H')
+			else:
+				raise ValueError('Bad property value tag: %s' % tag)
+		return res, i
+	
+	def _mkPacket(self, callsign, state):
+		model, (qlat, qlon), amsl, (qhdg, qpitch, qroll), properties = state
+		coords = EarthCoords(qlat * traffic_coords_quantum, qlon * traffic_coords_quantum)
+		return mkFgmsMsg_position(callsign, model, coords, amsl, hdg=(qhdg * traffic_angles_quantum), \
+				pitch=(qpitch * traffic_angles_quantum), roll=(qroll * traffic_angles_quantum), properties=properties)
+
+
+
+class TrafficStreamStats:
+	def __init__(self):
+		self.reset()
+	
+	def reset(self):
+		self.started = monotonic()
+		self.frame_count = 0
+		self.bytes_sent = 0
+		self.full_packet_bytes = 0 # what would have been sent with one full FGMS packet per ACFT
+		self.unACKed_frames = {} # frame number -> send time
+		self.latencies = [] # most recent round trip times, in seconds
+	
+	def frameSent(self, frame_number, frame_size, full_packet_bytes):
+		self.frame_count += 1
+		self.bytes_sent += frame_size
+		self.full_packet_bytes += full_packet_bytes
+		self.unACKed_frames[frame_number] = monotonic()
+	
+	def framesLost(self):
+		self.unACKed_frames.clear()
+	
+	def frameACKed(self, frame_number):
+		try:
+			self.latencies.append(monotonic() - self.unACKed_frames.pop(frame_number))
+		except KeyError:
+			return False
+		if len(self.latencies) > traffic_stats_latency_samples:
+			del self.latencies[0]
+		return True
+	
+	def bandwidth(self):
+		'''
+		in bytes per second since reset
+		'''
+		return self.bytes_sent / max(monotonic() - self.started, 1)
+	
+	def summary(self):
+		txt = '%d traffic frames, %.1f kB/s' % (self.frame_count, self.bandwidth() / 1000)
+		if self.full_packet_bytes > 0:
+			txt += ' (%.0f%% of full packets)' % (100 * self.bytes_sent / self.full_packet_bytes)
+		if self.latencies != []:
+			lat = sorted(self.latencies)
+			txt += ', ACK latency median %d ms, max %d ms' % (1000 * lat[len(lat) // 2], 1000 * lat[-1])
+		return txt
+
+
+
+
+
+
 class TeacherSessionManager(SessionManager):
 	def __init__(self, gui):
 		SessionManager.__init__(self, gui)
 		self.session_type = SessionType.TEACHER
 		self.gui = gui
-		self.session_ticker = Ticker(self.tickSessionOnce, parent=gui)
+		self.session_ticker = Ticker(self.tickSessionOnce, parent=gui, name='teacher session')
 		self.simulation_paused_at = None # pause time if session is paused; None otherwise
 		self.server = QTcpServer(gui)
 		self.student_socket = None
@@ -120,9 +438,13 @@ class TeacherSessionManager(SessionManager):
 		self.aircraft_list = [] # ControlledAircraft list
 		self.current_local_weather = None # initialised by the teaching console on sessionStarted
 		self.noACK_traffic_count = 0
+		self.traffic_encoder = TrafficFrameEncoder()
+		self.traffic_stats = TrafficStreamStats()
+		self.acft_origins = {} # callsign -> (status signature, snapshot entry) for last known snapshot matching ACFT
 	
 	def start(self):
 		self.aircraft_list.clear()
+		self.acft_origins.clear()
 		self.simulation_paused_at = None
 		self.session_ticker.start_stopOnZero(teacher_ticker_interval)
 		self.server.listen(port=settings.teaching_service_port)
@@ -190,6 +512,8 @@ class TeacherSessionManager(SessionManager):
 				self.student.messageArrived.connect(self.receiveMsgFromStudent)
 				env.ATCs.updateATC(student_callsign, None, None, None)
 				self.noACK_traffic_count = 0
+				self.traffic_encoder.reset()
+				self.traffic_stats.reset()
 				self.sendWeather()
 				self.sendATCs()
 				self.tickSessionOnce()
@@ -204,10 +528,12 @@ class TeacherSessionManager(SessionManager):
 		QMessageBox.information(self.gui, 'Student disconnection', 'Your student has disconnected.')
 	
 	def shutdownStudentConnection(self):
+		print('Student traffic stream: %s' % self.traffic_stats.summary())
 		self.student_socket.disconnected.disconnect(self.studentDisconnects)
 		env.cpdlc.endAllDataLinks()
 		env.ATCs.removeATC(student_callsign)
 		self.student.messageArrived.disconnect(self.receiveMsgFromStudent)
+		self.student.flush()
 		self.student_socket.disconnectFromHost()
 		self.student_socket = None
 	
@@ -364,9 +690,14 @@ class TeacherSessionManager(SessionManager):
 		elif msg.type == TeachingMsg.WEATHER: # requesting weather information
 			if msg.strData() == settings.primary_METAR_station:
 				self.sendWeather()
-		elif msg.type == TeachingMsg.TRAFFIC: # acknowledging a traffic message
-			if self.noACK_traffic_count > 0:
-				self.noACK_traffic_count -= 1
+		elif msg.type == TeachingMsg.TRAFFIC: # acknowledging a traffic frame, or requesting a key frame if empty
+			if len(msg.binData()) == 0:
+				print('Student requested a traffic key frame.')
+				self.traffic_encoder.reset()
+				self.traffic_stats.framesLost()
+				self.noACK_traffic_count = 0
+			elif len(msg.binData()) == 4 and self.traffic_stats.frameACKed(int.from_bytes(msg.binData(), 'big')):
+				self.noACK_traffic_count = max(0, self.noACK_traffic_count - 1)
 			else:
 				print('ERROR: Student acknowledging unsent traffic?!')
 		
@@ -410,13 +741,22 @@ class TeacherSessionManager(SessionManager):
 	def tickSessionOnce(self):
 		pop_all(self.aircraft_list, lambda a: not env.pointInRadarRange(a.params.position))
 		send_traffic_this_tick = self.studentConnected() and self.noACK_traffic_count < max_noACK_traffic
+		student_traffic = [] # (callsign, FGMS position values) list
+		full_packet_bytes = 0
 		for acft in self.aircraft_list:
 			acft.tickOnce()
-			fgms_packet = acft.fgmsLivePositionPacket()
+			fgms_values = acft.fgmsLivePositionValues()
+			model, coords, amsl, hdg, pitch, roll, pdct = fgms_values
+			fgms_packet = mkFgmsMsg_position(acft.identifier, model, coords, amsl, hdg=hdg, pitch=pitch, roll=roll, properties=pdct)
 			send_packet_to_views(fgms_packet)
 			if send_traffic_this_tick and acft.spawned:
-				self.student.sendMessage(TeachingMsg(TeachingMsg.TRAFFIC, data=fgms_packet))
-				self.noACK_traffic_count += 1
+				student_traffic.append((acft.identifier, fgms_values))
+				full_packet_bytes += len(fgms_packet)
+		if send_traffic_this_tick:
+			frame_number, frame_data = self.traffic_encoder.encodeFrame(student_traffic)
+			self.student.sendMessage(TeachingMsg(TeachingMsg.TRAFFIC, data=frame_data))
+			self.traffic_stats.frameSent(frame_number, len(frame_data), full_packet_bytes)
+			self.noACK_traffic_count += 1
 	
 	
 	## STRIP EXCHANGE
@@ -437,12 +777,41 @@ class TeacherSessionManager(SessionManager):
 	## SNAPSHOTTING
 	
 	def situationSnapshot(self):
-		return [acft.statusSnapshot() for acft in self.aircraft_list]
+		'''
+		Snapshot entries of unchanged aircraft are shared with the previous snapshots (copy on write).
+		Entries must therefore never be altered once taken.
+		'''
+		result = []
+		for acft in self.aircraft_list:
+			sig = acft.statusSignature()
+			origin = self.acft_origins.get(acft.identifier)
+			if origin == None or origin[0] != sig:
+				origin = sig, acft.statusSnapshot()
+				self.acft_origins[acft.identifier] = origin
+			result.append(origin[1])
+		self._forgetGoneAcftOrigins()
+		return result
 	
 	def restoreSituation(self, situation_snapshot):
-		while self.aircraft_list != []:
-			self.killAircraft(self.aircraft_list[0])
-		for acft_snapshot in situation_snapshot:
-			self.aircraft_list.append(ControlledAircraft.fromStatusSnapshot(acft_snapshot))
+		'''
+		Aircraft still in the state of their snapshot entry are left untouched; only the others are recreated.
+		'''
+		to_restore = situation_snapshot[:]
+		for acft in self.aircraft_list[:]:
+			origin = self.acft_origins.get(acft.identifier)
+			if origin != None and origin[0] == acft.statusSignature() and any(entry is origin[1] for entry in to_restore):
+				pop_all(to_restore, lambda entry: entry is origin[1])
+			else:
+				self.killAircraft(acft)
+		for acft_snapshot in to_restore:
+			acft = ControlledAircraft.fromStatusSnapshot(acft_snapshot)
+			self.acft_origins[acft.identifier] = acft.statusSignature(), acft_snapshot
+			self.aircraft_list.append(acft)
 		self.tickSessionOnce()
+		self._forgetGoneAcftOrigins()
+	
+	def _forgetGoneAcftOrigins(self): # killed or removed ACFT
+		present = { acft.identifier for acft in self.aircraft_list }
+		for callsign in [cs for cs in self.acft_origins if cs not in present]:
+			del self.acft_origins[callsign]
 
@@ -6,6 +6,20 @@ class Ui_discardedStripsDialog(object):
         discardedStripsDialog.resize(387, 292)
         self.verticalLayout = QtWidgets.QVBoxLayout(discardedStripsDialog)
         self.verticalLayout.setObjectName("verticalLayout")
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.filterCallsign_edit = QtWidgets.QLineEdit(discardedStripsDialog)
+        self.filterCallsign_edit.setObjectName("filterCallsign_edit")
+        self.horizontalLayout.addWidget(self.filterCallsign_edit)
+        self.filterSQ_edit = QtWidgets.QLineEdit(discardedStripsDialog)
+        self.filterSQ_edit.setMaxLength(4)
+        self.filterSQ_edit.setObjectName("filterSQ_edit")
+        self.horizontalLayout.addWidget(self.filterSQ_edit)
+        self.filterTime_button = QtWidgets.QToolButton(discardedStripsDialog)
+        self.filterTime_button.setPopupMode(QtWidgets.QToolButton.InstantPopup)
+        self.filterTime_button.setObjectName("filterTime_button")
+        self.horizontalLayout.addWidget(self.filterTime_button)
+        self.verticalLayout.addLayout(self.horizontalLayout)
         self.strip_view = QtWidgets.QListView(discardedStripsDialog)
         self.strip_view.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
         self.strip_view.setObjectName("strip_view")
@@ -27,12 +41,21 @@ class Ui_discardedStripsDialog(object):
 
         self.retranslateUi(discardedStripsDialog)
         QtCore.QMetaObject.connectSlotsByName(discardedStripsDialog)
+        discardedStripsDialog.setTabOrder(self.filterCallsign_edit, self.filterSQ_edit)
+        discardedStripsDialog.setTabOrder(self.filterSQ_edit, self.filterTime_button)
+        discardedStripsDialog.setTabOrder(self.filterTime_button, self.strip_view)
         discardedStripsDialog.setTabOrder(self.strip_view, self.clear_button)
         discardedStripsDialog.setTabOrder(self.clear_button, self.recall_button)
         discardedStripsDialog.setTabOrder(self.recall_button, self.close_button)
 
     def retranslateUi(self, discardedStripsDialog):
         _translate = QtCore.QCoreApplication.translate
+        self.filterCallsign_edit.setToolTip(_translate("discardedStripsDialog", "Filter by callsign"))
+        self.filterCallsign_edit.setPlaceholderText(_translate("discardedStripsDialog", "Callsign"))
+        self.filterSQ_edit.setToolTip(_translate("discardedStripsDialog", "Filter by assigned transponder code"))
+        self.filterSQ_edit.setPlaceholderText(_translate("discardedStripsDialog", "SQ"))
+        self.filterTime_button.setToolTip(_translate("discardedStripsDialog", "Filter by time discarded"))
+        self.filterTime_button.setText(_translate("discardedStripsDialog", "Time"))
         self.clear_button.setText(_translate("discardedStripsDialog", "Clear list"))
         self.close_button.setText(_translate("discardedStripsDialog", "Close"))
         self.recall_button.setText(_translate("discardedStripsDialog", "Recall selected"))